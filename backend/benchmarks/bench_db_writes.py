@@ -0,0 +1,111 @@
+# Schreibdurchsatz von SQLite unter paralleler Last: altes Engine-Setup vs. Profil aus config.Settings
+# (WAL, synchronous=NORMAL, busy_timeout, mmap, cache_size).
+#
+#   cd backend && python -m benchmarks.bench_db_writes --writers 8 --readers 4 --recipes 50
+#
+# Jeder Writer legt Rezepte über crud.create_recipe an (inkl. Tags, Nährwertspalten, Suchindex),
+# die Reader blättern parallel durch die Rezeptliste, wie das Dashboard während laufender Importe.
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from database import Base, engine_options, register_sqlite_pragmas
+import crud, schemas
+
+
+def _legacy_engine(url: str):
+    # Bisheriges Setup: Rollback-Journal, synchronous=FULL, Treiber-Default-Timeout
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+def _tuned_engine(url: str):
+    engine = create_engine(url, **engine_options(url))
+    register_sqlite_pragmas(engine)
+    return engine
+
+def _run(profile: str, writers: int, readers: int, recipes: int) -> None:
+    url = f"sqlite:///{_tmpdir}/{profile}.db"
+    engine = _legacy_engine(url) if profile == "legacy" else _tuned_engine(url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with Session() as db:
+        user = crud.create_user(db, schemas.UserCreate(email="bench@test.de", password="bench", invite_code="-"), hashed_password="x")
+        user_id = user.id
+
+    content = {
+        "servings": 2,
+        "cooking_time": 20,
+        "tags": ["vegan", "Hauptspeise"],
+        "steps": ["Schneide alles klein.", "Koche alles 20 Minuten."],
+        "ingredients": [{"name": "Linsen", "search_term": "lentil", "id_slug": "lentil"}],
+        "nutrients": {field: 10.0 for field in crud.NUTRIENT_FIELDS}
+    }
+
+    stats = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def writer(index: int):
+        for n in range(recipes):
+            try:
+                with Session() as db:
+                    crud.create_recipe(db, schemas.RecipeCreate(title=f"Linsen Curry {index}-{n}", content=content, image="/uploads/x.jpg"), user_id)
+                with lock:
+                    stats["writes"] += 1
+            except OperationalError:
+                with lock:
+                    stats["errors"] += 1
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with Session() as db:
+                    crud.get_recipes(user_id, db, limit=48)
+                with lock:
+                    stats["reads"] += 1
+            except OperationalError:
+                with lock:
+                    stats["errors"] += 1
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+
+    start = time.perf_counter()
+    for thread in reader_threads + writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in reader_threads:
+        thread.join()
+
+    engine.dispose()
+
+    print(f"profile:         {profile}")
+    print(f"writes:          {stats['writes']} / {writers * recipes} ({stats['writes'] / elapsed:.1f} commits/s, {elapsed:.2f} s)")
+    print(f"reads:           {stats['reads']} ({stats['reads'] / elapsed:.1f} pages/s)")
+    print(f"locked errors:   {stats['errors']}")
+    print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--recipes", type=int, default=50)
+    parser.add_argument("--profile", choices=["legacy", "tuned", "both"], default="both")
+    args = parser.parse_args()
+
+    for profile in (["legacy", "tuned"] if args.profile == "both" else [args.profile]):
+        _run(profile, args.writers, args.readers, args.recipes)
@@ -0,0 +1,117 @@
+# HTML-Bereinigung für Website-Imports: bisheriger BeautifulSoup-Cleaner (html.parser, drei find_all-Durchläufe)
+# vs. lxml-Cleaner aus services.html_cleaner, einzeln und unter paralleler Last.
+#
+#   cd backend && python -m benchmarks.bench_html_cleaning --corpus tests/corpus --scale 100 --concurrency 8
+#
+# --scale vervielfacht den <body> jeder Seite, um 1-3 MB große Rezeptseiten nachzubilden.
+# Unter Last läuft der alte Cleaner wie bisher per asyncio.to_thread, der neue im Prozess-Pool.
+# Eine Probe misst dabei, wie lange der Event Loop blockiert (max. Verzögerung eines 10-ms-Timers).
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from pathlib import Path
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from bs4 import BeautifulSoup
+from services import html_cleaner
+from config import settings
+
+
+def _legacy_clean(html_content: str) -> str:
+    soup = BeautifulSoup(html_content, "html.parser")
+
+    schemas = []
+    for script in soup.find_all('script', type='application/ld+json'):
+        schemas.append(str(script))
+
+    allowed_tags = ["h1", "h2", "h3", "p", "ul", "ol", "li", "table", "tr", "td", "th"]
+    for tag in soup.find_all(['script', 'style', 'svg', 'nav', 'footer', 'iframe', 'noscript', 'meta', 'link']):
+        tag.decompose()
+    for tag in soup.find_all(True):
+        if tag.name not in allowed_tags:
+            tag.unwrap()
+        tag.attrs = {}
+
+    clean_html = "\n".join(schemas) + str(soup)
+    return " ".join(clean_html.split())
+
+def _scale(html_content: str, factor: int) -> str:
+    start = html_content.find("<body")
+    start = html_content.find(">", start) + 1
+    end = html_content.rfind("</body>")
+    if start <= 0 or end < start:
+        return html_content * factor
+    return html_content[:start] + html_content[start:end] * factor + html_content[end:]
+
+async def _loop_lag(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - start - 0.01)
+    return worst
+
+async def _under_load(pages: list, concurrency: int, legacy: bool) -> tuple[float, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def clean(page):
+        async with semaphore:
+            if legacy:
+                await asyncio.to_thread(_legacy_clean, page)
+            else:
+                await html_cleaner.clean(page)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(clean(page) for page in pages))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await probe
+
+async def _run(pages: list, concurrency: int, rounds: int) -> None:
+    legacy_times, lxml_times = [], []
+    for page in pages:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            _legacy_clean(page)
+            legacy_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            html_cleaner.clean_html(page, settings.PROMPT_MAX_TOKENS, structured=False)
+            lxml_times.append(time.perf_counter() - start)
+
+    total_mb = sum(len(page.encode("utf-8")) for page in pages) / 1024 / 1024
+    print(f"pages:           {len(pages)} ({total_mb:.1f} MB, {rounds} Runden)")
+    print(f"legacy:          {statistics.median(legacy_times) * 1000:.1f} ms Median, {max(legacy_times) * 1000:.1f} ms max")
+    print(f"lxml:            {statistics.median(lxml_times) * 1000:.1f} ms Median, {max(lxml_times) * 1000:.1f} ms max")
+    print(f"speedup:         {statistics.median(legacy_times) / statistics.median(lxml_times):.1f}x")
+    print()
+
+    # Pool vorab starten, damit der Prozessstart nicht in die Messung fällt
+    await html_cleaner.clean(pages[0])
+    load = pages * rounds
+    for name, legacy in (("legacy (Thread)", True), ("lxml (Prozess-Pool)", False)):
+        elapsed, lag = await _under_load(load, concurrency, legacy)
+        print(f"{name + ':':<17}{len(load) / elapsed:.1f} Seiten/s bei {concurrency} parallel, Event-Loop-Lag max. {lag * 1000:.0f} ms")
+
+    html_cleaner.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=Path, default=Path(__file__).parent.parent / "tests" / "corpus")
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = [_scale(path.read_text(encoding="utf-8", errors="replace"), args.scale) for path in sorted(args.corpus.glob("*.htm*"))]
+    if not pages:
+        parser.error("keine .html-Dateien im Korpus")
+
+    asyncio.run(_run(pages, args.concurrency, args.rounds))
@@ -0,0 +1,86 @@
+# Verarbeitung des Gemini-Streams: bisher full_response += chunk und Suche im gesamten Text pro Chunk,
+# jetzt JsonStreamParser (jedes Zeichen einmal). Synthetisches Rezept mit vielen Zutaten und Schritten.
+# Die CPU-Zeit ist in beiden Fällen klein gegen die Laufzeit des Streams (Sekunden), entscheidend ist
+# "first lookup": ab welchem Chunk Nährwerte nachgeschlagen werden können.
+#
+#   cd backend && python -m benchmarks.bench_llm_stream --ingredients 40 --chunk-size 16
+import argparse
+import json
+import re
+import statistics
+import time
+
+from utils.json_stream import JsonStreamParser
+
+TITLE_PATTERN = re.compile(r'"title"\s*:\s*"((?:[^"\\]|\\.)*)"')
+STREAM_PATHS = [("title",), ("visual_summary",), ("content", "ingredients", "*")]
+
+
+def _recipe(ingredients: int) -> str:
+    per_100g = {"kcal": 120.5, "protein": 3.2, "fat": 1.1, "saturated_fat": 0.2, "carbs": 20.0, "sugar": 2.5, "fiber": 1.8, "salt": 0.1}
+    return json.dumps({
+        "title": "Gemüse-Eintopf",
+        "visual_summary": "Thick vegetable stew with diced carrots and potatoes in a deep bowl.",
+        "content": {
+            "servings": 4,
+            "cooking_time": 45,
+            "ingredients": [
+                {"name": f"Zutat {i}", "id_slug": f"ingredient-{i}", "search_term": f"ingredient {i}", "amount": 100, "unit": "g", "est_weight_g": 100, "per_100g": per_100g}
+                for i in range(ingredients)
+            ],
+            "steps": [f"Schritt {i}: Schneide das Gemüse und gib es in den Topf." for i in range(ingredients)],
+            "tags": ["vegan", "Hauptspeise"],
+            "nutrients": None
+        }
+    }, ensure_ascii=False, indent=2)
+
+def _legacy(chunks: list) -> int:
+    full_response = ""
+    title_reported = False
+    image_triggered = False
+    for chunk in chunks:
+        full_response += chunk
+        if not title_reported and TITLE_PATTERN.search(full_response):
+            title_reported = True
+        if not image_triggered and '"content":' in full_response:
+            image_triggered = True
+    return len(json.loads(full_response)["content"]["ingredients"])
+
+def _incremental(chunks: list) -> int:
+    parser = JsonStreamParser(STREAM_PATHS)
+    ingredients = 0
+    for chunk in chunks:
+        for path, _ in parser.feed(chunk):
+            ingredients += path[0] == "content"
+    json.loads("".join(chunks))
+    return ingredients
+
+def _measure(fn, chunks: list, rounds: int) -> float:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(chunks)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ingredients", type=int, default=40)
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    text = _recipe(args.ingredients)
+    chunks = [text[start:start + args.chunk_size] for start in range(0, len(text), args.chunk_size)]
+    assert _legacy(chunks) == _incremental(chunks) == args.ingredients
+
+    legacy = _measure(_legacy, chunks, args.rounds)
+    incremental = _measure(_incremental, chunks, args.rounds)
+    # Frühester Zeitpunkt, ab dem Nährwerte nachgeschlagen werden können: bisher nach dem letzten Chunk
+    first_ingredient = next(i for i in range(len(chunks)) if JsonStreamParser(STREAM_PATHS[2:]).feed("".join(chunks[:i + 1])))
+
+    print(f"response:        {len(text)} Zeichen in {len(chunks)} Chunks")
+    print(f"legacy:          {legacy * 1000:.2f} ms (Median)")
+    print(f"incremental:     {incremental * 1000:.2f} ms (Median)")
+    print(f"first lookup:    nach Chunk {first_ingredient + 1} von {len(chunks)} (bisher {len(chunks)})")
@@ -0,0 +1,87 @@
+# Login-Durchsatz unter Last: bcrypt im Prozess-Pool vs. direkt im AnyIO-Threadpool.
+#
+#   cd backend && python -m benchmarks.bench_login --logins 200 --concurrency 50
+#   cd backend && python -m benchmarks.bench_login --inline   (altes Verhalten zum Vergleich)
+#
+# Parallel zu den Logins misst eine Probe die Latenz eines günstigen Endpoints (/users/me),
+# um zu zeigen, ob der Threadpool durch das Hashing ausgehungert wird.
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["UPLOAD_DIR"] = f"{_tmpdir}/uploads"
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from fastapi.concurrency import run_in_threadpool
+from httpx import AsyncClient, ASGITransport
+from main import app
+from database import SessionLocal
+from routers.auth import create_access_token
+from utils import password_hashing
+from config import settings
+import crud, schemas
+
+
+async def _probe(client: AsyncClient, cookies: dict, stop: asyncio.Event, latencies: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/users/me", cookies=cookies)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+async def main(logins: int, concurrency: int, inline: bool) -> None:
+    if inline:
+        # Vorheriges Verhalten: bcrypt blockiert einen Worker des AnyIO-Threadpools
+        async def _run_inline(fn, *args):
+            return await run_in_threadpool(fn, *args)
+        password_hashing._run = _run_inline
+
+    with SessionLocal() as db:
+        crud.create_user(db, schemas.UserCreate(email="bench@test.de", password="bench", invite_code="-"))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    cookies = {"access_token": create_access_token({"sub": "bench@test.de"})}
+    statuses = []
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+
+        async def login():
+            async with semaphore:
+                response = await client.post("/token", data={"username": "bench@test.de", "password": "bench"})
+                statuses.append(response.status_code)
+
+        stop, latencies = asyncio.Event(), []
+        probe = asyncio.create_task(_probe(client, cookies, stop, latencies))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await probe
+
+    password_hashing.shutdown()
+
+    ok = statuses.count(200)
+    print(f"mode:            {'inline threadpool' if inline else f'process pool ({settings.PASSWORD_HASH_WORKERS} workers)'}")
+    print(f"logins:          {ok} ok / {statuses.count(503)} rejected (503) / {logins} total")
+    print(f"throughput:      {ok / elapsed:.1f} logins/s ({elapsed:.2f} s)")
+    if latencies:
+        print(f"/users/me p50:   {statistics.median(latencies) * 1000:.1f} ms")
+        print(f"/users/me max:   {max(latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--inline", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.logins, args.concurrency, args.inline))
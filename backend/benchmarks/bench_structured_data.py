@@ -0,0 +1,75 @@
+# Prompt-Größe und LLM-Latenz für Website-Imports: ganze bereinigte Seite vs. schema.org-Fast-Path.
+#
+#   cd backend && python -m benchmarks.bench_structured_data --corpus ~/recipe-pages
+#   cd backend && python -m benchmarks.bench_structured_data --corpus ~/recipe-pages --live   (ruft Gemini auf, braucht GEMINI_API_KEY)
+#
+# Korpus: gespeicherte Rezeptseiten als .html (z.B. per "curl -o" oder "Seite speichern unter").
+# Ohne --live werden nur Zeichen und geschätzte Tokens (~4 Zeichen pro Token) verglichen,
+# mit --live zusätzlich die Zeit von call_gemini für beide Prompts (LLM-Cache und Bildgenerierung aus).
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+from services import html_cleaner, ai_content_normalizer
+import schemas
+
+CHARS_PER_TOKEN = 4
+EMPTY_NUTRIENTS = schemas.Nutrients(kcal=0, protein=0, fat=0, saturated_fat=0, carbs=0, sugar=0, fiber=0, salt=0)
+
+
+async def _llm_seconds(prompt: str) -> float:
+    # Nur das Text-LLM messen: Bildmodell und Nährwert-Datenbank abklemmen
+    with patch.object(ai_content_normalizer, "generate_image", new_callable=AsyncMock, return_value=None), \
+         patch.object(ai_content_normalizer, "calculate_nutrients", new_callable=AsyncMock, return_value=EMPTY_NUTRIENTS):
+        start = time.perf_counter()
+        await ai_content_normalizer.call_gemini(prompt)
+        return time.perf_counter() - start
+
+async def _run(pages: list, live: bool) -> None:
+    full_sizes, fast_sizes, latencies = [], [], []
+    structured = 0
+
+    for page in pages:
+        html_content = page.read_text(encoding="utf-8", errors="replace")
+        full, _ = html_cleaner.clean_html(html_content, max_tokens=10**9, structured=False)
+        prompt, source = html_cleaner.clean_html(html_content, max_tokens=10**9)
+
+        full_sizes.append(len(full))
+        fast_sizes.append(len(prompt))
+        structured += source == "structured"
+        line = f"{page.name[:40]:<40} {source:<10} {len(full):>8} -> {len(prompt):>7} Zeichen ({1 - len(prompt) / len(full):>4.0%} weniger)"
+
+        if live and source == "structured":
+            full_seconds = await _llm_seconds(full)
+            fast_seconds = await _llm_seconds(prompt)
+            latencies.append((full_seconds, fast_seconds))
+            line += f"  LLM {full_seconds:.1f} s -> {fast_seconds:.1f} s"
+        print(line)
+
+    print()
+    print(f"pages:           {len(pages)} ({structured} mit schema.org Recipe)")
+    print(f"prompt chars:    {sum(full_sizes)} -> {sum(fast_sizes)} ({1 - sum(fast_sizes) / sum(full_sizes):.0%} weniger)")
+    print(f"prompt tokens:   ~{statistics.mean(full_sizes) / CHARS_PER_TOKEN:.0f} -> ~{statistics.mean(fast_sizes) / CHARS_PER_TOKEN:.0f} pro Seite")
+    if latencies:
+        print(f"llm latency:     {statistics.median(full for full, _ in latencies):.1f} s -> {statistics.median(fast for _, fast in latencies):.1f} s (Median)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=Path, required=True, help="Verzeichnis mit gespeicherten Rezeptseiten (.html)")
+    parser.add_argument("--live", action="store_true", help="Gemini für beide Prompts aufrufen und die Latenz messen")
+    args = parser.parse_args()
+
+    pages = sorted(args.corpus.glob("*.htm*"))
+    if not pages:
+        parser.error("keine .html-Dateien im Korpus")
+
+    asyncio.run(_run(pages, args.live))
@@ -0,0 +1,121 @@
+# Audio-Pipeline für TikTok-Imports: Originaldatei vs. Mono-Opus ohne Stille, sequentielles vs. paralleles oEmbed/Download.
+#
+#   cd backend && python -m benchmarks.bench_tiktok_audio --fixtures ~/tiktok-fixtures
+#   cd backend && python -m benchmarks.bench_tiktok_audio --generate 3   (synthetische Videos per ffmpeg)
+#
+# Pro Fixture-Video: Bytes vorher/nachher, Dauer des Transcodes und die geschätzte Upload-Zeit
+# zur Transkription bei --uplink-mbps. oEmbed und Download werden mit festen Latenzen simuliert
+# (der Download kopiert die Fixture), damit der Gewinn durch die Parallelisierung messbar ist.
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from utils import audio_utils
+
+VIDEO_EXTENSIONS = (".mp4", ".m4a", ".webm", ".mov", ".mp3")
+
+
+def _generate_fixtures(directory: Path, count: int) -> list:
+    # Testbild + Rauschen als Ersatz für Sprache (ca. 30-60 s) mit je 3 s Stille am Anfang und Ende, ähnlich wie ein Kochvideo
+    fixtures = []
+    for index in range(count):
+        seconds = 30 + 15 * index
+        path = directory / f"fixture_{index}.mp4"
+        subprocess.run([
+            "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"testsrc2=size=720x1280:rate=30:duration={seconds + 6}",
+            "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.3:duration={seconds},adelay=3s:all=1,apad=pad_dur=3",
+            "-c:v", "libx264", "-preset", "veryfast", "-c:a", "aac", "-b:a", "128k", "-ac", "2", "-shortest",
+            str(path)
+        ], check=True)
+        fixtures.append(path)
+    return fixtures
+
+async def _import_audio(fixture: Path, tmpdir: str, oembed_ms: int, download_ms: int, concurrent: bool) -> Path:
+
+    async def fetch_oembed(url):
+        await asyncio.sleep(oembed_ms / 1000)
+        return {"title": "Fixture"}
+
+    def download_audio(url, target_dir):
+        time.sleep(download_ms / 1000)
+        return Path(shutil.copy(fixture, target_dir))
+
+    # Gleiche Aufteilung wie in tiktok_content_generator.transcribe_and_generate
+    if concurrent:
+        _, audio_path = await asyncio.gather(fetch_oembed(fixture.name), asyncio.to_thread(download_audio, fixture.name, tmpdir))
+    else:
+        await fetch_oembed(fixture.name)
+        audio_path = await asyncio.to_thread(download_audio, fixture.name, tmpdir)
+
+    return audio_path
+
+async def _run(fixtures: list, oembed_ms: int, download_ms: int, uplink_mbps: float) -> None:
+    totals = {"before": 0, "after": 0, "saved_s": 0.0}
+
+    for fixture in fixtures:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            start = time.perf_counter()
+            await _import_audio(fixture, tmpdir, oembed_ms, download_ms, concurrent=False)
+            sequential = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            start = time.perf_counter()
+            audio_path = await _import_audio(fixture, tmpdir, oembed_ms, download_ms, concurrent=True)
+            concurrent = time.perf_counter() - start
+
+            start = time.perf_counter()
+            upload_path = await audio_utils.prepare_for_transcription(audio_path)
+            transcode = time.perf_counter() - start
+
+            before = audio_path.stat().st_size
+            after = upload_path.stat().st_size
+
+        upload_before = before * 8 / (uplink_mbps * 1_000_000)
+        upload_after = after * 8 / (uplink_mbps * 1_000_000)
+        saved = (sequential - concurrent) + (upload_before - upload_after) - transcode
+
+        totals["before"] += before
+        totals["after"] += after
+        totals["saved_s"] += saved
+
+        print(f"fixture:         {fixture.name}")
+        print(f"fetch:           {sequential * 1000:.0f} ms sequentiell, {concurrent * 1000:.0f} ms parallel")
+        print(f"bytes:           {before / 1024:.0f} KB -> {after / 1024:.0f} KB ({1 - after / before:.0%} weniger)")
+        print(f"transcode:       {transcode * 1000:.0f} ms")
+        print(f"upload:          {upload_before:.2f} s -> {upload_after:.2f} s bei {uplink_mbps} Mbit/s")
+        print(f"gespart:         {saved:.2f} s")
+        print()
+
+    count = len(fixtures)
+    print(f"pro Import:      {(totals['before'] - totals['after']) / count / 1024:.0f} KB und {totals['saved_s'] / count:.2f} s gespart")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", type=Path, help="Verzeichnis mit lokalen Videos (z.B. per yt-dlp geladen)")
+    parser.add_argument("--generate", type=int, default=0, help="Anzahl synthetischer Fixture-Videos")
+    parser.add_argument("--oembed-ms", type=int, default=400)
+    parser.add_argument("--download-ms", type=int, default=1200)
+    parser.add_argument("--uplink-mbps", type=float, default=20.0)
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        parser.error("ffmpeg wird für den Transcode benötigt")
+
+    fixture_dir = Path(tempfile.mkdtemp())
+    fixtures = _generate_fixtures(fixture_dir, args.generate) if args.generate else []
+    if args.fixtures:
+        fixtures += sorted(path for path in args.fixtures.iterdir() if path.suffix in VIDEO_EXTENSIONS)
+    if not fixtures:
+        parser.error("--fixtures oder --generate angeben")
+
+    asyncio.run(_run(fixtures, args.oembed_ms, args.download_ms, args.uplink_mbps))
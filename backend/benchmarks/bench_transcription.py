@@ -0,0 +1,82 @@
+# Transkription: entferntes gpt-4o-transcribe vs. lokales whisper auf der CPU.
+#
+#   cd backend && python -m benchmarks.bench_transcription --fixtures ~/tiktok-fixtures --backend both --concurrency 4
+#   cd backend && WHISPER_MODEL=small WHISPER_WORKERS=4 python -m benchmarks.bench_transcription --fixtures ... --backend whisper
+#
+# Latenz: jede Datei einzeln (p50/p95 über alle Fixtures, nach einem Warm-up, das die Modelle lädt).
+# Durchsatz: alle Fixtures mit --concurrency parallelen Imports, gemessen als Audio-Sekunden pro Sekunde.
+# Für "openai" muss OPENAI_API_KEY gesetzt sein, für "whisper" openai-whisper/torch und ffmpeg installiert.
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from pathlib import Path
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from services import transcription
+from utils import audio_utils
+from config import settings
+
+AUDIO_EXTENSIONS = (".mp4", ".m4a", ".webm", ".mov", ".mp3", ".ogg", ".wav")
+
+
+async def _duration(path: Path) -> float:
+    samples = await audio_utils.decode_pcm(path, transcription.WHISPER_SAMPLE_RATE)
+    return len(samples) / transcription.WHISPER_SAMPLE_RATE
+
+async def _run(backend: str, fixtures: list, durations: dict, concurrency: int) -> None:
+    settings.TRANSCRIPTION_BACKEND = backend
+
+    # Warm-up: Worker-Prozesse starten und Modelle laden, zählt nicht in die Messung
+    await transcription.transcribe(fixtures[0])
+
+    latencies = []
+    for fixture in fixtures:
+        start = time.perf_counter()
+        await transcription.transcribe(fixture)
+        latencies.append(time.perf_counter() - start)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(fixture):
+        async with semaphore:
+            await transcription.transcribe(fixture)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(fixture) for fixture in fixtures))
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = sum(durations.values())
+    latencies.sort()
+    print(f"backend:         {backend}" + (f" ({settings.WHISPER_MODEL}, {settings.WHISPER_WORKERS} Worker)" if backend == "whisper" else ""))
+    print(f"latency p50:     {statistics.median(latencies):.2f} s")
+    print(f"latency p95:     {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:.2f} s")
+    print(f"realtime factor: {sum(latencies) / audio_seconds:.3f} (Rechenzeit pro Audio-Sekunde)")
+    print(f"throughput:      {audio_seconds / elapsed:.1f} Audio-s/s bei {concurrency} parallelen Imports ({elapsed:.1f} s)")
+    print()
+
+    transcription.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", type=Path, required=True, help="Verzeichnis mit lokalen Audio-/Videodateien")
+    parser.add_argument("--backend", choices=["openai", "whisper", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    fixtures = sorted(path for path in args.fixtures.iterdir() if path.suffix in AUDIO_EXTENSIONS)
+    if not fixtures:
+        parser.error("keine Fixtures gefunden")
+
+    async def main():
+        durations = {fixture: await _duration(fixture) for fixture in fixtures}
+        print(f"fixtures:        {len(fixtures)} Dateien, {sum(durations.values()) / 60:.1f} min Audio")
+        print()
+        for backend in (["openai", "whisper"] if args.backend == "both" else [args.backend]):
+            await _run(backend, fixtures, durations, args.concurrency)
+
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+import threading
+from cachetools import TTLCache
+from config import settings
+
+
+# Thread-sicherer LRU/TTL-Cache, der Treffer und Fehlschläge mitzählt
+class StatsCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def get_many(self, keys) -> tuple[dict, list]:
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                value = self._cache.get(key)
+                if value is None:
+                    missing.append(key)
+                else:
+                    found[key] = value
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._cache[key] = value
+
+    def set_many(self, items: dict) -> None:
+        with self._lock:
+            for key, value in items.items():
+                self._cache[key] = value
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Nährwerte pro 100 g, Schlüssel ist der id_slug
+nutrients_cache = StatsCache(maxsize=settings.NUTRIENT_CACHE_SIZE, ttl=settings.NUTRIENT_CACHE_TTL_SECONDS)
+
+# Verifizierte User (id, email, is_admin), Schlüssel ist das "sub" aus dem Token
+user_cache = StatsCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+# Dekodierte Token-Claims, Schlüssel ist der Token selbst (Ablaufzeit wird beim Treffer geprüft)
+token_cache = StatsCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
@@ -0,0 +1,64 @@
+# Wartungsbefehle für den Betrieb:
+#
+#   cd backend && python cli.py backfill-images [--workers 4]
+#   cd backend && python cli.py gc-images [--grace-seconds 3600]
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from sqlalchemy import select
+import models
+from database import SessionLocal, engine
+from migrations import sync_schema
+from config import settings
+from utils import image_utils
+from services import image_gc
+
+
+def backfill_images(workers: int) -> None:
+    # Varianten für alle Originale erzeugen, die noch keine haben, danach recipes.image_variants nachziehen
+    upload_dir = Path(settings.UPLOAD_DIR)
+    originals = sorted(upload_dir.glob("*.jpg"))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        created = sum(executor.map(image_utils.create_missing_variants, originals, chunksize=8))
+
+    updated = 0
+    with SessionLocal() as db:
+        for recipe in db.scalars(select(models.Recipe).where(models.Recipe.image.is_not(None))):
+            variants = image_utils.variants_for(recipe.image)
+            if variants != recipe.image_variants:
+                recipe.image_variants = variants
+                updated += 1
+        db.commit()
+
+    print(f"images:   {len(originals)} originals, {created} with new variants")
+    print(f"recipes:  {updated} updated")
+
+def gc_images(grace_seconds: int) -> None:
+    with SessionLocal() as db:
+        result = image_gc.sweep(db, grace_seconds=grace_seconds)
+
+    print(f"files:    {result['removed_files']} removed ({result['freed_bytes'] / 1024 / 1024:.1f} MB)")
+    print(f"refs:     {result['removed_refs']} removed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-images", help="AVIF/WebP-Varianten für bestehende Uploads erzeugen")
+    backfill.add_argument("--workers", type=int, default=settings.IMAGE_WORKERS)
+
+    gc = commands.add_parser("gc-images", help="Bilder ohne Rezept-Referenz löschen")
+    gc.add_argument("--grace-seconds", type=int, default=settings.IMAGE_GC_GRACE_SECONDS)
+
+    args = parser.parse_args()
+
+    # Bestehende Datenbank auf den aktuellen Stand bringen (z.B. Spalte image_variants)
+    models.Base.metadata.create_all(bind=engine)
+    sync_schema(engine)
+
+    if args.command == "backfill-images":
+        backfill_images(args.workers)
+    elif args.command == "gc-images":
+        gc_images(args.grace_seconds)
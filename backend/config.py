@@ -1,3 +1,4 @@
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,11 +8,95 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_SECONDS: int = 300
 
     DATABASE_URL: str = "sqlite:///./test.db"
+    # Leer: wird aus DATABASE_URL mit asynchronem Treiber abgeleitet
+    ASYNC_DATABASE_URL: str = ""
+    # SQLite: WAL erlaubt Lesen während geschrieben wird, busy_timeout wartet statt "database is locked"
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+
+    # Server-Datenbanken (PostgreSQL): Connection Pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+
     GEMINI_API_KEY: str
     OPENAI_API_KEY: str
 
     FRONTEND_URLS: list[str] = ["http://localhost:5173"]
     UPLOAD_DIR: str = "./uploads"
+    # Hinter nginx: internal location, über die nginx /uploads per sendfile ausliefert (z.B. "/_uploads/"), leer = App liefert aus
+    UPLOADS_ACCEL_REDIRECT_PREFIX: str = ""
+    # Prozesse für das Encoding der Bildvarianten (AVIF/WebP)
+    IMAGE_WORKERS: int = 2
+    # Unreferenzierte Bilder erst nach dieser Zeit löschen (laufende Imports haben noch kein Rezept)
+    IMAGE_GC_GRACE_SECONDS: int = 3600
+    IMAGE_GC_INTERVAL_SECONDS: int = 6 * 3600
+
+    # TikTok-Audio vor dem Transkribieren: Mono-Opus mit niedriger Bitrate, Stille am Anfang/Ende entfernt
+    TIKTOK_AUDIO_BITRATE: str = "24k"
+    TIKTOK_AUDIO_SAMPLE_RATE: int = 16000
+    TIKTOK_AUDIO_MAX_SECONDS: int = 600
+    TIKTOK_AUDIO_SILENCE_DB: int = -45
+
+    # "openai" (gpt-4o-transcribe) oder "whisper" (lokal auf der CPU, Modell einmal pro Worker-Prozess geladen)
+    TRANSCRIPTION_BACKEND: Literal["openai", "whisper"] = "openai"
+    WHISPER_MODEL: str = "base"
+    WHISPER_WORKERS: int = 2
+    WHISPER_CHUNK_SECONDS: int = 30
+    # None = Sprache pro Chunk erkennen lassen
+    WHISPER_LANGUAGE: Optional[str] = None
+
+    # Ausgehende Requests (Scraper, TikTok oEmbed, Kurzlinks): ein gemeinsamer Client mit Keep-Alive für die ganze Laufzeit
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 50
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 4
+    HTTP_MAX_REDIRECTS: int = 5
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_READ_TIMEOUT_SECONDS: float = 15.0
+    # Wartezeit auf eine freie Verbindung aus dem Pool
+    HTTP_POOL_TIMEOUT_SECONDS: float = 10.0
+
+    NUTRIENT_CACHE_SIZE: int = 5000
+    NUTRIENT_CACHE_TTL_SECONDS: int = 3600
+    NUTRIENT_CACHE_WARMUP_SLUGS: int = 500
+
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+
+    # Hintergrund-Imports: parallel laufende Pipelines und Versuche pro Job (Abstürze mitten im Job zählen mit)
+    IMPORT_WORKERS: int = 2
+    IMPORT_JOB_MAX_ATTEMPTS: int = 3
+    # Laufende Jobs erneuern updated_at regelmäßig. Erst ohne Heartbeat für diese Zeit gilt ein Job als abgebrochen
+    # und wird neu eingereiht, Jobs anderer Prozesse (mehrere uvicorn-Worker, Rolling Restart) bleiben unberührt.
+    IMPORT_JOB_LEASE_SECONDS: int = 120
+
+    # Token-Budget für den Text einer Webseite im Prompt (tiktoken-Näherung), darüber werden Blöcke mit wenig Rezeptbezug entfernt
+    PROMPT_MAX_TOKENS: int = 6000
+    PROMPT_TOKEN_ENCODING: str = "o200k_base"
+    # Prozesse für das Parsen/Bereinigen von Webseiten (lxml)
+    HTML_CLEAN_WORKERS: int = 2
+
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_DIR: str = "./llm_cache"
+    LLM_CACHE_MAX_BYTES: int = 200 * 1024 * 1024
+    # Manuell hochzählen, um den Cache ohne Prompt-Änderung zu verwerfen
+    LLM_CACHE_VERSION: str = "1"
+
+    # Bildcache (liegt unter LLM_CACHE_DIR/images): 0 = nur identische visual_summary,
+    # z.B. 0.8 = auch sehr ähnliche Beschreibungen desselben Gerichts bekommen das vorhandene Bild
+    IMAGE_CACHE_ENABLED: bool = True
+    IMAGE_CACHE_MAX_BYTES: int = 10 * 1024 * 1024
+    IMAGE_CACHE_SIMILARITY_THRESHOLD: float = 0.0
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
     
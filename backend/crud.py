@@ -1,16 +1,16 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
+from sqlalchemy import func, select, event, inspect
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects import postgresql, sqlite
+from utils.password_hashing import pwd_context
+from utils import image_utils
 import models, schemas
-from pathlib import Path
-from config import settings
-
-# Setup für das Passwort-Hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-
-
+import search_index
+from cache import nutrients_cache, user_cache
+from collections import Counter
+import uuid
+from datetime import datetime, timezone
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
@@ -21,8 +21,19 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
-    hashed_password = get_password_hash(user.password)
+# Jede Änderung an einem User verwirft seinen gecachten Auth-Eintrag (auch bei geänderter E-Mail)
+@event.listens_for(models.User, "after_insert")
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: models.User) -> None:
+    user_cache.invalidate(target.email)
+    for old_email in inspect(target).attrs.email.history.deleted:
+        user_cache.invalidate(old_email)
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None) -> models.User:
+    # Der Hash wird im Router bereits im Prozess-Pool berechnet, sonst hier synchron
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     
     db_user = models.User(email=user.email, hashed_password=hashed_password)
     
@@ -32,18 +43,128 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
     
     return db_user
 
+def update_password_hash(db: Session, user: models.User, hashed_password: str) -> models.User:
+    user.hashed_password = hashed_password
+    db.commit()
+    db.refresh(user)
+    return user
+
+def _sync_recipe_tags(db_recipe: models.Recipe) -> None:
+    tags = set((db_recipe.content or {}).get("tags", []))
+    current = {recipe_tag.tag: recipe_tag for recipe_tag in db_recipe.tags}
+
+    # Nur Differenzen schreiben, damit unveränderte Tags nicht gelöscht und neu angelegt werden
+    for tag, recipe_tag in current.items():
+        if tag not in tags:
+            db_recipe.tags.remove(recipe_tag)
+    for tag in tags - current.keys():
+        db_recipe.tags.append(models.RecipeTag(tag=tag, owner_id=db_recipe.owner_id))
+
+def recipe_nutrient_columns(content: Optional[dict]) -> dict:
+    content = content or {}
+    nutrients = content.get("nutrients") or {}
+    servings = content.get("servings")
+
+    columns = {"servings": servings}
+    for field in models.NUTRIENT_COLUMNS:
+        total = nutrients.get(field)
+        columns[field] = total
+        columns[f"{field}_per_serving"] = total / servings if total is not None and servings else None
+
+    return columns
+
+def _sync_recipe_nutrients(db_recipe: models.Recipe) -> None:
+    for key, value in recipe_nutrient_columns(db_recipe.content).items():
+        setattr(db_recipe, key, value)
+
+def _change_image_ref(db: Session, image: Optional[str], delta: int) -> None:
+    # Nur eigene Uploads werden gezählt; läuft in derselben Transaktion wie das Anlegen/Löschen des Rezepts
+    if not image or not image.startswith("/uploads/"):
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(models.ImageRef).values(image=image, ref_count=delta)
+        db.execute(stmt.on_conflict_do_update(index_elements=["image"], set_={"ref_count": models.ImageRef.ref_count + delta}))
+        return
+
+    db_ref = db.get(models.ImageRef, image)
+    if db_ref is None:
+        db.add(models.ImageRef(image=image, ref_count=delta))
+    else:
+        db_ref.ref_count += delta
+
+def get_unreferenced_images(db: Session) -> List[str]:
+    return [image for image, in db.query(models.ImageRef.image).filter(models.ImageRef.ref_count <= 0)]
+
+def get_referenced_images(db: Session) -> List[str]:
+    return [image for image, in db.query(models.ImageRef.image).filter(models.ImageRef.ref_count > 0)]
+
+def delete_image_refs(db: Session, images: List[str]) -> None:
+    # Nur Einträge löschen, die inzwischen nicht wieder verwendet werden
+    db.query(models.ImageRef).filter(models.ImageRef.image.in_(images), models.ImageRef.ref_count <= 0).delete(synchronize_session=False)
+    db.commit()
+
 def create_recipe(db: Session, item: schemas.RecipeCreate, user_id: int) -> models.Recipe:
 
     db_recipe = models.Recipe(**item.model_dump(), owner_id=user_id)
+    if db_recipe.image_variants is None:
+        db_recipe.image_variants = image_utils.variants_for(db_recipe.image)
+    _sync_recipe_tags(db_recipe)
+    _sync_recipe_nutrients(db_recipe)
 
     db.add(db_recipe)
+    db.flush()
+    search_index.index_recipe(db, db_recipe)
+    _change_image_ref(db, db_recipe.image, 1)
     db.commit()
     db.refresh(db_recipe)
 
     return db_recipe
 
-def get_recipes(user_id: int, db: Session, skip: int = 0, limit: int = 100) -> List[models.Recipe]:
-    return db.query(models.Recipe).filter(models.Recipe.owner_id == user_id).offset(skip).limit(limit).all()
+def get_recipes(user_id: int, db: Session, q: Optional[str] = None, tags: Optional[List[str]] = None, cursor: Optional[int] = None, limit: int = 100) -> List[models.Recipe]:
+    query = db.query(models.Recipe).filter(models.Recipe.owner_id == user_id)
+
+    if q:
+        query = query.filter(search_index.title_contains(db, user_id, q))
+
+    # Jeder Tag muss im Rezept vorkommen (UND-Verknüpfung wie im Dashboard-Filter)
+    for tag in set(tags or []):
+        tagged_ids = select(models.RecipeTag.recipe_id).where(models.RecipeTag.owner_id == user_id, models.RecipeTag.tag == tag)
+        query = query.filter(models.Recipe.id.in_(tagged_ids))
+
+    # Keyset-Pagination: cursor ist die id des letzten Rezepts der vorherigen Seite
+    if cursor is not None:
+        query = query.filter(models.Recipe.id > cursor)
+
+    return query.order_by(models.Recipe.id).limit(limit).all()
+
+def get_recipes_by_nutrients(user_id: int, db: Session, nutrient_filter: schemas.NutrientFilter) -> List[models.Recipe]:
+    query = db.query(models.Recipe).filter(models.Recipe.owner_id == user_id)
+    suffix = "_per_serving" if nutrient_filter.per_serving else ""
+
+    for field in models.NUTRIENT_COLUMNS:
+        column = getattr(models.Recipe, f"{field}{suffix}")
+        min_value = getattr(nutrient_filter, f"min_{field}")
+        max_value = getattr(nutrient_filter, f"max_{field}")
+
+        if min_value is not None:
+            query = query.filter(column >= min_value)
+        if max_value is not None:
+            query = query.filter(column <= max_value)
+
+    return query.order_by(models.Recipe.id).limit(nutrient_filter.limit).all()
+
+def get_tag_counts(user_id: int, db: Session) -> List[dict]:
+    rows = (
+        db.query(models.RecipeTag.tag, func.count(models.RecipeTag.recipe_id))
+        .filter(models.RecipeTag.owner_id == user_id)
+        .group_by(models.RecipeTag.tag)
+        .order_by(func.count(models.RecipeTag.recipe_id).desc(), models.RecipeTag.tag)
+        .all()
+    )
+    return [{"tag": tag, "count": count} for tag, count in rows]
 
 def get_recipe_by_id(user_id: int, db: Session, recipe_id: int) -> models.Recipe:
     return db.query(models.Recipe).filter(models.Recipe.id == recipe_id, models.Recipe.owner_id == user_id).first()
@@ -53,14 +174,9 @@ def delete_recipe(db:Session, recipe_id: int, user_id: int) -> bool:
     db_recipe = db.query(models.Recipe).filter(models.Recipe.id == recipe_id, models.Recipe.owner_id == user_id).first()
 
     if db_recipe:
-        image_usage_count = db.query(models.Recipe).filter(models.Recipe.image == db_recipe.image).count()
-        
-        if image_usage_count == 1:
-            filename = db_recipe.image.split("/")[-1]
-            file_path = Path(settings.UPLOAD_DIR) / filename
-            if file_path.exists():
-                file_path.unlink()
-        
+        # Nur den Zähler senken; Dateien ohne Referenz räumt der GC-Sweep weg (services/image_gc.py)
+        _change_image_ref(db, db_recipe.image, -1)
+        search_index.remove_recipe(db, db_recipe.id)
         db.delete(db_recipe)
         db.commit()
         return True
@@ -110,10 +226,18 @@ def update_recipe(updates: schemas.RecipeUpdate, db:Session, recipe_id: int, use
     for key, value in update_data.items():
         setattr(db_recipe, key, value)
     
+    _sync_recipe_tags(db_recipe)
+    _sync_recipe_nutrients(db_recipe)
+    search_index.index_recipe(db, db_recipe)
     db.commit()
     db.refresh(db_recipe)
     return db_recipe
 
+NUTRIENT_FIELDS = models.NUTRIENT_COLUMNS
+
+def nutrients_to_dict(db_nutrients: models.IngredientNutrients) -> dict:
+    return {field: getattr(db_nutrients, field) for field in NUTRIENT_FIELDS}
+
 def get_nutrients_by_id(id_slug: str, db:Session) -> Optional[models.IngredientNutrients]:
 
     db_nutrients = db.query(models.IngredientNutrients).filter(models.IngredientNutrients.id_slug == id_slug).first()
@@ -121,6 +245,7 @@ def get_nutrients_by_id(id_slug: str, db:Session) -> Optional[models.IngredientN
     if not db_nutrients:
         return None
     
+    nutrients_cache.set(id_slug, nutrients_to_dict(db_nutrients))
     return db_nutrients
 
 def create_nutrients(db: Session, id_slug: str, nutrients: dict) -> models.IngredientNutrients:
@@ -130,11 +255,136 @@ def create_nutrients(db: Session, id_slug: str, nutrients: dict) -> models.Ingre
     db.commit()
     db.refresh(db_nutrients)
 
+    # Write-Through: neu angelegte Nährwerte sofort im Cache verfügbar machen
+    nutrients_cache.set(id_slug, nutrients_to_dict(db_nutrients))
     return db_nutrients
 
+def get_nutrients_by_ids(id_slugs: List[str], db: Session) -> Dict[str, models.IngredientNutrients]:
+    if not id_slugs:
+        return {}
+
+    rows = db.query(models.IngredientNutrients).filter(models.IngredientNutrients.id_slug.in_(set(id_slugs))).all()
+    found = {row.id_slug: row for row in rows}
+
+    nutrients_cache.set_many({slug: nutrients_to_dict(row) for slug, row in found.items()})
+    return found
+
+def upsert_nutrients(db: Session, nutrients_by_slug: Dict[str, dict]) -> Dict[str, models.IngredientNutrients]:
+    if not nutrients_by_slug:
+        return {}
+
+    rows = [{"id_slug": id_slug, **nutrients} for id_slug, nutrients in nutrients_by_slug.items()]
+    dialect = db.get_bind().dialect.name
+
+    # ON CONFLICT DO NOTHING: parallele Imports mit demselben Slug dürfen sich nicht gegenseitig abbrechen
+    if dialect == "sqlite":
+        stmt = sqlite.insert(models.IngredientNutrients).values(rows).on_conflict_do_nothing(index_elements=["id_slug"])
+        db.execute(stmt)
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(models.IngredientNutrients).values(rows).on_conflict_do_nothing(index_elements=["id_slug"])
+        db.execute(stmt)
+    else:
+        existing = get_nutrients_by_ids(list(nutrients_by_slug), db)
+        db.add_all(models.IngredientNutrients(**row) for row in rows if row["id_slug"] not in existing)
+
+    db.commit()
+
+    # Neu laden, da bei einem parallelen Import ein anderer Eintrag gewonnen haben kann (füllt auch den Cache)
+    return get_nutrients_by_ids(list(nutrients_by_slug), db)
+
+def get_most_used_nutrient_slugs(db: Session, limit: int, recipe_sample: int = 1000) -> List[str]:
+    # Zählt die Slugs der zuletzt importierten Rezepte
+    slug_counter = Counter()
+    recent_recipes = db.query(models.Recipe.content).order_by(models.Recipe.id.desc()).limit(recipe_sample)
+
+    for (content,) in recent_recipes:
+        for ing in (content or {}).get("ingredients", []):
+            if ing.get("id_slug"):
+                slug_counter[ing["id_slug"]] += 1
+
+    return [slug for slug, _ in slug_counter.most_common(limit)]
+
 def get_recipe_by_url(url: str, db:Session) -> Optional[dict]:
     db_recipe = db.query(models.Recipe).filter(models.Recipe.url == url).first()
 
     if not db_recipe:
         return None
-    return schemas.Recipe.model_validate(db_recipe).model_dump()
\ No newline at end of file
+    return schemas.Recipe.model_validate(db_recipe).model_dump()
+
+# --- Import-Jobs ---
+
+def get_import_job(db: Session, job_id: str, user_id: int) -> Optional[models.ImportJob]:
+    return db.query(models.ImportJob).filter(models.ImportJob.id == job_id, models.ImportJob.owner_id == user_id).first()
+
+def create_import_job(db: Session, user_id: int, kind: str, payload: str) -> models.ImportJob:
+    db_job = models.ImportJob(id=uuid.uuid4().hex, owner_id=user_id, kind=kind, payload=payload, status="queued", attempts=0)
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def start_import_job(db: Session, job_id: str) -> Optional[models.ImportJob]:
+    # Nur queued -> running, damit ein Job nie von zwei Workern gleichzeitig bearbeitet wird
+    claimed = db.query(models.ImportJob).filter(models.ImportJob.id == job_id, models.ImportJob.status == "queued").update(
+        {"status": "running", "attempts": models.ImportJob.attempts + 1, "updated_at": datetime.now(timezone.utc)}, synchronize_session=False
+    )
+    db.commit()
+    return db.get(models.ImportJob, job_id) if claimed else None
+
+def finish_import_job(db: Session, job_id: str, status: str, recipe_id: Optional[int] = None, error: Optional[str] = None, input_tokens: Optional[int] = None) -> None:
+    values = {"status": status, "recipe_id": recipe_id, "error": error, "input_tokens": input_tokens}
+    db.query(models.ImportJob).filter(models.ImportJob.id == job_id).update(values, synchronize_session=False)
+    db.commit()
+
+def touch_import_job(db: Session, job_id: str) -> None:
+    # Heartbeat: solange updated_at frisch ist, gehört der Job dem Prozess, der ihn bearbeitet
+    db.query(models.ImportJob).filter(models.ImportJob.id == job_id, models.ImportJob.status == "running").update(
+        {"updated_at": datetime.now(timezone.utc)}, synchronize_session=False
+    )
+    db.commit()
+
+def requeue_import_jobs(db: Session, max_attempts: int, stale_before: datetime) -> List[str]:
+    # Abgebrochene Jobs (kein Heartbeat seit stale_before) erneut einreihen, Dauer-Abstürzer endgültig als failed markieren
+    running = db.query(models.ImportJob).filter(models.ImportJob.status == "running", models.ImportJob.updated_at < stale_before)
+    running.filter(models.ImportJob.attempts >= max_attempts).update({"status": "failed", "error": "Import aborted"}, synchronize_session=False)
+    running.filter(models.ImportJob.attempts < max_attempts).update({"status": "queued"}, synchronize_session=False)
+    db.commit()
+
+    queued = db.query(models.ImportJob.id).filter(models.ImportJob.status == "queued").order_by(models.ImportJob.created_at)
+    return [job_id for job_id, in queued]
+
+# --- Async-Varianten ---
+# run_sync führt dieselbe Logik auf der Verbindung der AsyncSession aus (Greenlet im Event Loop statt Threadpool)
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[models.User]:
+    return await db.run_sync(lambda session: get_user_by_email(session, email=email))
+
+async def create_recipe_async(db: AsyncSession, item: schemas.RecipeCreate, user_id: int) -> models.Recipe:
+    return await db.run_sync(lambda session: create_recipe(session, item=item, user_id=user_id))
+
+async def get_recipe_by_url_async(url: str, db: AsyncSession) -> Optional[dict]:
+    return await db.run_sync(lambda session: get_recipe_by_url(url=url, db=session))
+
+async def get_nutrients_by_ids_async(id_slugs: List[str], db: AsyncSession) -> Dict[str, dict]:
+    return await db.run_sync(lambda session: {slug: nutrients_to_dict(row) for slug, row in get_nutrients_by_ids(id_slugs, session).items()})
+
+async def upsert_nutrients_async(db: AsyncSession, nutrients_by_slug: Dict[str, dict]) -> Dict[str, dict]:
+    return await db.run_sync(lambda session: {slug: nutrients_to_dict(row) for slug, row in upsert_nutrients(session, nutrients_by_slug).items()})
+
+async def get_import_job_async(db: AsyncSession, job_id: str, user_id: int) -> Optional[models.ImportJob]:
+    return await db.run_sync(lambda session: get_import_job(session, job_id=job_id, user_id=user_id))
+
+async def create_import_job_async(db: AsyncSession, user_id: int, kind: str, payload: str) -> models.ImportJob:
+    return await db.run_sync(lambda session: create_import_job(session, user_id=user_id, kind=kind, payload=payload))
+
+async def start_import_job_async(db: AsyncSession, job_id: str) -> Optional[models.ImportJob]:
+    return await db.run_sync(lambda session: start_import_job(session, job_id=job_id))
+
+async def finish_import_job_async(db: AsyncSession, job_id: str, status: str, recipe_id: Optional[int] = None, error: Optional[str] = None, input_tokens: Optional[int] = None) -> None:
+    await db.run_sync(lambda session: finish_import_job(session, job_id=job_id, status=status, recipe_id=recipe_id, error=error, input_tokens=input_tokens))
+
+async def touch_import_job_async(db: AsyncSession, job_id: str) -> None:
+    await db.run_sync(lambda session: touch_import_job(session, job_id=job_id))
+
+async def requeue_import_jobs_async(db: AsyncSession, max_attempts: int, stale_before: datetime) -> List[str]:
+    return await db.run_sync(lambda session: requeue_import_jobs(session, max_attempts=max_attempts, stale_before=stale_before))
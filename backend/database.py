@@ -1,16 +1,77 @@
-from sqlalchemy import create_engine
+import importlib.util
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Asynchrone Treiber für dieselbe Datenbank (aiosqlite lokal, asyncpg für PostgreSQL)
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+ASYNC_DRIVER_MODULES = {"sqlite+aiosqlite": "aiosqlite", "postgresql+asyncpg": "asyncpg"}
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False) if driver else url
+
+def _check_async_driver(url: str, explicit: bool) -> None:
+    drivername = make_url(url).drivername
+    module = ASYNC_DRIVER_MODULES.get(drivername)
+
+    # Lieber beim Start klar abbrechen als beim ersten Import mit einem kryptischen Treiberfehler
+    if module is None and not explicit:
+        raise RuntimeError(f"No async driver known for '{drivername}', set ASYNC_DATABASE_URL to an async database URL")
+    if module is not None and importlib.util.find_spec(module) is None:
+        raise RuntimeError(f"Async database driver '{module}' is not installed (pip install {module})")
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or to_async_url(SQLALCHEMY_DATABASE_URL)
+_check_async_driver(ASYNC_DATABASE_URL, explicit=bool(settings.ASYNC_DATABASE_URL))
+
+def engine_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        connect_args = {"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if make_url(url).drivername == "sqlite":
+            connect_args["check_same_thread"] = False
+        return {"connect_args": connect_args}
+
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS
+    }
+
+def register_sqlite_pragmas(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+
+    # PRAGMAs gelten pro Verbindung und werden deshalb bei jedem Connect gesetzt
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        # Negativer Wert = Größe in KiB statt in Seiten
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.close()
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+register_sqlite_pragmas(engine)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+register_sqlite_pragmas(async_engine.sync_engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# expire_on_commit=False: ORM-Objekte bleiben nach dem Commit lesbar, ohne nachzuladen (kein Lazy-IO im Event Loop)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -18,4 +79,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,34 +1,66 @@
 from fastapi import FastAPI
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import models
-from database import engine
-from routers import recipes, users, auth
+from database import engine, async_engine
+from migrations import sync_schema
+from routers import recipes, users, auth, admin
+from services import nutrients_calculator
+from services.import_jobs import import_worker
+from services import image_gc, transcription, html_cleaner
+from utils import password_hashing, image_utils, http_client
+from utils.static_files import ImmutableStaticFiles
 from config import settings
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from limiter import limiter
 from pathlib import Path
+import asyncio
 
 origins = settings.FRONTEND_URLS
 
 
 models.Base.metadata.create_all(bind=engine)
+sync_schema(engine)
 
 # Sicherstellen, dass das Upload-Verzeichnis existiert, bevor StaticFiles initialisiert wird
 Path(settings.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fehlende Abhängigkeiten des Transkriptions-Backends sofort melden
+    transcription.check_backend()
+    # Häufig genutzte Nährwerte vorab in den Cache laden
+    await asyncio.to_thread(nutrients_calculator.warm_up_cache)
+    # Offene Import-Jobs (auch aus einem vorherigen Prozess) übernehmen
+    await import_worker.start()
+    # Bilder ohne Rezept-Referenz regelmäßig aufräumen
+    image_gc_task = asyncio.create_task(image_gc.run_periodically())
+    yield
+    image_gc_task.cancel()
+    await import_worker.stop()
+    password_hashing.shutdown()
+    image_utils.shutdown()
+    transcription.shutdown()
+    html_cleaner.shutdown()
+    # Offene Keep-Alive-Verbindungen des gemeinsamen HTTP-Clients schließen
+    await http_client.close()
+    # Gepoolte aiosqlite-Verbindungen halten eigene Threads, die sonst das Beenden blockieren
+    await async_engine.dispose()
 
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+app = FastAPI(lifespan=lifespan)
+
+# Uploads sind unveränderlich: langes Caching mit immutable, ETag und Range-Requests
+app.mount("/uploads", ImmutableStaticFiles(directory=settings.UPLOAD_DIR, accel_redirect_prefix=settings.UPLOADS_ACCEL_REDIRECT_PREFIX), name="uploads")
 
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-app.add_middleware(CORSMiddleware, allow_origins= origins, allow_credentials= True, allow_methods=["*"], allow_headers= ["*"])
+app.add_middleware(CORSMiddleware, allow_origins= origins, allow_credentials= True, allow_methods=["*"], allow_headers= ["*"], expose_headers=["X-Next-Cursor", "Location"])
 app.include_router(recipes.recipe_router, prefix="/recipes")
 app.include_router(users.users_router, prefix="/users")
 app.include_router(auth.auth_router)
+app.include_router(admin.admin_router, prefix="/admin")
 
 @app.get("/")
 def read_root():
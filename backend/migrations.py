@@ -0,0 +1,84 @@
+from sqlalchemy import inspect, select, func
+from sqlalchemy.engine import Engine, Connection
+from sqlalchemy.schema import CreateColumn
+from database import Base
+import models
+import crud
+from utils.url_utils import canonicalize_url
+import search_index
+
+
+# create_all legt nur fehlende Tabellen an. Für bestehende Datenbanken werden hier
+# neu hinzugekommene Spalten und Indizes nachgezogen.
+def sync_schema(engine: Engine) -> None:
+    inspector = inspect(engine)
+
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
+        search_index.ensure_index(connection)
+        _backfill_recipe_tags(connection)
+        _backfill_recipe_nutrients(connection)
+        _backfill_canonical_urls(connection)
+        _backfill_image_refs(connection)
+
+
+def _backfill_recipe_tags(connection: Connection) -> None:
+    recipe_tags = models.RecipeTag.__table__
+    if connection.execute(select(func.count()).select_from(recipe_tags)).scalar():
+        return
+
+    recipes = connection.execute(select(models.Recipe.id, models.Recipe.owner_id, models.Recipe.content))
+    rows = [
+        {"recipe_id": recipe_id, "tag": tag, "owner_id": owner_id}
+        for recipe_id, owner_id, content in recipes
+        for tag in set((content or {}).get("tags", []))
+    ]
+    if rows:
+        connection.execute(recipe_tags.insert(), rows)
+
+
+def _backfill_recipe_nutrients(connection: Connection) -> None:
+    recipes = models.Recipe.__table__
+    pending = connection.execute(
+        select(recipes.c.id, recipes.c.content).where(recipes.c.servings.is_(None), recipes.c.content.is_not(None))
+    ).all()
+
+    for recipe_id, content in pending:
+        connection.execute(recipes.update().where(recipes.c.id == recipe_id).values(**crud.recipe_nutrient_columns(content)))
+
+
+def _backfill_canonical_urls(connection: Connection) -> None:
+    # Ältere Imports speichern die URL wie eingegeben, Lookups laufen inzwischen über die kanonische Form
+    recipes = models.Recipe.__table__
+    rows = connection.execute(select(recipes.c.id, recipes.c.url).where(recipes.c.url.is_not(None), recipes.c.url != "")).all()
+
+    for recipe_id, url in rows:
+        canonical_url = canonicalize_url(url)
+        if canonical_url != url:
+            connection.execute(recipes.update().where(recipes.c.id == recipe_id).values(url=canonical_url))
+
+
+def _backfill_image_refs(connection: Connection) -> None:
+    # Zähler einmalig aus den bestehenden Rezepten aufbauen
+    image_refs = models.ImageRef.__table__
+    if connection.execute(select(func.count()).select_from(image_refs)).scalar():
+        return
+
+    recipes = models.Recipe.__table__
+    counts = connection.execute(
+        select(recipes.c.image, func.count()).where(recipes.c.image.like("/uploads/%")).group_by(recipes.c.image)
+    ).all()
+    if counts:
+        connection.execute(image_refs.insert(), [{"image": image, "ref_count": count} for image, count in counts])
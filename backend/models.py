@@ -1,7 +1,10 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON, Float, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, JSON, Float, Boolean, Index, DateTime, Text
+from datetime import datetime, timezone
 from sqlalchemy.orm import relationship
 from database import Base
 
+NUTRIENT_COLUMNS = ("kcal", "protein", "fat", "saturated_fat", "carbs", "sugar", "fiber", "salt")
+
 class User(Base):
 
     __tablename__ = "users"
@@ -19,11 +22,61 @@ class Recipe(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     content = Column(JSON)
-    url = Column(String)
+    url = Column(String, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="recipes")
     image = Column(String)
-    nutrients = Column(JSON)
+    # Verkleinerte AVIF/WebP-Varianten des Bildes, siehe image_utils.variants_for
+    image_variants = Column(JSON, nullable=True)
+    tags = relationship("RecipeTag", back_populates="recipe", cascade="all, delete-orphan")
+
+    # Aus content["nutrients"] abgeleitet, damit Nährwert-Abfragen als Index-Range-Scan laufen
+    servings = Column(Integer)
+
+    kcal = Column(Float)
+    protein = Column(Float)
+    fat = Column(Float)
+    saturated_fat = Column(Float)
+    carbs = Column(Float)
+    sugar = Column(Float)
+    fiber = Column(Float)
+    salt = Column(Float)
+
+    kcal_per_serving = Column(Float)
+    protein_per_serving = Column(Float)
+    fat_per_serving = Column(Float)
+    saturated_fat_per_serving = Column(Float)
+    carbs_per_serving = Column(Float)
+    sugar_per_serving = Column(Float)
+    fiber_per_serving = Column(Float)
+    salt_per_serving = Column(Float)
+
+    # Keyset-Pagination über (owner_id, id) statt OFFSET, Nährwert-Indizes pro User
+    __table_args__ = (
+        Index("ix_recipes_owner_id_id", "owner_id", "id"),
+        *(Index(f"ix_recipes_owner_id_{field}", "owner_id", field) for field in NUTRIENT_COLUMNS),
+        *(Index(f"ix_recipes_owner_id_{field}_per_serving", "owner_id", f"{field}_per_serving") for field in NUTRIENT_COLUMNS),
+    )
+
+class RecipeTag(Base):
+
+    __tablename__ = "recipe_tags"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    recipe = relationship("Recipe", back_populates="tags")
+
+    # Tag-Filter und Tag-Zählung pro User laufen komplett über diesen Index
+    __table_args__ = (Index("ix_recipe_tags_owner_id_tag_recipe_id", "owner_id", "tag", "recipe_id"),)
+
+class ImageRef(Base):
+
+    __tablename__ = "image_refs"
+
+    # Pfad wie in recipes.image ("/uploads/<sha256>.jpg"), Anzahl der Rezepte, die das Bild verwenden
+    image = Column(String, primary_key=True)
+    ref_count = Column(Integer, default=0)
 
 class IngredientNutrients(Base):
 
@@ -46,3 +99,26 @@ class InviteCode(Base):
     id = Column(Integer, primary_key=True, index=True)
     code = Column(String, index=True)
     usages = Column(Integer)
+
+
+class ImportJob(Base):
+
+    __tablename__ = "import_jobs"
+
+    id = Column(String, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    # "url" oder "user_input", payload ist die URL bzw. der eingegebene Text
+    kind = Column(String)
+    payload = Column(Text)
+    # queued -> running -> done | not_found | failed
+    status = Column(String, default="queued")
+    attempts = Column(Integer, default=0)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="SET NULL"), nullable=True)
+    error = Column(String, nullable=True)
+    # Geschätzte Eingabe-Tokens aller LLM-Aufrufe des Jobs (tiktoken), None bei Cache-Treffer
+    input_tokens = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    # Worker holt offene Jobs in Eingangsreihenfolge
+    __table_args__ = (Index("ix_import_jobs_status_created_at", "status", "created_at"),)
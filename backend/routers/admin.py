@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+import schemas
+from routers.auth import is_user_admin
+from cache import nutrients_cache, user_cache, token_cache
+from utils import password_hashing, http_client
+from services.ai_content_normalizer import llm_cache
+from services.ai_image_generator import image_cache
+from services.import_jobs import import_worker
+from services import transcription
+
+admin_router = APIRouter()
+
+@admin_router.get("/metrics", response_model=dict)
+def get_metrics(admin: schemas.CurrentUser = Depends(is_user_admin)):
+    return {
+        "nutrients_cache": nutrients_cache.stats(),
+        # Jeder Treffer im user_cache ist eine eingesparte User-Abfrage
+        "user_cache": {**user_cache.stats(), "db_queries_saved": user_cache.hits},
+        "token_cache": token_cache.stats(),
+        "password_hashing": password_hashing.stats(),
+        "llm_cache": llm_cache.stats(),
+        "image_cache": image_cache.stats(),
+        "import_jobs": import_worker.stats(),
+        "transcription": transcription.stats(),
+        "http_client": http_client.stats()
+    }
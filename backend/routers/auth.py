@@ -1,12 +1,15 @@
 from fastapi import HTTPException, Request, Depends, APIRouter, Response
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 from jose import jwt
-import models, crud
+import schemas, crud
 from database import get_db
 from datetime import datetime, timedelta, timezone
 from config import settings
+from cache import user_cache, token_cache
+from utils import password_hashing
 
 auth_router = APIRouter()
 
@@ -24,7 +27,17 @@ def create_access_token(data:dict) -> str:
 
     return token
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.User:
+def _decode_token(token: str) -> dict:
+    # Bereits verifizierte Tokens nicht erneut dekodieren, solange sie nicht abgelaufen sind
+    token_data = token_cache.get(token)
+    if token_data and token_data.get("exp", 0) > datetime.now(timezone.utc).timestamp():
+        return token_data
+
+    token_data = jwt.decode(token, key= SECRET_KEY, algorithms=[ALGORITHM])
+    token_cache.set(token, token_data)
+    return token_data
+
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> schemas.CurrentUser:
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
@@ -35,7 +48,7 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.
         raise credentials_exception
     
     try:
-        token_data = jwt.decode(token, key= SECRET_KEY, algorithms=[ALGORITHM])
+        token_data = _decode_token(token)
         user_email = token_data.get("sub")
 
         if not user_email: raise credentials_exception
@@ -43,24 +56,43 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.
     except jwt.JWTError:
         raise credentials_exception
     
-    user = crud.get_user_by_email(db=db, email=user_email) 
-    if not user:
+    # Cache-Treffer spart die User-Abfrage gegen die Datenbank
+    user = user_cache.get(user_email)
+    if user:
+        return user
+
+    db_user = crud.get_user_by_email(db=db, email=user_email) 
+    if not db_user:
         raise credentials_exception
 
+    user = schemas.CurrentUser.model_validate(db_user)
+    user_cache.set(user_email, user)
     return user  
 
-def is_user_admin(current_user: models.User = Depends(get_current_user)) -> models.User:
+def is_user_admin(current_user: schemas.CurrentUser = Depends(get_current_user)) -> schemas.CurrentUser:
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin privileges required")
     return current_user
     
 @auth_router.post("/token", response_model=dict)
-def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
 
-    user = crud.get_user_by_email(db, email=form_data.username)
+    user = await run_in_threadpool(crud.get_user_by_email, db, email=form_data.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Incorrect email or password.", headers={"WWW-Authenticate": "Bearer"},)
+
+    # bcrypt läuft im eigenen Prozess-Pool und blockiert so weder Event Loop noch AnyIO-Threadpool
+    try:
+        is_valid, new_hash = await password_hashing.verify_password(form_data.password, user.hashed_password)
+    except password_hashing.PasswordHashingBusyError:
+        raise HTTPException(status_code=503, detail="Too many login attempts, please retry.", headers={"Retry-After": "1"})
 
-    if not user or not crud.verify_password(form_data.password, user.hashed_password):
+    if not is_valid:
         raise HTTPException(status_code=401, detail="Incorrect email or password.", headers={"WWW-Authenticate": "Bearer"},)
+
+    # Hash mit veralteten Kosten-Parametern transparent erneuern
+    if new_hash:
+        await run_in_threadpool(crud.update_password_hash, db, user, new_hash)
     
     access_token = create_access_token(data={"sub": user.email})
     
@@ -90,7 +122,7 @@ def delete_token(response: Response):
     return {"message": "Logout successful"}
 
 @auth_router.post("/invite-code", response_model=dict)
-def create_invite_code(code: str, db: Session = Depends(get_db), admin: models.User = Depends(is_user_admin)):
+def create_invite_code(code: str, db: Session = Depends(get_db), admin: schemas.CurrentUser = Depends(is_user_admin)):
     crud.create_invite_code(db=db,code=code)
 
     return {"detail": f"Invite Code '{code}' created successfully"}
\ No newline at end of file
@@ -1,85 +1,133 @@
-from fastapi import Depends, HTTPException, APIRouter, Request
+from fastapi import Depends, HTTPException, APIRouter, Request, Response, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-import models, schemas, crud
-from services import website_content_generator
-from services import tiktok_content_generator
-from services import user_content_generator
-from database import get_db
-from fastapi.concurrency import run_in_threadpool
-from typing import List
+import schemas, crud, search_index
+from services.import_jobs import import_worker
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db
+from typing import List, Optional, Annotated
 from routers.auth import get_current_user
 from limiter import limiter
+from utils.progress import progress, TERMINAL_STAGES
+import asyncio
+import json
 
 recipe_router = APIRouter()
 
+async def _enqueue_import(response: Response, db: AsyncSession, user_id: int, kind: str, payload: str) -> schemas.ImportJob:
+    job = await crud.create_import_job_async(db=db, user_id=user_id, kind=kind, payload=payload)
+    import_worker.enqueue(job.id)
+
+    response.headers["Location"] = f"/recipes/jobs/{job.id}"
+    return job
+
 @recipe_router.post("/", response_model=schemas.Recipe)
-def create_recipe(recipe: schemas.RecipeCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def create_recipe(recipe: schemas.RecipeCreate, db: Session = Depends(get_db), current_user: schemas.CurrentUser = Depends(get_current_user)):
     return crud.create_recipe(db=db, item=recipe, user_id=current_user.id)
 
 @recipe_router.get("/", response_model=List[schemas.Recipe])
-def get_recipes(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
-    recipes = crud.get_recipes(db=db, skip=skip, limit= limit, user_id=current_user.id)
+def get_recipes(response: Response, current_user: schemas.CurrentUser = Depends(get_current_user), db: Session = Depends(get_db), q: Optional[str] = None, tag: List[str] = Query(default=[]), cursor: Optional[int] = None, limit: int = Query(default=100, ge=1, le=500)):
+    recipes = crud.get_recipes(db=db, q=q, tags=tag, cursor=cursor, limit= limit, user_id=current_user.id)
+
+    # Volle Seite -> es kann weitere Rezepte geben, der Client fragt mit diesem Cursor weiter
+    if len(recipes) == limit:
+        response.headers["X-Next-Cursor"] = str(recipes[-1].id)
+
     return recipes
 
-@recipe_router.get("/{recipe_id}", response_model=schemas.Recipe)
-def get_recipe_by_id(recipe_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    recipe = crud.get_recipe_by_id(user_id=current_user.id, db=db, recipe_id=recipe_id)
-    
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Not Found")
-    
-    return recipe
+@recipe_router.get("/tags", response_model=List[schemas.TagCount])
+def get_tag_counts(current_user: schemas.CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    return crud.get_tag_counts(user_id=current_user.id, db=db)
 
-@recipe_router.post("/from-url", response_model=schemas.Recipe)
-@limiter.limit("3/minute")
-async def create_recipe_from_url(request: Request, url: str, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+@recipe_router.get("/by-nutrients", response_model=List[schemas.Recipe])
+def get_recipes_by_nutrients(nutrient_filter: Annotated[schemas.NutrientFilter, Query()], current_user: schemas.CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    return crud.get_recipes_by_nutrients(user_id=current_user.id, db=db, nutrient_filter=nutrient_filter)
 
-    data = await run_in_threadpool(crud.get_recipe_by_url, db=db, url=url)
-    if not data: 
-        try:
-            if "tiktok.com" in url:
-                data = await tiktok_content_generator.transcribe_and_generate(url)
-            else:
-                data = await website_content_generator.scrape_and_generate(url)
-        except ValueError as e:
-            raise HTTPException(status_code=404, detail=str(e))
+@recipe_router.get("/search", response_model=List[schemas.Recipe])
+def search_recipes(q: str = Query(min_length=1), limit: int = Query(default=20, ge=1, le=100), current_user: schemas.CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    return search_index.search_recipes(db=db, user_id=current_user.id, q=q, limit=limit)
 
-    recipe_title = data.get("title", "Unbekannt")
-    recipe_content = data.get("content")
-    recipe_image = data.get("image")
+@recipe_router.get("/jobs/{job_id}", response_model=schemas.ImportJob)
+def get_import_job(job_id: str, current_user: schemas.CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    job = crud.get_import_job(db=db, job_id=job_id, user_id=current_user.id)
 
-    recipe_in = schemas.RecipeCreate(title=recipe_title, content=recipe_content, url=url, image=recipe_image)
+    if not job:
+        raise HTTPException(status_code=404, detail="Not Found")
 
-    return await run_in_threadpool(crud.create_recipe, db=db, item=recipe_in, user_id=current_user.id)
+    return job
 
-@recipe_router.post("/from-user-input", response_model=schemas.Recipe)
-@limiter.limit("3/minute")
-async def create_recipe_from_user_input(request: Request, input_data: schemas.UserInput, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def _sse(stage: str, data: dict) -> str:
+    return f"event: {stage}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
+async def _job_events(job_id: str, queue: asyncio.Queue):
     try:
-        data = await user_content_generator.generate_from_input(user_input=input_data.user_input)
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=15.0)
+            except asyncio.TimeoutError:
+                # Kommentarzeile als Keep-Alive, damit Proxies die Verbindung nicht schließen
+                yield ": keep-alive\n\n"
+                continue
+
+            yield _sse(event["stage"], event["data"])
+            if event["stage"] in TERMINAL_STAGES:
+                return
+    finally:
+        progress.unsubscribe(job_id, queue)
+
+# Server-Sent Events: fetched, cleaned, llm_first_token, title, ingredients, nutrients, image, danach done | not_found | failed
+@recipe_router.get("/jobs/{job_id}/events")
+async def get_import_job_events(job_id: str, current_user: schemas.CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    # Erst abonnieren, dann den Status lesen: so geht kein Event zwischen beiden Schritten verloren
+    queue = progress.subscribe(job_id)
+    job = await crud.get_import_job_async(db=db, job_id=job_id, user_id=current_user.id)
+
+    if not job:
+        progress.unsubscribe(job_id, queue)
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    # Bereits abgeschlossen: nur noch den Endzustand senden
+    if job.status in TERMINAL_STAGES:
+        progress.unsubscribe(job_id, queue)
+        queue = asyncio.Queue()
+        queue.put_nowait({"stage": job.status, "data": schemas.ImportJob.model_validate(job).model_dump()})
 
-    recipe_title = data.get("title", "Unbekannt")
-    recipe_content = data.get("content")
-    recipe_image = data.get("image")
+    return StreamingResponse(
+        _job_events(job_id, queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
+@recipe_router.get("/{recipe_id}", response_model=schemas.Recipe)
+def get_recipe_by_id(recipe_id: int, current_user: schemas.CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    recipe = crud.get_recipe_by_id(user_id=current_user.id, db=db, recipe_id=recipe_id)
+    
+    if not recipe:
+        raise HTTPException(status_code=404, detail="Not Found")
     
-    recipe_in = schemas.RecipeCreate(title=recipe_title, content=recipe_content, image=recipe_image)
+    return recipe
 
-    return await run_in_threadpool(crud.create_recipe, db=db, item=recipe_in, user_id=current_user.id)
+# Imports laufen im Hintergrund: Antwort sofort mit 202 und Job-ID, Status über /recipes/jobs/{id}
+@recipe_router.post("/from-url", response_model=schemas.ImportJob, status_code=202)
+@limiter.limit("3/minute")
+async def create_recipe_from_url(request: Request, response: Response, url: str, db: AsyncSession = Depends(get_async_db), current_user: schemas.CurrentUser = Depends(get_current_user)):
+    return await _enqueue_import(response, db, user_id=current_user.id, kind="url", payload=url.strip())
+
+@recipe_router.post("/from-user-input", response_model=schemas.ImportJob, status_code=202)
+@limiter.limit("3/minute")
+async def create_recipe_from_user_input(request: Request, response: Response, input_data: schemas.UserInput, db: AsyncSession = Depends(get_async_db), current_user: schemas.CurrentUser = Depends(get_current_user)):
+    return await _enqueue_import(response, db, user_id=current_user.id, kind="user_input", payload=input_data.user_input)
 
 
 @recipe_router.delete("/{recipe_id}", response_model=dict)
-def delete_recipe(recipe_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def delete_recipe(recipe_id: int, current_user: schemas.CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     if not crud.delete_recipe(recipe_id=recipe_id, user_id=current_user.id, db=db):
         raise HTTPException(status_code=404, detail="Not Found")
     
     return {"detail": "Recipe deleted"}
 
 @recipe_router.put("/{recipe_id}", response_model=schemas.Recipe)
-def update_recipe(recipe_id: int, updates: schemas.RecipeUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def update_recipe(recipe_id: int, updates: schemas.RecipeUpdate, db: Session = Depends(get_db), current_user: schemas.CurrentUser = Depends(get_current_user)):
     updated_recipe = crud.update_recipe(recipe_id=recipe_id, updates=updates, db=db, user_id=current_user.id)
     if not updated_recipe:
         raise HTTPException(status_code=404, detail="Not Found")
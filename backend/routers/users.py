@@ -1,22 +1,30 @@
 from fastapi import Depends, HTTPException, APIRouter
 from sqlalchemy.orm import Session
-import models, schemas, crud
+import schemas, crud
 from database import get_db
 from routers.auth import get_current_user
+from fastapi.concurrency import run_in_threadpool
+from utils import password_hashing
 
 users_router = APIRouter()
 
 @users_router.post("/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    if not crud.use_invite_code(db=db, code=user.invite_code):
+    # Hash vor dem Einlösen des Invite Codes berechnen, damit Überlast keinen Code verbraucht
+    try:
+        hashed_password = await password_hashing.hash_password(user.password)
+    except password_hashing.PasswordHashingBusyError:
+        raise HTTPException(status_code=503, detail="Too many signups, please retry.", headers={"Retry-After": "1"})
+
+    if not await run_in_threadpool(crud.use_invite_code, db=db, code=user.invite_code):
         raise HTTPException(status_code=400, detail="Invalid Invite Code")
     
-    return crud.create_user(db=db, user=user)
+    return await run_in_threadpool(crud.create_user, db=db, user=user, hashed_password=hashed_password)
 
 @users_router.get("/me", response_model= schemas.User)
-def read_users_me(current_user: models.User = Depends(get_current_user)):
+def read_users_me(current_user: schemas.CurrentUser = Depends(get_current_user)):
     return current_user
\ No newline at end of file
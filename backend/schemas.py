@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
 
 class UserBase(BaseModel):
     email: str
@@ -15,6 +15,9 @@ class User(UserBase):
     # aus dem SQLAlchemy-Modell lesen darf (nicht nur aus Dicts).
     model_config = ConfigDict(from_attributes=True)
 
+class CurrentUser(User):
+    is_admin: bool = False
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -53,6 +56,7 @@ class RecipeBase(BaseModel):
 class RecipeCreate(RecipeBase):
     url: Optional[str] = ""
     image: str
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
 
 class RecipeUpdate(RecipeBase):
     pass
@@ -63,5 +67,40 @@ class Recipe(RecipeCreate):
 
     model_config = ConfigDict(from_attributes=True)
 
+class NutrientFilter(BaseModel):
+    min_kcal: Optional[float] = None
+    max_kcal: Optional[float] = None
+    min_protein: Optional[float] = None
+    max_protein: Optional[float] = None
+    min_fat: Optional[float] = None
+    max_fat: Optional[float] = None
+    min_saturated_fat: Optional[float] = None
+    max_saturated_fat: Optional[float] = None
+    min_carbs: Optional[float] = None
+    max_carbs: Optional[float] = None
+    min_sugar: Optional[float] = None
+    max_sugar: Optional[float] = None
+    min_fiber: Optional[float] = None
+    max_fiber: Optional[float] = None
+    min_salt: Optional[float] = None
+    max_salt: Optional[float] = None
+
+    # True: Grenzen gelten pro Portion, False: für das gesamte Rezept
+    per_serving: bool = True
+    limit: int = Field(default=100, ge=1, le=500)
+
+class TagCount(BaseModel):
+    tag: str
+    count: int
+
 class UserInput(BaseModel):
-    user_input: str
\ No newline at end of file
+    user_input: str
+
+class ImportJob(BaseModel):
+    id: str
+    status: str
+    recipe_id: Optional[int] = None
+    error: Optional[str] = None
+    input_tokens: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,153 @@
+import re
+from typing import List
+from sqlalchemy import DDL, event, func, text, literal_column, select, table, column
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+import models
+
+FTS_TABLE = "recipes_fts"
+TITLE_TABLE = "recipes_title_trigram"
+
+# Infix-Titelsuche (title LIKE '%q%') braucht mindestens ein Trigramm
+MIN_TRIGRAM_QUERY = 3
+
+# SQLite: FTS5-Tabelle, rowid entspricht der Rezept-id. owner_id wird nur gespeichert, nicht indiziert.
+SQLITE_CREATE = DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(title, ingredients, steps, owner_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+)
+SQLITE_DROP = DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+# SQLite: Trigramm-Index über den Titel, damit LIKE '%q%' (Dashboard-Suche) nicht jeden Titel scannt
+SQLITE_TITLE_CREATE = DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TITLE_TABLE} USING fts5(title, owner_id UNINDEXED, tokenize='trigram')"
+)
+SQLITE_TITLE_DROP = DDL(f"DROP TABLE IF EXISTS {TITLE_TABLE}")
+
+INSERT_FTS = text(f"INSERT INTO {FTS_TABLE} (rowid, title, ingredients, steps, owner_id) VALUES (:rowid, :title, :ingredients, :steps, :owner_id)")
+INSERT_TITLE = text(f"INSERT INTO {TITLE_TABLE} (rowid, title, owner_id) VALUES (:rowid, :title, :owner_id)")
+
+# PostgreSQL: GIN-Index über denselben tsvector-Ausdruck, den die Suche verwendet (wird automatisch gepflegt)
+PG_DOCUMENT = "coalesce(title, '') || ' ' || coalesce(content::text, '')"
+PG_CREATE = DDL(f"CREATE INDEX IF NOT EXISTS ix_recipes_fulltext ON recipes USING GIN (to_tsvector('german', {PG_DOCUMENT}))")
+
+# PostgreSQL: pg_trgm-Index, den ILIKE '%q%' direkt nutzt
+PG_TRGM_EXTENSION = DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+PG_TITLE_CREATE = DDL("CREATE INDEX IF NOT EXISTS ix_recipes_title_trgm ON recipes USING GIN (title gin_trgm_ops)")
+
+event.listen(models.Recipe.__table__, "after_create", SQLITE_CREATE.execute_if(dialect="sqlite"))
+event.listen(models.Recipe.__table__, "before_drop", SQLITE_DROP.execute_if(dialect="sqlite"))
+event.listen(models.Recipe.__table__, "after_create", SQLITE_TITLE_CREATE.execute_if(dialect="sqlite"))
+event.listen(models.Recipe.__table__, "before_drop", SQLITE_TITLE_DROP.execute_if(dialect="sqlite"))
+event.listen(models.Recipe.__table__, "after_create", PG_CREATE.execute_if(dialect="postgresql"))
+event.listen(models.Recipe.__table__, "after_create", PG_TRGM_EXTENSION.execute_if(dialect="postgresql"))
+event.listen(models.Recipe.__table__, "after_create", PG_TITLE_CREATE.execute_if(dialect="postgresql"))
+
+# Gewichtung für bm25: Treffer im Titel zählen mehr als in Zutaten, diese mehr als in Schritten
+BM25_WEIGHTS = "10.0, 5.0, 1.0, 0.0"
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _document(recipe: models.Recipe) -> dict:
+    content = recipe.content or {}
+    ingredients = content.get("ingredients", [])
+
+    return {
+        "rowid": recipe.id,
+        "title": recipe.title or "",
+        # Deutscher Name und englischer search_term, damit beide Sprachen gefunden werden
+        "ingredients": " ".join(f"{ing.get('name') or ''} {ing.get('search_term') or ''}" for ing in ingredients),
+        "steps": " ".join(content.get("steps", [])),
+        "owner_id": recipe.owner_id
+    }
+
+def _fts_query(q: str) -> str:
+    # Jedes Wort als Präfix-Suche, alle Wörter müssen vorkommen. Quotes verhindern FTS5-Syntaxfehler.
+    return " ".join(f'"{token}"*' for token in re.findall(r"\w+", q))
+
+def _backfill(connection: Connection, table: str, insert) -> None:
+    # Bestehende Rezepte einmalig übernehmen, wenn der Index neu angelegt wurde
+    if connection.execute(text(f"SELECT count(*) FROM {table}")).scalar():
+        return
+
+    documents = [_document(recipe) for recipe in connection.execute(models.Recipe.__table__.select())]
+    if documents:
+        connection.execute(insert, documents)
+
+def ensure_index(connection: Connection) -> None:
+    dialect = connection.dialect.name
+
+    if dialect == "postgresql":
+        connection.execute(PG_CREATE)
+        connection.execute(PG_TRGM_EXTENSION)
+        connection.execute(PG_TITLE_CREATE)
+        return
+
+    if dialect != "sqlite":
+        return
+
+    connection.execute(SQLITE_CREATE)
+    connection.execute(SQLITE_TITLE_CREATE)
+    _backfill(connection, FTS_TABLE, INSERT_FTS)
+    _backfill(connection, TITLE_TABLE, INSERT_TITLE)
+
+def index_recipe(db: Session, recipe: models.Recipe) -> None:
+    if db.get_bind().dialect.name != "sqlite":
+        return
+
+    remove_recipe(db, recipe.id)
+    document = _document(recipe)
+    db.execute(INSERT_FTS, document)
+    db.execute(INSERT_TITLE, document)
+
+def remove_recipe(db: Session, recipe_id: int) -> None:
+    if db.get_bind().dialect.name != "sqlite":
+        return
+
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :rowid"), {"rowid": recipe_id})
+    db.execute(text(f"DELETE FROM {TITLE_TABLE} WHERE rowid = :rowid"), {"rowid": recipe_id})
+
+def title_contains(db: Session, user_id: int, q: str):
+    pattern = f"%{escape_like(q)}%"
+
+    # Der Trigramm-Index unterstützt kein ESCAPE, Suchen mit Wildcard-Zeichen laufen daher ohne Index
+    if db.get_bind().dialect.name == "sqlite" and len(q) >= MIN_TRIGRAM_QUERY and pattern == f"%{q}%":
+        matching_ids = select(literal_column("rowid")).select_from(table(TITLE_TABLE, column("title"), column("owner_id"))).where(
+            literal_column("title").like(pattern), literal_column("owner_id") == user_id
+        )
+        return models.Recipe.id.in_(matching_ids)
+
+    return models.Recipe.title.ilike(pattern, escape="\\")
+
+def search_recipes(db: Session, user_id: int, q: str, limit: int = 20) -> List[models.Recipe]:
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        match = _fts_query(q)
+        if not match:
+            return []
+
+        rows = db.execute(
+            text(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match AND owner_id = :owner_id "
+                f"ORDER BY bm25({FTS_TABLE}, {BM25_WEIGHTS}) LIMIT :limit"
+            ),
+            {"match": match, "owner_id": user_id, "limit": limit}
+        )
+        ranked_ids = [row.rowid for row in rows]
+
+        recipes = db.query(models.Recipe).filter(models.Recipe.id.in_(ranked_ids)).all()
+        by_id = {recipe.id: recipe for recipe in recipes}
+        return [by_id[recipe_id] for recipe_id in ranked_ids if recipe_id in by_id]
+
+    query = db.query(models.Recipe).filter(models.Recipe.owner_id == user_id)
+
+    if dialect == "postgresql":
+        document = func.to_tsvector("german", literal_column(PG_DOCUMENT))
+        ts_query = func.plainto_tsquery("german", q)
+        return query.filter(document.op("@@")(ts_query)).order_by(func.ts_rank(document, ts_query).desc()).limit(limit).all()
+
+    # Fallback für andere Datenbanken ohne Volltextindex
+    return query.filter(models.Recipe.title.ilike(f"%{escape_like(q)}%", escape="\\")).limit(limit).all()
@@ -2,23 +2,34 @@ import json
 from google import genai
 from google.genai import types
 from services.ai_image_generator import generate_image
-from services.nutrients_calculator import calculate_nutrients
+from services.nutrients_calculator import calculate_nutrients, sum_nutrients, StreamingNutrientLookup
+from services.llm_cache import LLMCache
+from services.prompt_compaction import count_tokens
+from utils.progress import report, record_usage
+from utils.json_stream import JsonStreamParser
 import asyncio
+from utils import image_utils
 from config import settings
 
 
 client = genai.Client(api_key=settings.GEMINI_API_KEY)
 
+MODEL_NAME = "gemini-3-flash-preview"
+
 # --- RECIPE SCHEMA ---
+# propertyOrdering legt die Reihenfolge im Stream fest: Titel und visual_summary zuerst (Bild startet früh),
+# Zutaten vor den Schritten (Nährwerte werden nachgeschlagen, während das Modell noch schreibt)
 recipe_schema = {
     "type": "OBJECT",
     "required": ["title", "visual_summary", "content"],
+    "propertyOrdering": ["title", "visual_summary", "content"],
     "properties": {
         "title": {"type": "STRING"},
         "visual_summary": {"type": "STRING"},
         "content": {
             "type": "OBJECT",
             "required": ["servings", "ingredients", "steps", "cooking_time", "tags", "nutrients"],
+            "propertyOrdering": ["servings", "cooking_time", "ingredients", "steps", "tags", "nutrients"],
             "properties": {
                 "servings": {"type": "NUMBER"},
                 "cooking_time": {"type": "NUMBER"},
@@ -174,7 +185,82 @@ conf = types.GenerateContentConfig(
     thinking_config=types.ThinkingConfig(thinking_level="MINIMAL")
 )
 
+class NoRecipeFoundError(ValueError):
+    pass
+
+# --- CACHE ---
+# Ändert sich Prompt, Schema, Modell oder Konfiguration, ändert sich die Version und alte Einträge werden nie wieder getroffen
+CACHE_VERSION = LLMCache.make_key(
+    SYSTEM_INSTRUCTION,
+    json.dumps(recipe_schema, sort_keys=True, ensure_ascii=False),
+    MODEL_NAME,
+    str(conf.temperature),
+    settings.LLM_CACHE_VERSION
+)
+
+llm_cache = LLMCache(directory=settings.LLM_CACHE_DIR, max_bytes=settings.LLM_CACHE_MAX_BYTES)
+
+def _cached_image(data: dict) -> str | None:
+    # Bild aus dem Cache nur wiederverwenden, wenn die Datei noch existiert (der GC-Sweep räumt ungenutzte Bilder weg).
+    # reserve_upload erneuert die mtime, damit der Sweep es bis zu create_recipe liegen lässt
+    image = data.get("image")
+    return image if image_utils.reserve_upload(image) else None
+
+# Vollständige Werte, die schon während des Streams verarbeitet werden
+STREAM_PATHS = [("title",), ("visual_summary",), ("content", "ingredients", "*")]
+
+def _image_summary(title: str, visual_summary: str) -> str:
+    return json.dumps({"title": title, "visual_summary": visual_summary}, ensure_ascii=False)
+
+def _report_recipe(data: dict) -> None:
+    content = data["content"]
+    report("ingredients", ingredients=content["ingredients"], steps=content["steps"], servings=content["servings"])
+
 # --- FUNCTION CALL ---
+async def _stream_recipe(user_prompt: str) -> tuple[dict, asyncio.Task | None, StreamingNutrientLookup]:
+    response = await client.aio.models.generate_content_stream(
+        model=MODEL_NAME,
+        contents=user_prompt,
+        config=conf
+    )
+
+    # Inkrementell parsen: jeder Chunk wird einmal gelesen, statt den bisherigen Text pro Chunk neu zu durchsuchen
+    parser = JsonStreamParser(STREAM_PATHS)
+    chunks = []
+    title = ""
+    image_task = None
+    # Nährwerte nachschlagen, während das Modell noch schreibt (erste Angabe pro Slug gewinnt)
+    nutrient_lookup = StreamingNutrientLookup()
+
+    try:
+        async for chunk in response:
+            if not chunks:
+                report("llm_first_token")
+            text = chunk.text or ""
+            chunks.append(text)
+
+            for path, value in parser.feed(text):
+                if path == ("title",):
+                    if value == "No Recipe Found":
+                        asyncio.create_task(response.aclose()) # beendet den Stream
+                        raise NoRecipeFoundError("No recipe found")
+                    title = value
+                    report("title", title=title)
+                elif path == ("visual_summary",):
+                    image_task = asyncio.create_task(generate_image(client=client, recipe=_image_summary(title, value)))
+                elif isinstance(value, dict) and value.get("id_slug") and "per_100g" in value:
+                    nutrient_lookup.add(value["id_slug"], value["per_100g"])
+
+        data = json.loads("".join(chunks))
+    except BaseException:
+        nutrient_lookup.cancel()
+        raise
+
+    if image_task is None:
+        image_task = asyncio.create_task(generate_image(client=client, recipe=_image_summary(data["title"], data.get("visual_summary", ""))))
+    _report_recipe(data)
+    return data, image_task, nutrient_lookup
+
 async def call_gemini(content: str) -> dict:
 
     user_prompt = f"""
@@ -182,34 +268,52 @@ async def call_gemini(content: str) -> dict:
 
     {content}
     """
-    response = await client.aio.models.generate_content_stream(
-        model="gemini-3-flash-preview",
-        contents=user_prompt,
-        config=conf
-    )
 
-    full_response = ""
-    image_task = None
-    image_function_triggered = False
+    cache_key = LLMCache.make_key(CACHE_VERSION, user_prompt)
+    data = await asyncio.to_thread(llm_cache.get, cache_key) if settings.LLM_CACHE_ENABLED else None
+    image = None
 
-    async for chunk in response:
-        full_response += chunk.text
+    if data is None:
+        # Nur echte Modellaufrufe zählen, Cache-Treffer kosten keine Tokens
+        record_usage(input_tokens=count_tokens(SYSTEM_INSTRUCTION) + count_tokens(user_prompt))
+        try:
+            data, image_task, nutrient_lookup = await _stream_recipe(user_prompt)
+        except NoRecipeFoundError:
+            # Auch "kein Rezept" merken, damit identische Eingaben das Modell nicht erneut aufrufen
+            if settings.LLM_CACHE_ENABLED:
+                await asyncio.to_thread(llm_cache.set, cache_key, {"title": "No Recipe Found"})
+            raise
 
-        if not image_function_triggered and '"content":' in full_response:
-            if "No Recipe Found" in full_response:
-                asyncio.create_task(response.aclose()) # beendet den Stream
-                raise ValueError("No recipe found")
-            image_task = asyncio.create_task(generate_image(client=client, recipe=full_response))
-            image_function_triggered = True
+        if settings.LLM_CACHE_ENABLED:
+            await asyncio.to_thread(llm_cache.set, cache_key, data)
+    else:
+        if data.get("title") == "No Recipe Found":
+            raise NoRecipeFoundError("No recipe found")
+
+        report("title", title=data["title"])
+        _report_recipe(data)
 
-    data = json.loads(full_response)
+        image = _cached_image(data)
+        image_task = None
+        nutrient_lookup = None
+        if image is None:
+            image_task = asyncio.create_task(generate_image(client=client, recipe=_image_summary(data["title"], data.get("visual_summary", ""))))
 
-    nutrients = await calculate_nutrients(ingredients=data["content"]["ingredients"])
+    ingredients = data["content"]["ingredients"]
+    if nutrient_lookup is not None:
+        nutrients = sum_nutrients(ingredients, await nutrient_lookup.result(ingredients))
+    else:
+        nutrients = await calculate_nutrients(ingredients=ingredients)
+    report("nutrients", nutrients=nutrients.model_dump())
 
     if image_task:
         data["image"] = await asyncio.wait_for(image_task, timeout=25.0)
+        # Bildpfad mit in den Cache-Eintrag schreiben, damit der nächste Treffer das Bildmodell nicht mehr aufruft
+        if settings.LLM_CACHE_ENABLED and data["image"]:
+            await asyncio.to_thread(llm_cache.set, cache_key, data)
     else:
-        data["image"] = None
+        data["image"] = image
+    report("image", image=data["image"])
 
     data["content"]["nutrients"] = nutrients.model_dump()
 
@@ -1,9 +1,44 @@
 from google.genai import types
+import asyncio
+import json
 import os
+import re
+from services.image_cache import ImageCache
+from services.llm_cache import LLMCache
 from utils import image_utils
+from config import settings
+
+# Referenzbild einmal beim Import laden statt bei jedem Aufruf von der Platte zu lesen
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "style_reference.jpg"), "rb") as f:
+    REFERENCE_PART = types.Part(
+        inline_data=types.Blob(
+            mime_type="image/jpg",
+            data=f.read()
+        )
+    )
+
+image_cache = ImageCache(
+    store=LLMCache(directory=f"{settings.LLM_CACHE_DIR}/images", max_bytes=settings.IMAGE_CACHE_MAX_BYTES),
+    similarity_threshold=settings.IMAGE_CACHE_SIMILARITY_THRESHOLD
+)
+
+# recipe ist der (teilweise) gestreamte JSON-Text; title und visual_summary stehen im Schema vor content
+FIELD_PATTERN = r'"{}"\s*:\s*"((?:[^"\\]|\\.)*)"'
+
+def _field(recipe: str, name: str) -> str:
+    match = re.search(FIELD_PATTERN.format(name), recipe)
+    return json.loads(f'"{match.group(1)}"') if match else ""
 
 
-async def generate_image(client, recipe: dict) -> str:
+async def generate_image(client, recipe: str) -> str:
+    title = _field(recipe, "title")
+    visual_summary = _field(recipe, "visual_summary")
+    use_cache = settings.IMAGE_CACHE_ENABLED and bool(visual_summary)
+
+    if use_cache:
+        image_path = await asyncio.to_thread(image_cache.get, title, visual_summary)
+        if image_path:
+            return image_path
 
     prompt = f"""Rezept: {recipe}
     Erstelle ein Bild im identischen Studio-Stil wie das Referenzbild und beachte das Essen passend zum Rezept darzustellen.
@@ -19,21 +54,11 @@ async def generate_image(client, recipe: dict) -> str:
     Hintergrund, Lichtstil und Gesamtästhetik sollen konsistent bleiben.
     """
 
-    reference_image = os.path.join(os.path.dirname(os.path.abspath(__file__)), "style_reference.jpg")
-
-    with open(reference_image, "rb") as f:
-        reference_part = types.Part(
-            inline_data=types.Blob(
-                mime_type="image/jpg",
-                data=f.read()
-            )
-        )
-
     response = await client.aio.models.generate_content(
         model="gemini-2.5-flash-image",
         contents=[
             prompt,
-            reference_part
+            REFERENCE_PART
         ]
     )
 
@@ -42,4 +67,6 @@ async def generate_image(client, recipe: dict) -> str:
         if part.inline_data and part.inline_data.mime_type.startswith("image/"):
             image_bytes = part.inline_data.data
             image_path = await image_utils.process_image_bytes(image_bytes)
+            if use_cache:
+                await asyncio.to_thread(image_cache.set, title, visual_summary, image_path)
             return image_path
@@ -0,0 +1,147 @@
+import asyncio
+import html
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import lxml.html
+from lxml import etree
+from lxml.html import HtmlElement
+from services import structured_data, prompt_compaction
+from config import settings
+
+ALLOWED_TAGS = frozenset(["h1", "h2", "h3", "p", "ul", "ol", "li", "table", "tr", "td", "th"])
+DROP_TAGS = frozenset(["script", "style", "svg", "nav", "footer", "iframe", "noscript", "meta", "link"])
+
+# libxml2 ergänzt einen HTML-4-Doctype, wenn die Seite keinen hat. Ausgegeben wird nur ein echter aus dem Quelltext
+# (samt folgendem Leerraum, den libxml2 vor <html> verwirft).
+DOCTYPE_PATTERN = re.compile(r"^\s*<!(DOCTYPE[^>]*)>(\s*)", re.IGNORECASE)
+
+_parser = lxml.html.HTMLParser(encoding="utf-8")
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _escape(text: str) -> str:
+    return html.escape(text, quote=False)
+
+def _attribute(name: str, value: str) -> str:
+    # Wie BeautifulSoup: doppelte Anführungszeichen, einfache falls der Wert " enthält
+    if name == "class":
+        value = " ".join(value.split())
+    value = _escape(value)
+    if '"' in value:
+        if "'" in value:
+            return f'{name}="{value.replace(chr(34), "&quot;")}"'
+        return f"{name}='{value}'"
+    return f'{name}="{value}"'
+
+def _render_script(script: HtmlElement) -> str:
+    attributes = "".join(f" {_attribute(name, value)}" for name, value in script.attrib.items())
+    return f"<script{attributes}>{script.text or ''}</script>"
+
+def _doctype(html_content: str) -> str:
+    match = DOCTYPE_PATTERN.match(html_content)
+    if not match:
+        return ""
+    declaration, whitespace = match.groups()
+    return f"<!DOCTYPE {declaration[len('DOCTYPE '):] if declaration.startswith('DOCTYPE ') else declaration}>{whitespace}"
+
+def _strip(root: HtmlElement) -> List[HtmlElement]:
+    # Ein Durchlauf: Skripte, Navigation und Boilerplate verwerfen, dabei die obersten Block-Elemente für die Kompaktierung sammeln
+    walker = etree.iterwalk(root, events=("start", "end"))
+    dropped = []
+    blocks = []
+    block_depth = 0
+
+    for event, element in walker:
+        tag = element.tag
+        if event == "end":
+            if tag in prompt_compaction.BLOCK_TAGS:
+                block_depth -= 1
+            continue
+
+        # Auch nach skip_subtree folgt ein "end"-Event, die Block-Tiefe muss also in jedem Fall mitzählen
+        if tag in DROP_TAGS or prompt_compaction.is_boilerplate(element):
+            dropped.append(element)
+            walker.skip_subtree()
+        elif tag in prompt_compaction.BLOCK_TAGS and block_depth == 0:
+            blocks.append(element)
+
+        if tag in prompt_compaction.BLOCK_TAGS:
+            block_depth += 1
+
+    for element in dropped:
+        element.drop_tree()
+    return blocks
+
+def _serialize(root: HtmlElement, parts: List[str]) -> None:
+    # Erlaubte Tags ohne Attribute ausgeben, alle anderen auspacken. Expliziter Stack statt Rekursion (tief verschachtelte Seiten).
+    stack = [(root, False)]
+    while stack:
+        node, closing = stack.pop()
+        tag = node.tag
+
+        if closing:
+            if tag in ALLOWED_TAGS:
+                parts.append(f"</{tag}>")
+            if node.tail and node is not root:
+                parts.append(_escape(node.tail))
+            continue
+
+        if not isinstance(tag, str):
+            if tag is etree.Comment:
+                parts.append(f"<!--{node.text or ''}-->")
+            if node.tail:
+                parts.append(_escape(node.tail))
+            continue
+
+        if tag in ALLOWED_TAGS:
+            parts.append(f"<{tag}>")
+        if node.text:
+            parts.append(_escape(node.text))
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(node))
+
+def clean_html(html_content: str, max_tokens: int, structured: bool = True) -> tuple[str, str]:
+    # Läuft im Worker-Prozess. Ergebnis identisch zum bisherigen BeautifulSoup-Cleaner (Golden-Files in tests/corpus).
+    try:
+        root = lxml.html.document_fromstring(html_content.encode("utf-8"), parser=_parser)
+    except etree.ParserError:
+        return "", "html"
+
+    # Fast Path: vollständiges schema.org-Rezept (JSON-LD oder Microdata) statt der ganzen Seite
+    recipe = structured_data.extract_recipe(root) if structured else None
+    if recipe:
+        return structured_data.to_prompt(recipe), "structured"
+
+    parts = [_render_script(script) for script in root.xpath('//script[@type="application/ld+json"]')]
+    if parts:
+        parts = ["\n".join(parts)]
+    parts.append(_doctype(html_content))
+
+    # Kommentare, weitere Rezepte, doppelte Absätze usw. entfernen, bevor class/id und Links verloren gehen
+    blocks = _strip(root)
+    prompt_compaction.compact(root, blocks, max_tokens=max_tokens)
+
+    for node in reversed(list(root.itersiblings(preceding=True))):
+        _serialize(node, parts)
+    _serialize(root, parts)
+    for node in root.itersiblings():
+        _serialize(node, parts)
+
+    return " ".join("".join(parts).split()), "html"
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.HTML_CLEAN_WORKERS)
+    return _executor
+
+async def clean(html_content: str) -> tuple[str, str]:
+    # Parsen und Bereinigen großer Seiten im Prozess-Pool, damit weder Event Loop noch GIL blockiert werden
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), clean_html, html_content, settings.PROMPT_MAX_TOKENS)
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
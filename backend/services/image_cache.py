@@ -0,0 +1,95 @@
+import re
+import threading
+from typing import Optional
+from services.llm_cache import LLMCache
+from utils import image_utils
+
+# Pro normalisiertem Titel gemerkte Bilder für den Ähnlichkeitsvergleich
+MAX_ENTRIES_PER_TITLE = 20
+
+
+def normalize(text: str) -> str:
+    # Groß-/Kleinschreibung, Satzzeichen und Leerraum sollen keinen neuen Cache-Eintrag erzeugen
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+def _similarity(first: set, second: set) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+# Cache für generierte Rezeptbilder: exakter Treffer über den Hash der normalisierten visual_summary,
+# optional ein ähnlicher Eintrag mit demselben Titel (Jaccard über die Wörter der visual_summary).
+class ImageCache:
+
+    def __init__(self, store: LLMCache, similarity_threshold: float = 0.0):
+        self.store = store
+        # 0 = nur exakte Treffer
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _summary_key(visual_summary: str) -> str:
+        return LLMCache.make_key("summary", normalize(visual_summary))
+
+    @staticmethod
+    def _title_key(title: str) -> str:
+        return LLMCache.make_key("title", normalize(title))
+
+    def get(self, title: str, visual_summary: str) -> Optional[str]:
+        entry = self.store.get(self._summary_key(visual_summary))
+        # Bild kann inzwischen vom GC-Sweep entfernt worden sein, bei einem Treffer die Karenzzeit neu starten
+        if entry and image_utils.reserve_upload(entry["image"]):
+            with self._lock:
+                self.hits += 1
+            return entry["image"]
+
+        if self.similarity_threshold <= 0:
+            return self._miss()
+
+        bucket = self.store.get(self._title_key(title)) or {"entries": []}
+        tokens = set(normalize(visual_summary).split())
+        scored = [(_similarity(tokens, set(candidate["tokens"])), candidate["image"]) for candidate in bucket["entries"]]
+
+        for score, image in sorted(scored, reverse=True):
+            if score < self.similarity_threshold:
+                break
+            if image_utils.reserve_upload(image):
+                with self._lock:
+                    self.near_hits += 1
+                return image
+
+        return self._miss()
+
+    def _miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, title: str, visual_summary: str, image: str) -> None:
+        self.store.set(self._summary_key(visual_summary), {"image": image})
+
+        if self.similarity_threshold <= 0:
+            return
+
+        with self._lock:
+            title_key = self._title_key(title)
+            bucket = self.store.get(title_key) or {"entries": []}
+            entries = [entry for entry in bucket["entries"] if entry["image"] != image]
+            entries.append({"tokens": sorted(set(normalize(visual_summary).split())), "image": image})
+            self.store.set(title_key, {"entries": entries[-MAX_ENTRIES_PER_TITLE:]})
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "size_bytes": self.store.stats()["size_bytes"],
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+                "similarity_threshold": self.similarity_threshold
+            }
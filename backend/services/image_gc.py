@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from sqlalchemy.orm import Session
+import crud
+from database import SessionLocal
+from config import settings
+from utils import image_utils
+
+logger = logging.getLogger(__name__)
+
+
+# Löscht Upload-Dateien, auf die kein Rezept mehr verweist (ref_count <= 0 oder gar nicht gezählt).
+# Dateien jünger als grace_seconds bleiben liegen: laufende Imports speichern das Bild, bevor das Rezept existiert.
+def sweep(db: Session, grace_seconds: int = settings.IMAGE_GC_GRACE_SECONDS) -> dict:
+    upload_dir = Path(settings.UPLOAD_DIR)
+    referenced = {Path(image).stem for image in crud.get_referenced_images(db)}
+    cutoff = time.time() - grace_seconds
+
+    removed_files = 0
+    freed_bytes = 0
+    for path in upload_dir.iterdir():
+        if not path.is_file():
+            continue
+
+        # Nur Bilder der App anfassen, fremde Dateien (.gitkeep, Dateien des Betreibers) bleiben liegen
+        stem = image_utils.image_stem(path.name)
+        if stem is None or stem in referenced:
+            continue
+
+        stat = path.stat()
+        if stat.st_mtime > cutoff:
+            continue
+
+        path.unlink(missing_ok=True)
+        removed_files += 1
+        freed_bytes += stat.st_size
+
+    # Zählerzeilen ohne Referenz entfernen, deren Dateien jetzt weg sind
+    orphaned_refs = [image for image in crud.get_unreferenced_images(db) if not (upload_dir / Path(image).name).exists()]
+    crud.delete_image_refs(db, orphaned_refs)
+
+    return {"removed_files": removed_files, "freed_bytes": freed_bytes, "removed_refs": len(orphaned_refs)}
+
+def _sweep_once() -> dict:
+    with SessionLocal() as db:
+        return sweep(db)
+
+async def run_periodically(interval_seconds: int = settings.IMAGE_GC_INTERVAL_SECONDS) -> None:
+    # Läuft als Hintergrund-Task der App, zusätzlich manuell über "python cli.py gc-images"
+    while True:
+        try:
+            result = await asyncio.to_thread(_sweep_once)
+            logger.info("Image GC: %s", result)
+        except Exception:
+            logger.exception("Image GC failed")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import crud, schemas
+from database import AsyncSessionLocal
+from config import settings
+from services import website_content_generator
+from services import tiktok_content_generator
+from services import user_content_generator
+from utils import url_utils
+from utils.singleflight import SingleFlight
+from utils.progress import progress, SharedRun, bind_job, unbind_job, bind_run, pop_usage
+
+logger = logging.getLogger(__name__)
+
+# Gleichzeitige Imports derselben URL warten auf einen gemeinsamen Pipeline-Durchlauf
+url_imports = SingleFlight()
+# Fortschritt des laufenden Durchlaufs je URL, damit jeder wartende Job die Stufen und den Verbrauch bekommt
+_shared_runs: Dict[str, SharedRun] = {}
+
+async def _generate_from_url(url: str, payload: str) -> dict:
+    if url_utils.is_tiktok_url(url):
+        return await tiktok_content_generator.transcribe_and_generate(url)
+    # Webseiten unter der eingegebenen URL abrufen, die kanonische Form ist nur der Schlüssel
+    return await website_content_generator.scrape_and_generate(url_utils.fetchable_url(payload))
+
+async def _generate_shared(url: str, payload: str, run: SharedRun) -> dict:
+    # Läuft im SingleFlight-Task, report/record_usage gehen an alle Jobs des Laufs
+    bind_run(run)
+    return await _generate_from_url(url, payload)
+
+async def _import_url(job, url: str) -> dict:
+    job_id, payload = job.id, job.payload
+    run = _shared_runs.get(url)
+    if run is None or not url_imports.running(url):
+        run = _shared_runs[url] = SharedRun()
+    run.join(job_id)
+    try:
+        return await url_imports.do(url, lambda: _generate_shared(url, payload, run))
+    finally:
+        run.leave(job_id)
+        if not run.jobs and _shared_runs.get(url) is run:
+            del _shared_runs[url]
+
+async def _run_pipeline(job, db) -> int:
+    url = None
+
+    if job.kind == "url":
+        # Tracking-Parameter entfernen und Kurzlinks auflösen, damit gleiche Rezepte denselben Schlüssel haben
+        url = await url_utils.resolve_url(job.payload)
+        data = await crud.get_recipe_by_url_async(db=db, url=url)
+        if not data:
+            data = await _import_url(job, url)
+    else:
+        data = await user_content_generator.generate_from_input(user_input=job.payload)
+
+    recipe_in = schemas.RecipeCreate(title=data.get("title", "Unbekannt"), content=data.get("content"), url=url or "", image=data.get("image"))
+    recipe = await crud.create_recipe_async(db=db, item=recipe_in, user_id=job.owner_id)
+    return recipe.id
+
+
+# Lokaler Worker-Pool: Jobs liegen persistent in import_jobs, die Queue hält nur die IDs.
+# Laufende Jobs halten per Heartbeat eine Lease. Beim Start und danach regelmäßig werden offene Jobs und
+# solche mit abgelaufener Lease (abgestürzter Prozess) wieder eingereiht. Mehrere Prozesse können sich
+# dieselbe Tabelle teilen: start_import_job vergibt jeden Job nur einmal.
+class ImportWorkerPool:
+
+    def __init__(self, concurrency: int, session_factory=AsyncSessionLocal):
+        self.concurrency = concurrency
+        self.session_factory = session_factory
+        self.completed = 0
+        self.failed = 0
+        self.input_tokens = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # IDs in der lokalen Queue, damit das periodische Einreihen keine Duplikate erzeugt
+        self._pending = set()
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        await self._requeue()
+
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        self._workers.append(asyncio.create_task(self._requeue_periodically()))
+
+    async def stop(self) -> None:
+        # Laufende Jobs bleiben auf "running" und werden nach Ablauf der Lease erneut eingereiht
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._pending.clear()
+
+    def enqueue(self, job_id: str) -> None:
+        # Ohne laufenden Pool bleibt der Job in der Tabelle und wird beim Start übernommen
+        if self._queue is not None and job_id not in self._pending:
+            self._pending.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _requeue(self) -> None:
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.IMPORT_JOB_LEASE_SECONDS)
+        async with self.session_factory() as db:
+            for job_id in await crud.requeue_import_jobs_async(db, max_attempts=settings.IMPORT_JOB_MAX_ATTEMPTS, stale_before=stale_before):
+                self.enqueue(job_id)
+
+    async def _requeue_periodically(self) -> None:
+        # Übernimmt Jobs abgestürzter Prozesse, auch wenn dieser Prozess schon länger läuft
+        while True:
+            await asyncio.sleep(settings.IMPORT_JOB_LEASE_SECONDS)
+            try:
+                await self._requeue()
+            except Exception:
+                logger.exception("Requeueing import jobs failed")
+
+    async def _heartbeat(self, job_id: str) -> None:
+        # Eigene Session: die Session der Pipeline ist währenddessen belegt
+        while True:
+            await asyncio.sleep(settings.IMPORT_JOB_LEASE_SECONDS / 4)
+            try:
+                async with self.session_factory() as db:
+                    await crud.touch_import_job_async(db, job_id)
+            except Exception:
+                logger.warning("Heartbeat for import job %s failed", job_id, exc_info=True)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._pending.discard(job_id)
+            try:
+                await self.run(job_id)
+            except Exception:
+                # z.B. "database is locked" beim Starten oder Abschließen: der Worker selbst darf nicht sterben
+                logger.exception("Import worker failed on job %s", job_id)
+                await self._fail(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _fail(self, job_id: str) -> None:
+        try:
+            async with self.session_factory() as db:
+                await self._finish(db, job_id, status="failed", error="Import failed")
+        except Exception:
+            logger.exception("Could not mark import job %s as failed", job_id)
+            # Ohne Datenbank zumindest den SSE-Stream beenden, nach Ablauf der Lease wird der Job neu versucht
+            self.failed += 1
+            progress.publish(job_id, "failed", {"id": job_id, "status": "failed", "recipe_id": None, "error": "Import failed", "input_tokens": None})
+
+    async def run(self, job_id: str) -> None:
+        async with self.session_factory() as db:
+            job = await crud.start_import_job_async(db, job_id)
+            if job is None:
+                return
+
+            # Pipeline-Stufen melden ihren Fortschritt an diesen Job (SSE unter /recipes/jobs/{id}/events)
+            token = bind_job(job_id)
+            heartbeat = asyncio.create_task(self._heartbeat(job_id))
+            try:
+                recipe_id = await _run_pipeline(job, db)
+            except ValueError as e:
+                await db.rollback()
+                await self._finish(db, job_id, status="not_found", error=str(e))
+                return
+            except Exception:
+                logger.exception("Import job %s failed", job_id)
+                await db.rollback()
+                await self._finish(db, job_id, status="failed", error="Import failed")
+                return
+            finally:
+                heartbeat.cancel()
+                unbind_job(token)
+
+            await self._finish(db, job_id, status="done", recipe_id=recipe_id)
+
+    async def _finish(self, db, job_id: str, status: str, recipe_id: Optional[int] = None, error: Optional[str] = None) -> None:
+        input_tokens = pop_usage(job_id).get("input_tokens")
+        await crud.finish_import_job_async(db, job_id, status=status, recipe_id=recipe_id, error=error, input_tokens=input_tokens)
+        self.input_tokens += input_tokens or 0
+
+        if status == "done":
+            self.completed += 1
+        else:
+            self.failed += 1
+
+        progress.publish(job_id, status, {"id": job_id, "status": status, "recipe_id": recipe_id, "error": error, "input_tokens": input_tokens})
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.concurrency if self._workers else 0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "input_tokens": self.input_tokens
+        }
+
+
+import_worker = ImportWorkerPool(concurrency=settings.IMPORT_WORKERS)
@@ -1,47 +1,108 @@
 import schemas
-from crud import create_nutrients, get_nutrients_by_id
-from database import SessionLocal
+from crud import NUTRIENT_FIELDS, get_nutrients_by_ids, get_most_used_nutrient_slugs, get_nutrients_by_ids_async, upsert_nutrients_async
+from database import SessionLocal, AsyncSessionLocal
+from cache import nutrients_cache
+from config import settings
 import asyncio
+import numpy as np
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 
-def _fetch_or_create_nutrients(ing: dict):
+async def _resolve_nutrients(fallbacks: dict, db: AsyncSession) -> dict:
+    found = await get_nutrients_by_ids_async(list(fallbacks), db)
+    missing = {slug: fallbacks[slug] for slug in fallbacks if slug not in found}
+
+    if missing:
+        found.update(await upsert_nutrients_async(db, missing))
+
+    return found
+
+def warm_up_cache() -> int:
     with SessionLocal() as db:
-        nutrients = get_nutrients_by_id(ing["id_slug"], db)
-        if not nutrients:
-            nutrients = create_nutrients(db, ing["id_slug"], ing["per_100g"])
-            
-        return {
-            "kcal": nutrients.kcal, "protein": nutrients.protein, 
-            "fat": nutrients.fat, "saturated_fat": nutrients.saturated_fat,
-            "carbs": nutrients.carbs, "sugar": nutrients.sugar, 
-            "fiber": nutrients.fiber, "salt": nutrients.salt
-        }
-
-async def calculate_nutrients(ingredients: list) -> schemas.Nutrients:
-
-    total_nutrients = {"kcal": 0.0,
-                  "protein": 0.0,
-                  "fat": 0.0,
-                  "saturated_fat": 0.0,
-                  "carbs": 0.0,
-                  "sugar": 0.0,
-                  "fiber": 0.0,
-                  "salt": 0.0}
+        slugs = get_most_used_nutrient_slugs(db, limit=settings.NUTRIENT_CACHE_WARMUP_SLUGS)
+        return len(get_nutrients_by_ids(slugs, db))
 
-    for ing in ingredients:
+async def lookup_nutrients(fallbacks: dict, db: Optional[AsyncSession] = None) -> dict:
+    # fallbacks: Slug -> geschätzte Nährwerte des LLM. Nur Slugs, die nicht im Cache liegen, gehen an die Datenbank
+    nutrients_by_slug, missing = nutrients_cache.get_many(fallbacks)
+    if missing:
+        missing_fallbacks = {slug: fallbacks[slug] for slug in missing}
+        if db is not None:
+            nutrients_by_slug.update(await _resolve_nutrients(missing_fallbacks, db))
+        else:
+            async with AsyncSessionLocal() as own_db:
+                nutrients_by_slug.update(await _resolve_nutrients(missing_fallbacks, own_db))
+    return nutrients_by_slug
+
+class StreamingNutrientLookup:
+    # Zutaten aus dem LLM-Stream: Cache-Treffer sofort, Fehlende gebündelt über eine einzige Session.
+    # Während eine Abfrage läuft, sammeln sich die nächsten Zutaten für die folgende an (höchstens eine Session pro Import).
+
+    def __init__(self):
+        self.found = {}
+        self._seen = set()
+        self._missing = {}
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, slug: str, per_100g: dict) -> None:
+        if slug in self._seen:
+            return
+        self._seen.add(slug)
+
+        hits, missing = nutrients_cache.get_many({slug: per_100g})
+        self.found.update(hits)
+        if missing:
+            self._missing[slug] = per_100g
+            if self._task is None:
+                self._task = asyncio.create_task(self._run())
+            self._wakeup.set()
 
-        nutrients_data = await asyncio.to_thread(_fetch_or_create_nutrients, ing)
+    async def _run(self) -> None:
+        async with AsyncSessionLocal() as db:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._missing:
+                    batch, self._missing = self._missing, {}
+                    self.found.update(await _resolve_nutrients(batch, db))
+                if self._closed:
+                    return
 
-        weight_factor = ing.get("est_weight_g", 0) / 100.0
+    async def result(self, ingredients: list) -> dict:
+        # Zutaten, die im Stream nicht erkannt wurden, noch mitnehmen, dann auf die letzte Abfrage warten
+        for ing in ingredients:
+            self.add(ing["id_slug"], ing["per_100g"])
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+        return self.found
 
-        total_nutrients["kcal"] += nutrients_data["kcal"] * weight_factor
-        total_nutrients["protein"] += nutrients_data["protein"] * weight_factor
-        total_nutrients["fat"] += nutrients_data["fat"] * weight_factor
-        total_nutrients["saturated_fat"] += nutrients_data["saturated_fat"] * weight_factor
-        total_nutrients["carbs"] += nutrients_data["carbs"] * weight_factor
-        total_nutrients["sugar"] += nutrients_data["sugar"] * weight_factor
-        total_nutrients["fiber"] += nutrients_data["fiber"] * weight_factor
-        total_nutrients["salt"] += nutrients_data["salt"] * weight_factor
-        
-    return schemas.Nutrients(**total_nutrients)
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+def sum_nutrients(ingredients: list, nutrients_by_slug: dict) -> schemas.Nutrients:
+    if not ingredients:
+        return schemas.Nutrients(**{field: 0.0 for field in NUTRIENT_FIELDS})
+
+    # Matrix (Zutaten x Nährwerte) gewichtet mit den Gramm-Faktoren in einem Schritt aufsummieren
+    per_100g = np.array([[nutrients_by_slug[ing["id_slug"]][field] for field in NUTRIENT_FIELDS] for ing in ingredients], dtype=float)
+    weight_factors = np.array([ing.get("est_weight_g", 0) / 100.0 for ing in ingredients], dtype=float)
+    totals = weight_factors @ per_100g
+
+    return schemas.Nutrients(**{field: float(value) for field, value in zip(NUTRIENT_FIELDS, totals)})
+
+async def calculate_nutrients(ingredients: list, db: Optional[AsyncSession] = None) -> schemas.Nutrients:
+
+    if not ingredients:
+        return sum_nutrients(ingredients, {})
+
+    # Erste Angabe pro Slug gewinnt, falls eine Zutat mehrfach im Rezept vorkommt
+    fallbacks = {}
+    for ing in ingredients:
+        fallbacks.setdefault(ing["id_slug"], ing["per_100g"])
 
-    
\ No newline at end of file
+    return sum_nutrients(ingredients, await lookup_nutrients(fallbacks, db))
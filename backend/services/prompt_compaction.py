@@ -0,0 +1,120 @@
+import logging
+import re
+from functools import lru_cache
+from typing import List, Optional
+from lxml import etree
+from lxml.html import HtmlElement
+import tiktoken
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Blöcke, die einzeln bewertet werden (nach dem Entfernen von Skripten, Navigation usw.)
+BLOCK_TAGS = frozenset(["h1", "h2", "h3", "p", "ul", "ol", "table"])
+
+# Ein h1 in Navigation oder Footer schützt den umgebenden Container nicht, diese Tags fliegen ohnehin raus
+_contains_h1 = etree.XPath("boolean(.//h1[not(ancestor::script or ancestor::style or ancestor::svg or ancestor::nav or ancestor::footer or ancestor::iframe or ancestor::noscript)])")
+
+# Kommentare, "Das könnte dir auch gefallen", Teilen-Leisten, Newsletter: per class/id erkennbar.
+# Nur ganze Klassennamen vergleichen, Teilstücke wie in "elementor-widget-container" oder "no-sidebar" sind kein Boilerplate.
+BOILERPLATE_NAMES = frozenset([
+    "comment", "comments", "comments-area", "comment-list", "kommentar", "kommentare", "respond", "reply",
+    "related", "related-posts", "related-recipes", "similar-recipes", "more-recipes", "popular", "popular-posts", "popular-recipes",
+    "share", "sharing", "share-buttons", "social", "social-share", "newsletter", "newsletter-box", "newsletter-signup", "subscribe",
+    "sidebar", "widget-area", "breadcrumb", "breadcrumbs", "cookie", "cookie-banner", "cookie-consent", "consent",
+    "advert", "advertisement", "ad", "ads", "ad-slot", "promo", "teaser"
+])
+
+# Mengenangaben und Überschriften, die auf Zutaten oder Zubereitung hindeuten
+QUANTITY_PATTERN = re.compile(r"\d+([.,/]\d+)?\s*(g|kg|ml|l|el|tl|msp|prise|stück|dose|pck|tasse|cups?|tbsp|tsp|oz|lb)\b", re.IGNORECASE)
+RECIPE_KEYWORDS = re.compile(r"zutaten|zubereitung|anleitung|schritt|ingredients?|instructions?|directions?|method|portionen|servings", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[tiktoken.Encoding]:
+    # Die BPE-Datei lädt tiktoken beim ersten Aufruf aus dem Netz (danach Cache in TIKTOKEN_CACHE_DIR).
+    # Ohne Netz lieber schätzen als den Import scheitern lassen.
+    try:
+        return tiktoken.get_encoding(settings.PROMPT_TOKEN_ENCODING)
+    except Exception:
+        logger.warning("tiktoken encoding %s unavailable, estimating tokens from length", settings.PROMPT_TOKEN_ENCODING)
+        return None
+
+def count_tokens(text: str) -> int:
+    # Näherung: Gemini tokenisiert anders, für Budget und Vergleich zwischen Imports reicht das
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _text(element: HtmlElement) -> str:
+    # Nur Textknoten (ohne Kommentare), mit Leerzeichen verbunden und normalisiert
+    return " ".join(" ".join(element.xpath(".//text()")).split())
+
+def _has_recipe_content(element: HtmlElement) -> bool:
+    # Überschrift "Zutaten"/"Zubereitung" oder ein Block mit Mengenangabe: lieber Boilerplate behalten als das Rezept verlieren
+    for block in element.iter("h1", "h2", "h3", "h4", "p", "li", "td"):
+        text = _text(block)
+        if QUANTITY_PATTERN.search(text) or (block.tag in ("h1", "h2", "h3", "h4") and RECIPE_KEYWORDS.search(text)):
+            return True
+    return False
+
+def is_boilerplate(element: HtmlElement) -> bool:
+    # Seitengerüst nie entfernen, auch wenn es z.B. class="has-sidebar" trägt
+    if element.tag in ("html", "body", "main", "article"):
+        return False
+    names = element.get("class", "").lower().split() + [element.get("id", "").strip().lower()]
+    if element.tag not in ("aside", "form", "button") and BOILERPLATE_NAMES.isdisjoint(names):
+        return False
+    # Container mit der Rezeptüberschrift, Zutaten oder Schritten bleiben
+    return not _contains_h1(element) and not _has_recipe_content(element)
+
+def _score(block: HtmlElement, text: str, in_recipe_section: bool) -> float:
+    score = 1.0
+    # Der Titel bleibt immer erhalten
+    if block.tag == "h1":
+        score += 4
+    elif block.tag in ("h2", "h3"):
+        score += 1
+    # Blöcke unter "Zutaten"/"Zubereitung" gehören zum Rezept, auch ohne Mengenangabe
+    if in_recipe_section:
+        score += 2
+    if QUANTITY_PATTERN.search(text):
+        score += 3
+    if RECIPE_KEYWORDS.search(text):
+        score += 2
+
+    # Listen aus Links sind fast immer Navigation oder weitere Rezepte
+    link_chars = sum(len("".join(part.strip() for part in link.xpath(".//text()"))) for link in block.iterdescendants("a"))
+    score -= 3 * link_chars / max(len(text), 1)
+    if len(text) < 20 and block.tag not in ("h1", "h2", "h3"):
+        score -= 0.5
+    return score
+
+def compact(root: HtmlElement, blocks: List[HtmlElement], max_tokens: int) -> None:
+    # blocks: oberste Block-Elemente in Dokumentreihenfolge (Boilerplate bereits entfernt, Links noch vorhanden).
+    # Doppelte Absätze immer entfernen, danach die am schlechtesten bewerteten Blöcke, bis der Text ins Budget passt.
+    seen = set()
+    candidates = []
+    in_recipe_section = False
+    for index, block in enumerate(blocks):
+        text = _text(block)
+        if not text or text in seen:
+            block.drop_tree()
+            continue
+        seen.add(text)
+
+        if block.tag in ("h1", "h2", "h3"):
+            in_recipe_section = bool(RECIPE_KEYWORDS.search(text))
+        candidates.append((_score(block, text, in_recipe_section), -index, count_tokens(text), block))
+
+    total = count_tokens(_text(root))
+    if total <= max_tokens:
+        return
+
+    # Bei gleicher Bewertung zuerst weiter unten stehende Blöcke (Kommentare, Footer-Listen)
+    for score, _, tokens, block in sorted(candidates, key=lambda candidate: candidate[:2]):
+        if total <= max_tokens or score >= 4:
+            break
+        block.drop_tree()
+        total -= tokens
@@ -0,0 +1,135 @@
+import html
+import json
+import re
+from typing import Optional
+from lxml.html import HtmlElement
+
+# schema.org-Dauer, z.B. "PT1H30M" oder "P0DT0H45M"
+DURATION_PATTERN = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:\d+S)?)?$", re.IGNORECASE)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+MICRODATA_RECIPE = re.compile(r"schema\.org/Recipe$", re.IGNORECASE)
+
+
+def _text(value) -> str:
+    # Manche Seiten betten HTML oder Entities in die JSON-LD-Strings ein
+    if not isinstance(value, str):
+        return ""
+    return " ".join(html.unescape(TAG_PATTERN.sub(" ", value)).split())
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def _minutes(value) -> Optional[int]:
+    match = DURATION_PATTERN.match(value.strip()) if isinstance(value, str) else None
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes = (int(group or 0) for group in match.groups())
+    return days * 1440 + hours * 60 + minutes
+
+def _servings(value) -> Optional[int]:
+    # "4", 4, "4 Portionen" oder ["4", "4 servings"]
+    for item in _as_list(value):
+        match = re.search(r"\d+", str(item))
+        if match:
+            return int(match.group())
+    return None
+
+def _cooking_time(node: dict) -> Optional[int]:
+    total = _minutes(node.get("totalTime"))
+    if total:
+        return total
+    return ((_minutes(node.get("prepTime")) or 0) + (_minutes(node.get("cookTime")) or 0)) or None
+
+def _texts(value) -> list:
+    return [text for text in (_text(item) for item in _as_list(value)) if text]
+
+def _steps(value) -> list:
+    # String, Liste von Strings, HowToStep oder HowToSection mit verschachtelten Schritten
+    steps = []
+    for item in _as_list(value):
+        if isinstance(item, str):
+            steps.extend(line for line in (_text(part) for part in item.split("\n")) if line)
+        elif isinstance(item, dict):
+            if item.get("itemListElement"):
+                steps.extend(_steps(item["itemListElement"]))
+            else:
+                text = _text(item.get("text") or item.get("name"))
+                if text:
+                    steps.append(text)
+    return steps
+
+def _is_recipe(node: dict) -> bool:
+    return "Recipe" in _as_list(node.get("@type"))
+
+def _find_recipe_node(data) -> Optional[dict]:
+    # Recipe kann direkt, in einer Liste oder in einem @graph stehen
+    for node in _as_list(data):
+        if not isinstance(node, dict):
+            continue
+        if _is_recipe(node):
+            return node
+        found = _find_recipe_node(node.get("@graph"))
+        if found:
+            return found
+    return None
+
+def _from_json_ld(root: HtmlElement) -> Optional[dict]:
+    for script in root.xpath('//script[@type="application/ld+json"]'):
+        try:
+            data = json.loads(script.text or "")
+        except json.JSONDecodeError:
+            continue
+
+        node = _find_recipe_node(data)
+        if node:
+            return {
+                "title": _text(node.get("name")),
+                "servings": _servings(node.get("recipeYield")),
+                "cooking_time": _cooking_time(node),
+                "ingredients": _texts(node.get("recipeIngredient") or node.get("ingredients")),
+                "steps": _steps(node.get("recipeInstructions")),
+                "category": _texts(node.get("recipeCategory")),
+                "keywords": ", ".join(_texts(node.get("keywords")))
+            }
+    return None
+
+def _itemprop(scope: HtmlElement, name: str) -> list:
+    # Wert aus content/datetime-Attribut, sonst der sichtbare Text (ohne Skripte)
+    values = []
+    for element in scope.xpath(".//*[@itemprop=$name]", name=name):
+        value = element.get("content") or element.get("datetime") or " ".join(element.xpath(".//text()[not(ancestor::script or ancestor::style)]"))
+        value = " ".join(value.split())
+        if value:
+            values.append(value)
+    return values
+
+def _from_microdata(root: HtmlElement) -> Optional[dict]:
+    scope = next((element for element in root.xpath("//*[@itemtype]") if MICRODATA_RECIPE.search(element.get("itemtype"))), None)
+    if scope is None:
+        return None
+
+    names = _itemprop(scope, "name")
+    times = _itemprop(scope, "totalTime") or _itemprop(scope, "cookTime")
+    return {
+        "title": names[0] if names else "",
+        "servings": _servings(_itemprop(scope, "recipeYield")),
+        "cooking_time": _minutes(times[0]) if times else None,
+        "ingredients": _itemprop(scope, "recipeIngredient") or _itemprop(scope, "ingredients"),
+        "steps": _itemprop(scope, "text") or _itemprop(scope, "recipeInstructions"),
+        "category": _itemprop(scope, "recipeCategory"),
+        "keywords": ", ".join(_itemprop(scope, "keywords"))
+    }
+
+def extract_recipe(root: HtmlElement) -> Optional[dict]:
+    # Nur verwenden, wenn Zutaten und Schritte vollständig vorliegen, sonst braucht das LLM die ganze Seite
+    for parse in (_from_json_ld, _from_microdata):
+        recipe = parse(root)
+        if recipe and recipe["ingredients"] and recipe["steps"]:
+            return {key: value for key, value in recipe.items() if value}
+    return None
+
+def to_prompt(recipe: dict) -> str:
+    # Kompakte Eingabe für call_gemini: das LLM normalisiert nur noch (Slugs, Einheiten, Gewichte, visual_summary, Tags)
+    return "STRUKTURIERTE REZEPTDATEN (schema.org Recipe): " + json.dumps(recipe, ensure_ascii=False, separators=(",", ":"))
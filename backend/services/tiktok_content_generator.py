@@ -1,13 +1,12 @@
-from openai import AsyncOpenAI
 import asyncio
 import tempfile
-from services import ai_content_normalizer
+from pathlib import Path
+from services import ai_content_normalizer, transcription
+from utils import audio_utils, http_client
+from utils.progress import report
 import httpx
 import yt_dlp
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, retry_if_exception
-from config import settings
-
-openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 
 
 # Erlaubte Fehler für einen Retry:
@@ -17,6 +16,25 @@ RETRY_EXCEPTIONS = (httpx.TimeoutException, httpx.ConnectError, ValueError)
 def retry_if_server_error(exc):
     return isinstance(exc, httpx.HTTPStatusError) and 500 <= exc.response.status_code < 600
 
+async def _fetch_oembed(url: str) -> dict:
+    oembed_url = f"https://www.tiktok.com/oembed?url={url}"
+
+    response = await http_client.get(oembed_url)
+    response.raise_for_status() # Fehlercodes (400, 401, 403, 404, 500 usw.) -> HTTPError wird ausgelöst
+    return response.json()
+
+def _download_audio(url: str, tmpdir: str) -> Path:
+    ydl_opts = {
+        # Audio-Spur, sonst die kleinste Variante mit Ton: das Video wird ohnehin nur fürs Audio transkodiert
+        "format": "bestaudio/worst",
+        "outtmpl": f"{tmpdir}/%(id)s.%(ext)s",
+        "quiet" : True
+    }
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+        return Path(ydl.prepare_filename(info))
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=2),
@@ -25,32 +43,25 @@ def retry_if_server_error(exc):
 )
 async def transcribe_and_generate(url: str) -> dict:
 
-    oembed_url = f"https://www.tiktok.com/oembed?url={url}"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # oEmbed und Download parallel. Erst nach beiden Ergebnissen Fehler werfen, sonst
+        # räumt TemporaryDirectory auf, während yt_dlp im Thread noch schreibt.
+        oembed_data, audio_path = await asyncio.gather(
+            _fetch_oembed(url),
+            asyncio.to_thread(_download_audio, url, tmpdir),
+            return_exceptions=True
+        )
+        for result in (oembed_data, audio_path):
+            if isinstance(result, BaseException):
+                raise result
 
-    async with httpx.AsyncClient() as http_client:
-        response = await http_client.get(oembed_url)
-        response.raise_for_status() # Fehlercodes (400, 401, 403, 404, 500 usw.) -> HTTPError wird ausgelöst
-        oembed_data = response.json()
+        video_description = oembed_data["title"]
+        report("fetched")
 
-    video_description = oembed_data["title"]
+        audio_path = await audio_utils.prepare_for_transcription(audio_path)
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        ydl_opts = {
-            "format": "bestaudio/best",
-            "outtmpl": f"{tmpdir}/%(id)s.%(ext)s",
-            "quiet" : True
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = await asyncio.to_thread(ydl.extract_info, url, download=True)
-            audio_path = await asyncio.to_thread(ydl.prepare_filename, info)
-
-        with open(audio_path, "rb") as audio_file:
-            transcription = await openai_client.audio.transcriptions.create(
-                model="gpt-4o-transcribe", 
-                file=audio_file
-            )
-        audio_transcript = transcription.text
+        audio_transcript = await transcription.transcribe(audio_path)
+        report("cleaned", chars=len(audio_transcript))
 
     video_data = f"Videobeschreibung: {video_description} | Audio: {audio_transcript}"
     
@@ -0,0 +1,107 @@
+import asyncio
+import importlib.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Optional
+from openai import AsyncOpenAI
+from utils import audio_utils
+from config import settings
+
+openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+# whisper erwartet 16 kHz Mono
+WHISPER_SAMPLE_RATE = 16000
+
+_executor: Optional[ProcessPoolExecutor] = None
+_stats = {"transcriptions": 0, "wall_seconds": 0.0}
+
+# Im Worker-Prozess: Modell einmal beim Start des Prozesses laden, nicht pro Chunk
+_model = None
+
+
+def _init_whisper_worker(model_name: str, threads: int) -> None:
+    global _model
+    import torch
+    import whisper
+
+    # Ohne Begrenzung nutzt jeder Worker alle Kerne und die Prozesse bremsen sich gegenseitig aus
+    torch.set_num_threads(threads)
+    _model = whisper.load_model(model_name, device="cpu")
+
+def _transcribe_chunk(samples, language: Optional[str]) -> str:
+    # Chunks werden unabhängig transkribiert, deshalb kein Kontext aus dem vorherigen Text
+    result = _model.transcribe(samples, language=language, fp16=False, condition_on_previous_text=False)
+    return result["text"].strip()
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        threads = max(1, (os.cpu_count() or 1) // settings.WHISPER_WORKERS)
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.WHISPER_WORKERS,
+            initializer=_init_whisper_worker,
+            initargs=(settings.WHISPER_MODEL, threads)
+        )
+    return _executor
+
+async def _transcribe_openai(audio_path: Path) -> str:
+    with open(audio_path, "rb") as audio_file:
+        transcription = await openai_client.audio.transcriptions.create(
+            model="gpt-4o-transcribe",
+            file=audio_file
+        )
+    return transcription.text
+
+async def _transcribe_whisper(audio_path: Path) -> str:
+    samples = await audio_utils.decode_pcm(audio_path, WHISPER_SAMPLE_RATE)
+    chunks = audio_utils.split_chunks(
+        samples,
+        chunk_samples=settings.WHISPER_CHUNK_SECONDS * WHISPER_SAMPLE_RATE,
+        search_samples=2 * WHISPER_SAMPLE_RATE
+    )
+
+    # Chunks parallel auf die Worker-Prozesse verteilen, Reihenfolge bleibt durch gather erhalten
+    loop = asyncio.get_running_loop()
+    try:
+        texts = await asyncio.gather(*(
+            loop.run_in_executor(_get_executor(), _transcribe_chunk, chunk, settings.WHISPER_LANGUAGE)
+            for chunk in chunks
+        ))
+    except BrokenProcessPool:
+        # z.B. Modell-Download im Initializer fehlgeschlagen oder Worker abgestürzt: der nächste Import startet einen neuen Pool
+        shutdown()
+        raise
+    return " ".join(text for text in texts if text)
+
+# Auswahl pro Deployment über TRANSCRIPTION_BACKEND
+BACKENDS = {
+    "openai": _transcribe_openai,
+    "whisper": _transcribe_whisper
+}
+
+async def transcribe(audio_path: Path) -> str:
+    start = time.perf_counter()
+    text = await BACKENDS[settings.TRANSCRIPTION_BACKEND](audio_path)
+
+    _stats["transcriptions"] += 1
+    _stats["wall_seconds"] += time.perf_counter() - start
+    return text
+
+def check_backend() -> None:
+    # Beim Start prüfen statt erst beim ersten TikTok-Import: ohne whisper/torch scheitert jeder Worker-Prozess im Initializer
+    if settings.TRANSCRIPTION_BACKEND == "whisper":
+        missing = [module for module in ("whisper", "torch") if importlib.util.find_spec(module) is None]
+        if missing:
+            raise RuntimeError(f"TRANSCRIPTION_BACKEND=whisper requires {', '.join(missing)} (pip install openai-whisper)")
+
+def stats() -> dict:
+    return {"backend": settings.TRANSCRIPTION_BACKEND, **_stats}
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,7 +1,7 @@
 import httpx
-import asyncio
-from bs4 import BeautifulSoup
-from services import ai_content_normalizer
+from services import ai_content_normalizer, html_cleaner, prompt_compaction
+from utils import http_client
+from utils.progress import report
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, retry_if_exception
 
 # Erlaubte Fehler für einen Retry:
@@ -11,25 +11,6 @@ RETRY_EXCEPTIONS = (httpx.TimeoutException, httpx.ConnectError, ValueError)
 def retry_if_server_error(exc):
     return isinstance(exc, httpx.HTTPStatusError) and 500 <= exc.response.status_code < 600
 
-def _parse_and_clean_html(html_content: str) -> str:
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    schemas = []
-    for script in soup.find_all('script', type='application/ld+json'):
-        schemas.append(str(script))
-
-    allowed_tags = ["h1", "h2", "h3", "p", "ul", "ol", "li", "table", "tr", "td", "th"] 
-    for tag in soup.find_all(['script', 'style', 'svg', 'nav', 'footer', 'iframe', 'noscript', 'meta', 'link']):
-        tag.decompose()
-    for tag in soup.find_all(True):
-        if tag.name not in allowed_tags:
-            tag.unwrap() 
-        tag.attrs = {}
-
-    clean_html = "\n".join(schemas) + str(soup)
-    clean_html = " ".join(clean_html.split())
-    return clean_html
-
 @retry(
     stop=stop_after_attempt(3), 
     wait=wait_exponential(multiplier=1, min=2),  
@@ -42,11 +23,12 @@ async def scrape_and_generate(url: str) -> dict:
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
-        response.raise_for_status() # Fehlercodes (400, 401, 403, 404, 500 usw.) -> HTTPError wird ausgelöst
+    response = await http_client.get(url, headers=headers)
+    response.raise_for_status() # Fehlercodes (400, 401, 403, 404, 500 usw.) -> HTTPError wird ausgelöst
+    report("fetched", bytes=len(response.content))
 
-    clean_html = await asyncio.to_thread(_parse_and_clean_html, response.text)
+    clean_html, source = await html_cleaner.clean(response.text)
+    report("cleaned", chars=len(clean_html), tokens=prompt_compaction.count_tokens(clean_html), source=source)
 
     recipe_data = await ai_content_normalizer.call_gemini(clean_html)
     return recipe_data
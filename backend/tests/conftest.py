@@ -4,21 +4,26 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import tempfile
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from database import Base, get_db
+from sqlalchemy.pool import NullPool
+from database import Base, get_db, get_async_db, to_async_url, engine_options, register_sqlite_pragmas
+from cache import user_cache, token_cache, nutrients_cache
 from main import app
 from httpx import AsyncClient, ASGITransport
 
-# Test Datenbank im RAM (wird bei jedem Testlauf neu erstellt)
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Test Datenbank als temporäre Datei (wird bei jedem Testlauf neu erstellt), damit
+# synchrone und asynchrone Sessions dieselben Daten sehen
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{tempfile.mkdtemp()}/test.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool
-)
+# Gleiches Engine-Profil (PRAGMAs, Timeouts) wie in der App
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+register_sqlite_pragmas(engine)
+
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool, **engine_options(to_async_url(SQLALCHEMY_DATABASE_URL)))
+register_sqlite_pragmas(async_engine.sync_engine)
 
 TestingSessionLocal = sessionmaker(
     autocommit=False,
@@ -26,6 +31,9 @@ TestingSessionLocal = sessionmaker(
     bind=engine
 )
 
+# NullPool: aiosqlite-Verbindungen (samt Worker-Thread) werden nach jeder Session geschlossen
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture(scope="function")
 def db_session():
     # Tabellen vor dem Test erstellen
@@ -38,6 +46,24 @@ def db_session():
         # Nach dem Test alles löschen, damit der nächste Test sauber startet
         Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture(scope="function")
+async def async_db_session(db_session):
+    nutrients_cache.clear()
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+@pytest.fixture(scope="function")
+async def import_worker(db_session):
+    from unittest.mock import patch
+    from services.import_jobs import ImportWorkerPool
+
+    # Eigener Pool auf der Test-DB, die App reiht ihre Jobs dort ein
+    worker = ImportWorkerPool(concurrency=1, session_factory=TestingAsyncSessionLocal)
+    await worker.start()
+    with patch("routers.recipes.import_worker", worker):
+        yield worker
+    await worker.stop()
+
 @pytest.fixture(scope="function")
 async def client(db_session):
     
@@ -47,8 +73,18 @@ async def client(db_session):
         finally:
             pass
 
+    # IDs werden zwischen Tests neu vergeben, gecachte User dürfen nicht überleben
+    user_cache.clear()
+    token_cache.clear()
+    nutrients_cache.clear()
+
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     # Überschreiben der echten DB-Verbindung der App mit der Test-DB
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
 
     # ASGITransport erlaubt es, die App direkt ohne echten Server zu testen
     async with AsyncClient(
@@ -22,4 +22,46 @@ async def test_full_auth_flow(client, db_session):
 
     assert login_resp.status_code == 200
     assert login_resp.json() == {"message": "Login successful"}
-    assert "access_token" in login_resp.cookies
\ No newline at end of file
+    assert "access_token" in login_resp.cookies
+
+async def test_current_user_cached_and_invalidated(client, db_session):
+
+    from crud import create_user
+    from schemas import UserCreate
+    from cache import user_cache
+    from routers.auth import create_access_token
+
+    user = create_user(db_session, UserCreate(email="cache@test.de", password="safe", invite_code="X"))
+    cookies = {"access_token": create_access_token({"sub": user.email})}
+
+    await client.get("/users/me", cookies=cookies)
+    hits_before = user_cache.hits
+
+    response = await client.get("/users/me", cookies=cookies)
+    assert response.json() == {"email": "cache@test.de", "id": user.id}
+    assert user_cache.hits == hits_before + 1
+
+    user.is_admin = True
+    db_session.commit()
+    assert user_cache.get("cache@test.de") is None
+
+    response = await client.get("/admin/metrics", cookies=cookies)
+    assert response.status_code == 200
+
+async def test_login_rehashes_outdated_password_hash(client, db_session):
+
+    from crud import create_user
+    from schemas import UserCreate
+    from passlib.context import CryptContext
+    from config import settings
+
+    # Hash mit niedrigeren Kosten als konfiguriert, wie nach einer Erhöhung von BCRYPT_ROUNDS
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("safe")
+    user = create_user(db_session, UserCreate(email="rehash@test.de", password="safe", invite_code="X"), hashed_password=old_hash)
+
+    login_resp = await client.post("/token", data={"username": "rehash@test.de", "password": "safe"})
+    assert login_resp.status_code == 200
+
+    db_session.refresh(user)
+    assert user.hashed_password != old_hash
+    assert user.hashed_password.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
@@ -1,6 +1,7 @@
 from services.nutrients_calculator import calculate_nutrients
+from cache import nutrients_cache
 
-async def test_nutrients_math():
+async def test_nutrients_math(async_db_session):
 
     mock_ingredients = [
         {
@@ -19,10 +20,620 @@ async def test_nutrients_math():
         }
     ]
 
-    result = await calculate_nutrients(mock_ingredients)
+    result = await calculate_nutrients(mock_ingredients, db=async_db_session)
 
     assert result.kcal == 250
     assert result.fiber == 5
 
+async def test_nutrients_bulk_with_duplicate_slugs(async_db_session):
 
+    per_100g = {
+        "kcal": 200, "protein": 10, "fat": 5, "saturated_fat": 1,
+        "carbs": 30, "sugar": 2, "fiber": 4, "salt": 1
+    }
 
+    mock_ingredients = [
+        {"id_slug": "test-lentil", "est_weight_g": 100, "per_100g": per_100g},
+        {"id_slug": "test-lentil", "est_weight_g": 50, "per_100g": per_100g},
+        {"id_slug": "test-rice", "est_weight_g": 200, "per_100g": {**per_100g, "kcal": 100}}
+    ]
+
+    result = await calculate_nutrients(mock_ingredients, db=async_db_session)
+
+    assert result.kcal == 500
+    assert result.protein == 35
+
+async def test_nutrients_served_from_cache(async_db_session):
+
+    mock_ingredients = [
+        {
+            "id_slug": "test-oat",
+            "est_weight_g": 100,
+            "per_100g": {
+                "kcal": 370, "protein": 13, "fat": 7, "saturated_fat": 1,
+                "carbs": 59, "sugar": 1, "fiber": 10, "salt": 0
+            }
+        }
+    ]
+
+    await calculate_nutrients(mock_ingredients, db=async_db_session)
+    hits_before = nutrients_cache.hits
+
+    result = await calculate_nutrients(mock_ingredients, db=async_db_session)
+
+    assert nutrients_cache.hits == hits_before + 1
+    assert result.kcal == 370
+
+def test_canonicalize_url_strips_tracking():
+
+    from utils.url_utils import canonicalize_url, fetchable_url
+
+    assert canonicalize_url("HTTPS://www.Chefkoch.de:443/rezepte/123/?utm_source=x&portion=4&fbclid=abc#kommentare") == "https://www.chefkoch.de/rezepte/123?portion=4"
+    assert canonicalize_url("https://www.tiktok.com/@koch/video/7312?_r=1&_t=ZN-8&is_from_webapp=1") == "https://www.tiktok.com/@koch/video/7312"
+    assert canonicalize_url("www.chefkoch.de/rezepte/1") == "https://www.chefkoch.de/rezepte/1"
+    assert canonicalize_url("https://rezepte.de/suche?ref=123&user_id=5&gclid=x") == "https://rezepte.de/suche?ref=123&user_id=5"
+    assert fetchable_url(" www.kochblog.de/rezept/dal/?b=2&a=1#kommentare") == "https://www.kochblog.de/rezept/dal/?b=2&a=1"
+
+async def test_single_flight_runs_job_once():
+
+    import asyncio
+    from utils.singleflight import SingleFlight
+
+    calls = 0
+
+    async def job():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"title": "Pasta"}
+
+    flight = SingleFlight()
+    results = await asyncio.gather(*(flight.do("https://test.de", job) for _ in range(5)))
+
+    assert calls == 1
+    assert results == [{"title": "Pasta"}] * 5
+    assert results[0] is not results[1]
+    assert flight.in_flight() == 0
+
+async def test_coalesced_url_imports_share_progress_and_usage():
+
+    import asyncio
+    from types import SimpleNamespace
+    from unittest.mock import patch
+    from services import import_jobs
+    from utils.progress import progress, report, record_usage, pop_usage
+
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def generate(url, payload):
+        report("fetched")
+        record_usage(input_tokens=100)
+        started.set()
+        await release.wait()
+        report("title", title="Pasta")
+        return {"title": "Pasta"}
+
+    first = SimpleNamespace(id="job-1", payload="https://test.de")
+    second = SimpleNamespace(id="job-2", payload="https://test.de/?utm_source=x")
+    queues = {job.id: progress.subscribe(job.id) for job in (first, second)}
+
+    with patch.object(import_jobs, "_generate_from_url", side_effect=generate) as mock_generate:
+        leader = asyncio.create_task(import_jobs._import_url(first, "https://test.de"))
+        await started.wait()
+        # Zweiter Job kommt dazu, während der Lauf bereits "fetched" gemeldet hat
+        follower = asyncio.create_task(import_jobs._import_url(second, "https://test.de"))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(leader, follower)
+
+    assert mock_generate.call_count == 1
+    assert results == [{"title": "Pasta"}] * 2
+    for job in (first, second):
+        stages = [queues[job.id].get_nowait()["stage"] for _ in range(queues[job.id].qsize())]
+        assert stages == ["fetched", "title"]
+        assert pop_usage(job.id) == {"input_tokens": 100}
+        progress.unsubscribe(job.id, queues[job.id])
+    assert import_jobs._shared_runs == {}
+
+def test_llm_cache_roundtrip_and_eviction(tmp_path):
+
+    import os
+    from services.llm_cache import LLMCache
+
+    llm_cache = LLMCache(directory=str(tmp_path), max_bytes=300)
+
+    first_key = LLMCache.make_key("v1", "prompt a")
+    assert first_key != LLMCache.make_key("v2", "prompt a")
+    assert llm_cache.get(first_key) is None
+
+    llm_cache.set(first_key, {"title": "Pasta", "filler": "x" * 100})
+    assert llm_cache.get(first_key)["title"] == "Pasta"
+
+    # Überschreiben darf die Größe nicht doppelt zählen
+    llm_cache.set(first_key, {"title": "Pasta", "filler": "x" * 100})
+    assert llm_cache.stats()["size_bytes"] == llm_cache._disk_usage()
+
+    # Ältester Eintrag fliegt zuerst raus
+    os.utime(tmp_path / f"{first_key}.json", (0, 0))
+    second_key = LLMCache.make_key("v1", "prompt b")
+    third_key = LLMCache.make_key("v1", "prompt c")
+    llm_cache.set(second_key, {"title": "Curry", "filler": "x" * 100})
+    llm_cache.set(third_key, {"title": "Suppe", "filler": "x" * 100})
+
+    assert llm_cache.get(first_key) is None
+    assert llm_cache.get(third_key)["title"] == "Suppe"
+    assert llm_cache.hits == 2
+
+async def test_call_gemini_skips_model_on_cache_hit(tmp_path):
+
+    import asyncio
+    from unittest.mock import patch, AsyncMock
+    from services import ai_content_normalizer
+    from services.llm_cache import LLMCache
+    import schemas
+
+    model_data = {
+        "title": "Porridge",
+        "visual_summary": "Cremiger Haferbrei in einer Schale.",
+        "content": {"servings": 1, "ingredients": [], "steps": ["Koche alles"], "cooking_time": 10, "tags": ["Frühstück"], "nutrients": None}
+    }
+    empty_nutrients = schemas.Nutrients(kcal=0, protein=0, fat=0, saturated_fat=0, carbs=0, sugar=0, fiber=0, salt=0)
+
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    (upload_dir / "porridge.jpg").write_bytes(b"jpeg")
+
+    with patch.object(ai_content_normalizer, "llm_cache", LLMCache(directory=str(tmp_path / "cache"), max_bytes=10_000)), \
+         patch.object(ai_content_normalizer.image_utils, "UPLOAD_DIR", str(upload_dir)), \
+         patch.object(ai_content_normalizer, "_stream_recipe", new_callable=AsyncMock) as mock_stream, \
+         patch.object(ai_content_normalizer, "generate_image", new_callable=AsyncMock) as mock_image, \
+         patch.object(ai_content_normalizer, "calculate_nutrients", new_callable=AsyncMock) as mock_nutrients:
+
+        async def image_job():
+            return "/uploads/porridge.jpg"
+
+        mock_stream.side_effect = lambda prompt: (model_data, asyncio.ensure_future(image_job()), None)
+        mock_nutrients.return_value = empty_nutrients
+
+        first = await ai_content_normalizer.call_gemini("Haferflocken mit Milch kochen")
+        second = await ai_content_normalizer.call_gemini("Haferflocken mit Milch kochen")
+
+    # Treffer nutzt JSON und Bildpfad aus dem Cache, weder Text- noch Bildmodell laufen erneut
+    assert mock_stream.await_count == 1
+    assert mock_image.await_count == 0
+    assert second["title"] == first["title"] == "Porridge"
+    assert second["image"] == "/uploads/porridge.jpg"
+    assert second["content"]["tags"] == ["Frühstück", "< 30min"]
+
+async def test_image_cache_reuses_generated_images(tmp_path):
+
+    import os
+    from unittest.mock import patch, AsyncMock, MagicMock
+    from services import ai_image_generator
+    from services.image_cache import ImageCache
+    from services.llm_cache import LLMCache
+    from utils import image_utils
+
+    (tmp_path / "carbonara.jpg").write_bytes(b"jpeg")
+    cache = ImageCache(LLMCache(directory=str(tmp_path / "cache"), max_bytes=100_000), similarity_threshold=0.6)
+
+    with patch.object(image_utils, "UPLOAD_DIR", str(tmp_path)):
+        cache.set("Spaghetti Carbonara", "Spaghetti with egg yolk, pecorino and crispy guanciale in a white bowl.", "/uploads/carbonara.jpg")
+
+        # Gleiche Beschreibung bis auf Schreibweise, ähnliche Beschreibung, anderes Gericht, gelöschte Datei.
+        # Ein Treffer erneuert die mtime, damit der GC-Sweep das Bild vor create_recipe nicht löscht
+        os.utime(tmp_path / "carbonara.jpg", (0, 0))
+        assert cache.get("spaghetti carbonara", "spaghetti with egg yolk pecorino and crispy guanciale in a white bowl") == "/uploads/carbonara.jpg"
+        assert (tmp_path / "carbonara.jpg").stat().st_mtime > 0
+        assert cache.get("Spaghetti Carbonara", "Spaghetti with egg yolk, pecorino and guanciale in a white bowl.") == "/uploads/carbonara.jpg"
+        assert cache.get("Lasagne", "Layered pasta with egg yolk, pecorino and crispy guanciale in a white bowl.") is None
+        assert cache.stats()["hits"] == 1 and cache.stats()["near_hits"] == 1
+
+        recipe = '{"title": "Spaghetti Carbonara", "visual_summary": "Spaghetti with egg yolk, pecorino and crispy guanciale in a white bowl.", "content":'
+        client = MagicMock()
+        client.aio.models.generate_content = AsyncMock()
+
+        with patch.object(ai_image_generator, "image_cache", cache):
+            assert await ai_image_generator.generate_image(client=client, recipe=recipe) == "/uploads/carbonara.jpg"
+            assert client.aio.models.generate_content.await_count == 0
+
+            (tmp_path / "carbonara.jpg").unlink()
+            assert cache.get("Spaghetti Carbonara", "Spaghetti with egg yolk, pecorino and crispy guanciale in a white bowl.") is None
+
+def test_sqlite_engine_profile(tmp_path):
+
+    from sqlalchemy import create_engine, text
+    from database import engine_options, register_sqlite_pragmas
+
+    url = f"sqlite:///{tmp_path}/profile.db"
+    engine = create_engine(url, **engine_options(url))
+    register_sqlite_pragmas(engine)
+
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+    engine.dispose()
+
+    assert engine_options("postgresql://u:p@db/bitewise")["pool_pre_ping"] is True
+
+def test_image_variants_written_and_recorded(tmp_path):
+
+    import io
+    from unittest.mock import patch
+    from PIL import Image
+    from utils import image_utils
+
+    buffer = io.BytesIO()
+    Image.new("RGBA", (1024, 768), (200, 120, 40, 255)).save(buffer, "PNG")
+
+    with patch.object(image_utils, "UPLOAD_DIR", str(tmp_path)):
+        image = image_utils._save_image_sync(buffer.getvalue(), tmp_path)
+        variants = image_utils.variants_for(image)
+
+        stem = image.removeprefix("/uploads/").removesuffix(".jpg")
+        assert variants["card"]["webp"] == f"/uploads/{stem}-card.webp"
+        with Image.open(tmp_path / f"{stem}-card.webp") as card:
+            assert card.size == (480, 360)
+        # Kleiner als das Original wird nie hochskaliert
+        with Image.open(tmp_path / f"{stem}-detail.webp") as detail:
+            assert detail.size == (1024, 768)
+
+        # Gleiche Bytes landen im selben Content-addressed Pfad
+        assert image_utils._save_image_sync(buffer.getvalue(), tmp_path) == image
+        assert len(list(tmp_path.glob("*.jpg"))) == 1
+
+        # Backfill erzeugt fehlende Varianten nach, vorhandene bleiben unangetastet
+        (tmp_path / f"{stem}-card.webp").unlink()
+        assert image_utils.create_missing_variants(tmp_path / f"{stem}.jpg") is True
+        assert image_utils.create_missing_variants(tmp_path / f"{stem}.jpg") is False
+
+async def test_uploads_served_immutable_with_etag_and_ranges(tmp_path):
+
+    from fastapi import FastAPI
+    from httpx import AsyncClient, ASGITransport
+    from utils.static_files import ImmutableStaticFiles
+
+    (tmp_path / "abc.jpg").write_bytes(b"0123456789")
+    app = FastAPI()
+    app.mount("/uploads", ImmutableStaticFiles(directory=str(tmp_path)), name="uploads")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/uploads/abc.jpg")
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert response.headers["etag"] == '"abc.jpg"'
+        assert response.headers["accept-ranges"] == "bytes"
+
+        response = await client.get("/uploads/abc.jpg", headers={"If-None-Match": '"abc.jpg"'})
+        assert response.status_code == 304
+
+        response = await client.get("/uploads/abc.jpg", headers={"Range": "bytes=2-5"})
+        assert response.status_code == 206
+        assert response.content == b"2345"
+
+    accel_app = FastAPI()
+    accel_app.mount("/uploads", ImmutableStaticFiles(directory=str(tmp_path), accel_redirect_prefix="/_uploads/"), name="uploads")
+    async with AsyncClient(transport=ASGITransport(app=accel_app), base_url="http://test") as client:
+        response = await client.get("/uploads/abc.jpg")
+        assert response.headers["x-accel-redirect"] == "/_uploads/abc.jpg"
+        assert response.headers["content-type"] == "image/jpeg"
+        assert response.content == b""
+
+async def test_tiktok_fetches_oembed_and_audio_concurrently(tmp_path):
+
+    import asyncio
+    import threading
+    from pathlib import Path
+    from unittest.mock import patch, AsyncMock, MagicMock
+    from services import tiktok_content_generator
+    from utils import audio_utils
+
+    oembed_started = asyncio.Event()
+    download_started = threading.Event()
+    loop = asyncio.get_running_loop()
+
+    async def fetch_oembed(url):
+        oembed_started.set()
+        # Läuft der Download erst danach, wartet dieser Aufruf vergeblich
+        await asyncio.to_thread(download_started.wait, 2)
+        assert download_started.is_set()
+        return {"title": "Pasta in 10 Minuten"}
+
+    def download_audio(url, tmpdir):
+        download_started.set()
+        asyncio.run_coroutine_threadsafe(oembed_started.wait(), loop).result(timeout=2)
+        path = Path(tmpdir) / "video.mp4"
+        path.write_bytes(b"audio")
+        return path
+
+    transcription = MagicMock(text="Nudeln kochen")
+    with patch.object(tiktok_content_generator, "_fetch_oembed", fetch_oembed), \
+         patch.object(tiktok_content_generator, "_download_audio", download_audio), \
+         patch.object(audio_utils.shutil, "which", return_value=None), \
+         patch.object(tiktok_content_generator.transcription.openai_client.audio.transcriptions, "create", new_callable=AsyncMock, return_value=transcription) as mock_transcribe, \
+         patch.object(tiktok_content_generator.ai_content_normalizer, "call_gemini", new_callable=AsyncMock, return_value={"title": "Pasta"}) as mock_gemini:
+
+        result = await tiktok_content_generator.transcribe_and_generate("https://www.tiktok.com/@koch/video/1")
+
+    # Ohne ffmpeg wird das Original hochgeladen
+    assert mock_transcribe.await_args.kwargs["file"].name.endswith("video.mp4")
+    assert mock_gemini.await_args.args[0] == "Videobeschreibung: Pasta in 10 Minuten | Audio: Nudeln kochen"
+    assert result == {"title": "Pasta"}
+
+    command = audio_utils.transcode_command(Path("in.mp4"), Path("out.ogg"))
+    assert command[command.index("-ac") + 1] == "1"
+    assert "libopus" in command and "areverse" in command[command.index("-af") + 1]
+
+async def test_whisper_backend_transcribes_chunks_in_order():
+
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    from pathlib import Path
+    import pytest
+    from unittest.mock import patch, AsyncMock, MagicMock
+    from services import transcription
+    from utils import audio_utils
+
+    rate = transcription.WHISPER_SAMPLE_RATE
+    # 70 s Ton mit einer Pause bei 29 s: der erste Schnitt landet in der Pause statt genau bei 30 s
+    samples = np.full(70 * rate, 0.5, dtype=np.float32)
+    samples[int(29 * rate):int(29.2 * rate)] = 0.0
+
+    chunks = audio_utils.split_chunks(samples, chunk_samples=30 * rate, search_samples=2 * rate)
+    assert len(chunks) == 3
+    assert 29 * rate < len(chunks[0]) < 29.2 * rate
+    assert sum(len(chunk) for chunk in chunks) == len(samples)
+
+    class FakeModel:
+        def transcribe(self, chunk, **options):
+            return {"text": f" {len(chunk) // rate}s "}
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    with patch.object(transcription.settings, "TRANSCRIPTION_BACKEND", "whisper"), \
+         patch.object(transcription.audio_utils, "decode_pcm", new_callable=AsyncMock, return_value=samples), \
+         patch.object(transcription, "_get_executor", return_value=executor), \
+         patch.object(transcription, "_model", FakeModel()):
+        text = await transcription.transcribe(Path("video.ogg"))
+    executor.shutdown()
+
+    assert text == " ".join(f"{len(chunk) // rate}s" for chunk in chunks)
+
+    # Fehlgeschlagener Initializer: Pool wird verworfen statt jeden weiteren Import mit BrokenProcessPool scheitern zu lassen
+    from concurrent.futures.process import BrokenProcessPool
+    broken = MagicMock()
+    broken.submit.side_effect = BrokenProcessPool("initializer failed")
+    with patch.object(transcription.settings, "TRANSCRIPTION_BACKEND", "whisper"), \
+         patch.object(transcription.audio_utils, "decode_pcm", new_callable=AsyncMock, return_value=samples), \
+         patch.object(transcription, "_executor", broken):
+        with pytest.raises(BrokenProcessPool):
+            await transcription.transcribe(Path("video.ogg"))
+        assert transcription._executor is None
+
+    # Ohne whisper/torch bricht schon der Start ab
+    with patch.object(transcription.settings, "TRANSCRIPTION_BACKEND", "whisper"), \
+         patch.object(transcription.importlib.util, "find_spec", return_value=None):
+        with pytest.raises(RuntimeError, match="whisper"):
+            transcription.check_backend()
+
+def test_structured_recipe_replaces_full_page_prompt():
+
+    import json
+    from services.html_cleaner import clean_html
+
+    json_ld = {
+        "@context": "https://schema.org",
+        "@graph": [
+            {"@type": "WebPage", "name": "Blog"},
+            {
+                "@type": ["Recipe"],
+                "name": "Linsen-Dal &amp; Reis",
+                "recipeYield": ["4", "4 Portionen"],
+                "prepTime": "PT10M",
+                "cookTime": "PT1H",
+                "recipeIngredient": ["200 g rote Linsen", "1 Dose Kokosmilch"],
+                "recipeInstructions": [
+                    {"@type": "HowToSection", "name": "Dal", "itemListElement": [{"@type": "HowToStep", "text": "<p>Linsen waschen.</p>"}]},
+                    {"@type": "HowToStep", "text": "Mit Kokosmilch köcheln."}
+                ]
+            }
+        ]
+    }
+    page = f'<html><head><script type="application/ld+json">{json.dumps(json_ld)}</script></head><body><nav>Menü</nav>{"<p>Anekdote</p>" * 500}</body></html>'
+
+    prompt, source = clean_html(page, max_tokens=6000)
+    recipe = json.loads(prompt.split(": ", 1)[1])
+
+    assert source == "structured"
+    assert "Anekdote" not in prompt
+    assert recipe == {
+        "title": "Linsen-Dal & Reis",
+        "servings": 4,
+        "cooking_time": 70,
+        "ingredients": ["200 g rote Linsen", "1 Dose Kokosmilch"],
+        "steps": ["Linsen waschen.", "Mit Kokosmilch köcheln."]
+    }
+
+    microdata = """<div itemscope itemtype="http://schema.org/Recipe"><h1 itemprop="name">Porridge</h1>
+        <meta itemprop="totalTime" content="PT15M"><span itemprop="recipeIngredient">80 g Haferflocken</span>
+        <div itemprop="recipeInstructions">Alles aufkochen.</div></div>"""
+    prompt, source = clean_html(microdata, max_tokens=6000)
+    assert source == "structured" and '"cooking_time":15' in prompt
+
+    # Ohne Schritte reicht das Markup nicht, das LLM bekommt wie bisher die bereinigte Seite
+    prompt, source = clean_html('<div itemscope itemtype="https://schema.org/Recipe"><span itemprop="name">Dal</span></div><p>Text</p>', max_tokens=6000)
+    assert source == "html" and "<p>Text</p>" in prompt
+
+def test_prompt_compaction_regression_corpus():
+
+    import json
+    from pathlib import Path
+    from unittest.mock import patch
+    from services import html_cleaner, prompt_compaction
+
+    corpus = Path(__file__).parent / "corpus"
+    expected = json.loads((corpus / "expected.json").read_text(encoding="utf-8"))
+
+    for name, facts in expected.items():
+        page = (corpus / name).read_text(encoding="utf-8")
+
+        full, _ = html_cleaner.clean_html(page, max_tokens=10**9)
+        compacted, source = html_cleaner.clean_html(page, max_tokens=300)
+
+        # Rezeptinhalt (Titel, Zutaten, Schritte) bleibt, Kommentare und weitere Rezepte fliegen raus
+        assert source == "html"
+        for fact in facts["keep"]:
+            assert fact in compacted, f"{name}: {fact}"
+        for fact in facts["drop"]:
+            assert fact not in full, f"{name}: {fact}"
+
+        # Doppelte Absätze kommen nur einmal vor, das Budget greift bei langen Seiten
+        assert compacted.count("Letzten Sommer waren wir in der Toskana") <= 2
+        assert compacted.count("Der Teig gelingt am besten") <= 1
+        assert prompt_compaction.count_tokens(compacted) <= max(400, prompt_compaction.count_tokens(full) // 3)
+
+def test_html_cleaner_matches_golden_files():
+
+    from pathlib import Path
+    from unittest.mock import patch
+    from services import html_cleaner, prompt_compaction
+
+    corpus = Path(__file__).parent / "corpus"
+    pages = sorted(corpus.glob("*.html"))
+    assert pages
+
+    # Goldens stammen vom früheren BeautifulSoup-Cleaner, Tokens mit der Längen-Schätzung (unabhängig vom tiktoken-Download)
+    with patch.object(prompt_compaction, "_encoding", lambda: None):
+        for page in pages:
+            html_content = page.read_text(encoding="utf-8")
+            for budget, suffix in ((6000, ".golden.txt"), (300, ".golden-300.txt")):
+                expected = (corpus / f"{page.stem}{suffix}").read_text(encoding="utf-8").rstrip("\n")
+                assert html_cleaner.clean_html(html_content, max_tokens=budget)[0] == expected, f"{page.name} ({budget})"
+
+    assert html_cleaner.clean_html("", max_tokens=6000) == ("", "html")
+
+async def test_http_client_is_shared_and_limits_per_host():
+
+    import asyncio
+    import httpx
+    import pytest
+    from unittest.mock import patch
+    from utils import http_client
+
+    in_flight = {}
+    peak = {}
+
+    async def handler(request):
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        if request.url.path == "/broken":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"host": host})
+
+    transport = httpx.MockTransport(handler)
+    with patch.object(http_client.settings, "HTTP_MAX_CONNECTIONS_PER_HOST", 2), \
+         patch.object(http_client.httpx, "AsyncHTTPTransport", lambda **kwargs: transport):
+        await http_client.close()
+        client = http_client._get_client()
+
+        responses = await asyncio.gather(
+            *(http_client.get(f"https://blog.example/rezept/{i}") for i in range(6)),
+            http_client.get("https://www.tiktok.com/oembed"),
+            http_client.head("https://vm.tiktok.com/abc")
+        )
+        with pytest.raises(httpx.ConnectError):
+            await http_client.get("https://blog.example/broken")
+
+        # Ein Client für alle Aufrufer, ein Host kann die übrigen nicht verdrängen
+        assert http_client._get_client() is client
+        assert all(response.status_code == 200 for response in responses)
+        assert peak["blog.example"] == 2
+
+        stats = http_client.stats()
+        assert stats["requests"] >= 9 and stats["errors"] >= 1
+        assert stats["in_flight_per_host"] == {}
+
+        await http_client.close()
+        assert client.is_closed
+
+async def test_call_gemini_pipelines_ingredients_while_streaming(tmp_path):
+
+    import asyncio
+    import json
+    from contextlib import asynccontextmanager
+    from unittest.mock import patch, AsyncMock, MagicMock
+    from services import ai_content_normalizer, nutrients_calculator
+    from services.llm_cache import LLMCache
+    from cache import nutrients_cache
+
+    def ingredient(name, slug, weight, kcal):
+        per_100g = {"kcal": kcal, "protein": 0, "fat": 0, "saturated_fat": 0, "carbs": 0, "sugar": 0, "fiber": 0, "salt": 0}
+        return {"name": name, "id_slug": slug, "search_term": slug, "amount": weight, "unit": "g", "est_weight_g": weight, "per_100g": per_100g}
+
+    model_data = {
+        "title": "Linsen-Dal",
+        "visual_summary": "Orange lentil curry with coriander.",
+        "content": {
+            "servings": 2,
+            "cooking_time": 25,
+            "ingredients": [ingredient("Rote Linsen", "red-lentil", 200, 350), ingredient("Kokosmilch", "coconut-milk", 400, 200), ingredient("Zwiebel", "onion", 100, 40)],
+            "steps": ["Koche die Linsen.", "Rühre die Kokosmilch ein."],
+            "tags": ["vegan", "Hauptspeise"],
+            "nutrients": None
+        }
+    }
+    text = json.dumps(model_data, ensure_ascii=False)
+    steps_at = text.index('"steps"')
+    events = []
+    sessions = []
+
+    async def stream():
+        # Kleine Chunks, die Schlüssel und Strings zerschneiden. sleep(0) statt Netzwerk-Wartezeit
+        for start in range(0, len(text), 7):
+            await asyncio.sleep(0)
+            if start <= steps_at < start + 7:
+                events.append("steps")
+            yield MagicMock(text=text[start:start + 7])
+
+    @asynccontextmanager
+    async def session():
+        sessions.append(object())
+        yield sessions[-1]
+
+    async def resolve(fallbacks, db):
+        events.extend(f"resolve:{slug}" for slug in fallbacks)
+        return fallbacks
+
+    async def image(client, recipe):
+        events.append("image")
+        assert json.loads(recipe) == {"title": "Linsen-Dal", "visual_summary": "Orange lentil curry with coriander."}
+        return "/uploads/dal.jpg"
+
+    # Linsen liegen schon im Cache, Kokosmilch und Zwiebel müssen in die Datenbank
+    nutrients_cache.clear()
+    nutrients_cache.set("red-lentil", model_data["content"]["ingredients"][0]["per_100g"])
+
+    client = MagicMock()
+    client.aio.models.generate_content_stream = AsyncMock(return_value=stream())
+    with patch.object(ai_content_normalizer, "llm_cache", LLMCache(directory=str(tmp_path), max_bytes=100_000)), \
+         patch.object(ai_content_normalizer, "client", client), \
+         patch.object(nutrients_calculator, "AsyncSessionLocal", session), \
+         patch.object(nutrients_calculator, "_resolve_nutrients", side_effect=resolve), \
+         patch.object(ai_content_normalizer, "generate_image", side_effect=image), \
+         patch.object(ai_content_normalizer, "calculate_nutrients", new_callable=AsyncMock) as mock_calculate:
+
+        result = await ai_content_normalizer.call_gemini("Dal mit Linsen und Kokosmilch")
+    nutrients_cache.clear()
+
+    # Bild und Datenbank-Abfragen laufen, bevor das Modell bei den Schritten ist. Cache-Treffer gehen nicht an die
+    # Datenbank, alle Fehlenden teilen sich eine Session
+    assert events.index("image") < events.index("steps")
+    assert events.index("resolve:coconut-milk") < events.index("resolve:onion") < events.index("steps")
+    assert "resolve:red-lentil" not in events
+    assert len(sessions) == 1 and mock_calculate.await_count == 0
+    assert result["image"] == "/uploads/dal.jpg"
+    assert result["content"]["nutrients"]["kcal"] == 700 + 800 + 40
@@ -1,7 +1,7 @@
-from unittest.mock import patch, AsyncMock, MagicMock
+from unittest.mock import patch, AsyncMock
 from routers.auth import create_access_token
 
-async def test_create_recipe_from_website_url_mocked(client, db_session):
+async def test_create_recipe_from_website_url_mocked(client, db_session, import_worker):
 
     from crud import create_user
     from schemas import UserCreate
@@ -30,28 +30,315 @@ async def test_create_recipe_from_website_url_mocked(client, db_session):
         "image": "fake_base64"
     }
 
-    # Mock für das Datenbank-Objekt, das crud.create_recipe normalerweise zurückgibt
-    mock_recipe_db = MagicMock()
-    mock_recipe_db.id = 1
-    mock_recipe_db.title = "Test Pasta"
-    mock_recipe_db.url = "https://test.de"
-    mock_recipe_db.image = "fake_base64"
-    mock_recipe_db.owner_id = user.id
-    mock_recipe_db.content = mock_ai_data["content"]
-
-    # WICHTIG: Pfade müssen auf "main" zeigen, da dort die Imports liegen
-    with patch("routers.recipes.website_content_generator.scrape_and_generate", new_callable=AsyncMock) as mock_scrape:
-        with patch("routers.recipes.crud.create_recipe") as mock_crud:
-            
-            mock_scrape.return_value = mock_ai_data
-            mock_crud.return_value = mock_recipe_db
-
-            response = await client.post(
-                "/recipes/from-url?url=https://test.de",
-                cookies=cookies
-            )
-
-            assert response.status_code == 200
-            data = response.json()
-            assert data["title"] == "Test Pasta"
-            assert data["id"] == 1
\ No newline at end of file
+    with patch("services.import_jobs.website_content_generator.scrape_and_generate", new_callable=AsyncMock) as mock_scrape:
+        mock_scrape.return_value = mock_ai_data
+
+        response = await client.post(
+            "/recipes/from-url?url=https://test.de",
+            cookies=cookies
+        )
+
+        # Antwort kommt sofort, die Pipeline läuft im Worker
+        assert response.status_code == 202
+        job = response.json()
+        assert response.headers["Location"] == f"/recipes/jobs/{job['id']}"
+
+        await import_worker._queue.join()
+
+    job = (await client.get(f"/recipes/jobs/{job['id']}", cookies=cookies)).json()
+    assert job["status"] == "done"
+
+    recipe = (await client.get(f"/recipes/{job['recipe_id']}", cookies=cookies)).json()
+    assert recipe["title"] == "Test Pasta"
+    assert recipe["url"] == "https://test.de/"
+    # Abgerufen wird die eingegebene URL, gespeichert die kanonische
+    mock_scrape.assert_awaited_once_with("https://test.de")
+
+async def test_import_jobs_survive_restart(client, db_session):
+
+    from datetime import datetime, timedelta, timezone
+    from crud import create_user, create_import_job
+    from services.import_jobs import ImportWorkerPool
+    from services.ai_content_normalizer import NoRecipeFoundError
+    from conftest import TestingAsyncSessionLocal
+    from schemas import UserCreate
+
+    user = create_user(db_session, UserCreate(email="jobs@test.de", password="123", invite_code="X"))
+    cookies = {"access_token": create_access_token({"sub": user.email})}
+
+    # Zustand nach einem Absturz: ein Job lief gerade (Lease abgelaufen), einer wartete noch.
+    # Ein dritter läuft mit frischem Heartbeat in einem anderen Prozess und darf nicht erneut starten.
+    running = create_import_job(db_session, user_id=user.id, kind="user_input", payload="Pfannkuchen")
+    running.status, running.attempts = "running", 1
+    running.updated_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    elsewhere = create_import_job(db_session, user_id=user.id, kind="user_input", payload="Waffeln")
+    elsewhere.status, elsewhere.attempts = "running", 1
+    db_session.commit()
+    queued = create_import_job(db_session, user_id=user.id, kind="user_input", payload="Kein Rezept")
+
+    async def generate(user_input):
+        if user_input == "Kein Rezept":
+            raise NoRecipeFoundError("No recipe found")
+        return {"title": "Pfannkuchen", "content": {"servings": 2, "ingredients": [], "steps": [], "cooking_time": 15, "tags": []}, "image": "/uploads/x.jpg"}
+
+    with patch("services.import_jobs.user_content_generator.generate_from_input", side_effect=generate):
+        worker = ImportWorkerPool(concurrency=2, session_factory=TestingAsyncSessionLocal)
+        await worker.start()
+        await worker._queue.join()
+        await worker.stop()
+
+    # Der Worker schreibt über eine eigene Session, die Test-Session muss neu laden
+    db_session.expire_all()
+    first = (await client.get(f"/recipes/jobs/{running.id}", cookies=cookies)).json()
+    second = (await client.get(f"/recipes/jobs/{queued.id}", cookies=cookies)).json()
+    assert first["status"] == "done" and first["recipe_id"] is not None
+    assert second == {"id": queued.id, "status": "not_found", "recipe_id": None, "error": "No recipe found", "input_tokens": None}
+    assert (await client.get(f"/recipes/jobs/{elsewhere.id}", cookies=cookies)).json()["status"] == "running"
+    assert worker.stats()["completed"] == 1
+
+async def test_import_worker_survives_database_errors(client, db_session):
+
+    import crud
+    from sqlalchemy.exc import OperationalError
+    from crud import create_user, create_import_job
+    from services.import_jobs import ImportWorkerPool
+    from conftest import TestingAsyncSessionLocal
+    from schemas import UserCreate
+
+    user = create_user(db_session, UserCreate(email="locked@test.de", password="123", invite_code="X"))
+    cookies = {"access_token": create_access_token({"sub": user.email})}
+    locked = create_import_job(db_session, user_id=user.id, kind="user_input", payload="Pfannkuchen")
+    later = create_import_job(db_session, user_id=user.id, kind="user_input", payload="Waffeln")
+
+    start_import_job = crud.start_import_job_async
+    async def start_once_locked(db, job_id):
+        if job_id == locked.id:
+            raise OperationalError("UPDATE import_jobs", {}, Exception("database is locked"))
+        return await start_import_job(db, job_id)
+
+    recipe = {"title": "Waffeln", "content": {"servings": 2, "ingredients": [], "steps": [], "cooking_time": 15, "tags": []}, "image": "/uploads/x.jpg"}
+    with patch("services.import_jobs.crud.start_import_job_async", side_effect=start_once_locked), \
+         patch("services.import_jobs.user_content_generator.generate_from_input", new_callable=AsyncMock, return_value=recipe):
+        worker = ImportWorkerPool(concurrency=1, session_factory=TestingAsyncSessionLocal)
+        await worker.start()
+        await worker._queue.join()
+        await worker.stop()
+
+    # Fehler beim Starten beendet nur diesen Job, derselbe Worker arbeitet den nächsten ab
+    db_session.expire_all()
+    assert (await client.get(f"/recipes/jobs/{locked.id}", cookies=cookies)).json()["status"] == "failed"
+    assert (await client.get(f"/recipes/jobs/{later.id}", cookies=cookies)).json()["status"] == "done"
+    assert worker.stats()["failed"] == 1 and worker.stats()["completed"] == 1
+
+async def test_get_recipes_search_tags_and_cursor(client, db_session):
+
+    from crud import create_user, create_recipe
+    from schemas import UserCreate, RecipeCreate
+
+    user = create_user(
+        db_session,
+        UserCreate(email="filter@test.de", password="123", invite_code="X")
+    )
+    cookies = {"access_token": create_access_token({"sub": user.email})}
+
+    def make_recipe(title, tags):
+        content = {"servings": 2, "ingredients": [], "steps": [], "cooking_time": 20, "tags": tags}
+        return create_recipe(db_session, RecipeCreate(title=title, content=content, image="/uploads/x.jpg"), user.id)
+
+    make_recipe("Linsen Curry", ["vegan", "Hauptspeise"])
+    make_recipe("Linsensuppe", ["vegan"])
+    make_recipe("Pfannkuchen", ["vegetarisch", "Frühstück"])
+
+    response = await client.get("/recipes/?q=linsen&tag=vegan&tag=Hauptspeise", cookies=cookies)
+    assert [r["title"] for r in response.json()] == ["Linsen Curry"]
+
+    # Infix-Suche über den Trigramm-Index, kurze Suchen und Wildcard-Zeichen über ILIKE
+    response = await client.get("/recipes/?q=SUPPE", cookies=cookies)
+    assert [r["title"] for r in response.json()] == ["Linsensuppe"]
+    response = await client.get("/recipes/?q=fa", cookies=cookies)
+    assert [r["title"] for r in response.json()] == ["Pfannkuchen"]
+    response = await client.get("/recipes/?q=%25", cookies=cookies)
+    assert response.json() == []
+
+    first_page = await client.get("/recipes/?limit=2", cookies=cookies)
+    assert len(first_page.json()) == 2
+    next_cursor = first_page.headers["X-Next-Cursor"]
+
+    second_page = await client.get(f"/recipes/?limit=2&cursor={next_cursor}", cookies=cookies)
+    assert [r["title"] for r in second_page.json()] == ["Pfannkuchen"]
+    assert "X-Next-Cursor" not in second_page.headers
+
+async def test_fulltext_search_ranks_and_stays_in_sync(client, db_session):
+
+    from crud import create_user, create_recipe, update_recipe, delete_recipe
+    from schemas import UserCreate, RecipeCreate, RecipeUpdate
+
+    user = create_user(
+        db_session,
+        UserCreate(email="search@test.de", password="123", invite_code="X")
+    )
+    cookies = {"access_token": create_access_token({"sub": user.email})}
+
+    def make_content(ingredient, steps):
+        return {
+            "servings": 2, "steps": steps, "cooking_time": 20, "tags": [],
+            "ingredients": [{"name": ingredient, "search_term": "chickpea"}]
+        }
+
+    curry = create_recipe(db_session, RecipeCreate(title="Kichererbsen Curry", content=make_content("Kichererbsen", ["Koche alles"]), image="/uploads/a.jpg"), user.id)
+    salad = create_recipe(db_session, RecipeCreate(title="Salat", content=make_content("Kichererbsen", ["Mische alles"]), image="/uploads/b.jpg"), user.id)
+
+    response = await client.get("/recipes/search?q=kichererbse", cookies=cookies)
+    assert [r["title"] for r in response.json()] == ["Kichererbsen Curry", "Salat"]
+
+    response = await client.get("/recipes/search?q=chickpea", cookies=cookies)
+    assert len(response.json()) == 2
+
+    update_recipe(RecipeUpdate(title="Salat", content=make_content("Linsen", ["Mische alles"])), db_session, salad.id, user.id)
+    delete_recipe(db_session, curry.id, user.id)
+
+    response = await client.get("/recipes/search?q=Kichererbsen", cookies=cookies)
+    assert response.json() == []
+
+async def test_tag_counts_follow_recipe_changes(client, db_session):
+
+    from crud import create_user, create_recipe, update_recipe
+    from schemas import UserCreate, RecipeCreate, RecipeUpdate
+
+    user = create_user(
+        db_session,
+        UserCreate(email="tags@test.de", password="123", invite_code="X")
+    )
+    cookies = {"access_token": create_access_token({"sub": user.email})}
+
+    def make_content(tags):
+        return {"servings": 2, "ingredients": [], "steps": [], "cooking_time": 20, "tags": tags}
+
+    first = create_recipe(db_session, RecipeCreate(title="A", content=make_content(["vegan", "Hauptspeise"]), image="/uploads/a.jpg"), user.id)
+    create_recipe(db_session, RecipeCreate(title="B", content=make_content(["vegan"]), image="/uploads/b.jpg"), user.id)
+
+    response = await client.get("/recipes/tags", cookies=cookies)
+    assert response.json() == [{"tag": "vegan", "count": 2}, {"tag": "Hauptspeise", "count": 1}]
+
+    update_recipe(RecipeUpdate(title="A", content=make_content(["Dessert", "vegan"])), db_session, first.id, user.id)
+
+    response = await client.get("/recipes/tags", cookies=cookies)
+    assert response.json() == [{"tag": "vegan", "count": 2}, {"tag": "Dessert", "count": 1}]
+
+async def test_recipes_by_nutrient_ranges(client, db_session):
+
+    from crud import create_user, create_recipe
+    from schemas import UserCreate, RecipeCreate
+
+    user = create_user(
+        db_session,
+        UserCreate(email="macros@test.de", password="123", invite_code="X")
+    )
+    cookies = {"access_token": create_access_token({"sub": user.email})}
+
+    def make_content(servings, kcal, protein):
+        nutrients = {"kcal": kcal, "protein": protein, "fat": 0, "saturated_fat": 0, "carbs": 0, "sugar": 0, "fiber": 0, "salt": 0}
+        return {"servings": servings, "ingredients": [], "steps": [], "cooking_time": 20, "tags": [], "nutrients": nutrients}
+
+    create_recipe(db_session, RecipeCreate(title="Bowl", content=make_content(2, 1000, 80), image="/uploads/a.jpg"), user.id)
+    create_recipe(db_session, RecipeCreate(title="Lasagne", content=make_content(2, 1600, 80), image="/uploads/b.jpg"), user.id)
+    create_recipe(db_session, RecipeCreate(title="Salat", content=make_content(1, 300, 10), image="/uploads/c.jpg"), user.id)
+
+    response = await client.get("/recipes/by-nutrients?min_protein=30&max_kcal=600", cookies=cookies)
+    assert [r["title"] for r in response.json()] == ["Bowl"]
+
+    response = await client.get("/recipes/by-nutrients?min_kcal=1200&per_serving=false", cookies=cookies)
+    assert [r["title"] for r in response.json()] == ["Lasagne"]
+
+async def test_async_crud_variants(db_session, async_db_session):
+
+    from crud import create_user, create_recipe_async, get_recipe_by_url_async, get_user_by_email_async, get_nutrients_by_ids_async, upsert_nutrients_async
+    from schemas import UserCreate, RecipeCreate
+
+    user = create_user(db_session, UserCreate(email="async@test.de", password="123", invite_code="X"))
+
+    assert (await get_user_by_email_async(async_db_session, email="async@test.de")).id == user.id
+
+    content = {"servings": 2, "ingredients": [], "steps": [], "cooking_time": 20, "tags": ["vegan"]}
+    recipe = await create_recipe_async(async_db_session, RecipeCreate(title="Async Curry", content=content, url="https://test.de/curry", image="/uploads/a.jpg"), user.id)
+
+    assert recipe.id is not None
+    assert (await get_recipe_by_url_async(url="https://test.de/curry", db=async_db_session))["title"] == "Async Curry"
+
+    per_100g = {"kcal": 50, "protein": 1, "fat": 0, "saturated_fat": 0, "carbs": 10, "sugar": 5, "fiber": 1, "salt": 0}
+    created = await upsert_nutrients_async(async_db_session, {"test-carrot": per_100g})
+    found = await get_nutrients_by_ids_async(["test-carrot", "test-unknown"], async_db_session)
+
+    assert created["test-carrot"]["kcal"] == 50
+    assert list(found) == ["test-carrot"]
+
+async def test_import_job_streams_progress_events(client, db_session, import_worker):
+
+    import asyncio
+    from crud import create_user
+    from schemas import UserCreate
+    from utils.progress import progress, report
+
+    user = create_user(db_session, UserCreate(email="sse@test.de", password="123", invite_code="X"))
+    cookies = {"access_token": create_access_token({"sub": user.email})}
+    release = asyncio.Event()
+
+    async def generate(user_input):
+        report("title", title="Linsensuppe")
+        await release.wait()
+        report("image", image="/uploads/x.jpg")
+        return {"title": "Linsensuppe", "content": {"servings": 2, "ingredients": [], "steps": [], "cooking_time": 30, "tags": []}, "image": "/uploads/x.jpg"}
+
+    with patch("services.import_jobs.user_content_generator.generate_from_input", side_effect=generate):
+        job = (await client.post("/recipes/from-user-input", json={"user_input": "Linsen"}, cookies=cookies)).json()
+
+        stream = asyncio.create_task(client.get(f"/recipes/jobs/{job['id']}/events", cookies=cookies))
+        while job["id"] not in progress._subscribers:
+            await asyncio.sleep(0.01)
+        release.set()
+
+        response = await stream
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n")[0].removeprefix("event: ") for block in response.text.strip().split("\n\n")]
+    # Der Titel kam vor dem Verbinden und wird nachgeliefert
+    assert events == ["title", "image", "done"]
+    assert '"title": "Linsensuppe"' in response.text
+
+    # Nach Abschluss liefert der Stream nur noch den Endzustand
+    response = await client.get(f"/recipes/jobs/{job['id']}/events", cookies=cookies)
+    assert response.text.startswith("event: done\n")
+
+async def test_image_refs_and_gc_sweep(db_session, tmp_path):
+
+    from unittest.mock import patch
+    from crud import create_user, create_recipe, delete_recipe
+    from schemas import UserCreate, RecipeCreate
+    from services import image_gc
+    import models
+
+    user = create_user(db_session, UserCreate(email="images@test.de", password="123", invite_code="X"))
+    (tmp_path / "abc.jpg").write_bytes(b"jpeg")
+    (tmp_path / "abc-card.webp").write_bytes(b"webp")
+    (tmp_path / "unused.jpg").write_bytes(b"jpeg")
+    # Keine Bilder der App, dürfen nie gelöscht werden
+    (tmp_path / ".gitkeep").write_bytes(b"")
+    (tmp_path / "README.backup.txt").write_bytes(b"notes")
+
+    content = {"servings": 2, "ingredients": [], "steps": [], "cooking_time": 20, "tags": []}
+    # Zweites Rezept entspricht einem Re-Import derselben URL, der das Bild mitnutzt
+    original = create_recipe(db_session, RecipeCreate(title="Curry", content=content, image="/uploads/abc.jpg"), user.id)
+    copy = create_recipe(db_session, RecipeCreate(title="Curry", content=content, image="/uploads/abc.jpg"), user.id)
+    assert db_session.get(models.ImageRef, "/uploads/abc.jpg").ref_count == 2
+
+    with patch.object(image_gc.settings, "UPLOAD_DIR", str(tmp_path)):
+        delete_recipe(db_session, original.id, user.id)
+        assert image_gc.sweep(db_session, grace_seconds=0)["removed_files"] == 1
+        assert sorted(path.name for path in tmp_path.iterdir()) == [".gitkeep", "README.backup.txt", "abc-card.webp", "abc.jpg"]
+
+        delete_recipe(db_session, copy.id, user.id)
+        result = image_gc.sweep(db_session, grace_seconds=0)
+
+    assert result == {"removed_files": 2, "freed_bytes": 8, "removed_refs": 1}
+    assert sorted(path.name for path in tmp_path.iterdir()) == [".gitkeep", "README.backup.txt"]
+    assert db_session.get(models.ImageRef, "/uploads/abc.jpg") is None
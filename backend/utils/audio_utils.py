@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import shutil
+from pathlib import Path
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _silence_filter(threshold_db: int) -> str:
+    # silenceremove schneidet nur am Anfang, für das Ende wird das Signal zweimal umgedreht
+    trim = f"silenceremove=start_periods=1:start_threshold={threshold_db}dB:start_silence=0.2"
+    return f"{trim},areverse,{trim},areverse"
+
+def transcode_command(source: Path, target: Path) -> list:
+    return [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        "-i", str(source),
+        "-vn", "-ac", "1", "-ar", str(settings.TIKTOK_AUDIO_SAMPLE_RATE),
+        "-af", _silence_filter(settings.TIKTOK_AUDIO_SILENCE_DB),
+        "-t", str(settings.TIKTOK_AUDIO_MAX_SECONDS),
+        "-c:a", "libopus", "-b:a", settings.TIKTOK_AUDIO_BITRATE, "-application", "voip",
+        str(target)
+    ]
+
+async def prepare_for_transcription(source: Path) -> Path:
+    # Kleines Mono-Opus statt der Originaldatei hochladen. Ohne ffmpeg oder bei Fehlern bleibt es beim Original.
+    if shutil.which("ffmpeg") is None:
+        return source
+
+    target = source.with_name(f"{source.stem}.transcribe.ogg")
+    process = await asyncio.create_subprocess_exec(
+        *transcode_command(source, target),
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+
+    # Komplett stilles Audio ergibt eine leere Datei, dann lieber das Original transkribieren
+    if process.returncode != 0 or not target.exists() or target.stat().st_size == 0:
+        logger.warning("Audio transcode failed for %s: %s", source.name, stderr.decode(errors="replace").strip())
+        return source
+
+    return target
+
+async def decode_pcm(source: Path, sample_rate: int) -> np.ndarray:
+    # Mono float32 wie whisper.load_audio, aber ohne torch/whisper im Hauptprozess zu importieren
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-i", str(source),
+        "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode {source.name}: {stderr.decode(errors='replace').strip()}")
+
+    return np.frombuffer(stdout, np.int16).astype(np.float32) / 32768.0
+
+def split_chunks(samples: np.ndarray, chunk_samples: int, search_samples: int) -> list:
+    # Schnitt an der leisesten Stelle kurz vor der Chunk-Grenze, damit möglichst kein Wort zerteilt wird
+    frame = 400  # 25 ms bei 16 kHz
+    chunks = []
+    start = 0
+
+    while len(samples) - start > chunk_samples:
+        window_start = start + chunk_samples - search_samples
+        window = samples[window_start:start + chunk_samples]
+        energy = np.convolve(window ** 2, np.ones(frame), mode="valid")
+        cut = window_start + int(np.argmin(energy)) + frame // 2
+
+        chunks.append(samples[start:cut])
+        start = cut
+
+    chunks.append(samples[start:])
+    return chunks
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Optional
+import httpx
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+_transport: Optional[httpx.AsyncHTTPTransport] = None
+# Pro Host begrenzen, damit ein einzelner Rezeptblog oder TikTok nicht alle Verbindungen belegt
+_host_limits: dict[str, asyncio.Semaphore] = {}
+_in_flight: dict[str, int] = {}
+_stats = {"requests": 0, "errors": 0, "http2_responses": 0, "tcp_connects": 0, "tls_handshakes": 0}
+
+
+def _http2_available() -> bool:
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP2_ENABLED is set but h2 is not installed, using HTTP/1.1")
+        return False
+    return True
+
+def _get_client() -> httpx.AsyncClient:
+    global _client, _transport
+    if _client is None:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+        )
+        _transport = httpx.AsyncHTTPTransport(http2=_http2_available(), limits=limits)
+        _client = httpx.AsyncClient(
+            transport=_transport,
+            # Rezeptseiten leiten oft um (http -> https, "/rezept" -> "/rezept/"), raise_for_status würde sonst an 3xx scheitern
+            follow_redirects=True,
+            max_redirects=settings.HTTP_MAX_REDIRECTS,
+            timeout=httpx.Timeout(
+                connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+                read=settings.HTTP_READ_TIMEOUT_SECONDS,
+                write=settings.HTTP_READ_TIMEOUT_SECONDS,
+                pool=settings.HTTP_POOL_TIMEOUT_SECONDS
+            )
+        )
+    return _client
+
+def _host_limit(host: str) -> asyncio.Semaphore:
+    if host not in _host_limits:
+        _host_limits[host] = asyncio.Semaphore(settings.HTTP_MAX_CONNECTIONS_PER_HOST)
+    return _host_limits[host]
+
+async def _trace(event: str, info: dict) -> None:
+    # Jeder Verbindungsaufbau ist ein verpasstes Keep-Alive: Verhältnis zu requests zeigt, wie gut der Pool greift
+    if event == "connection.connect_tcp.complete":
+        _stats["tcp_connects"] += 1
+    elif event == "connection.start_tls.complete":
+        _stats["tls_handshakes"] += 1
+
+async def request(method: str, url: str, **kwargs) -> httpx.Response:
+    client = _get_client()
+    kwargs["extensions"] = {"trace": _trace, **kwargs.get("extensions", {})}
+
+    host = httpx.URL(url).host
+    async with _host_limit(host):
+        _stats["requests"] += 1
+        _in_flight[host] = _in_flight.get(host, 0) + 1
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            _stats["errors"] += 1
+            raise
+        finally:
+            _in_flight[host] -= 1
+            if not _in_flight[host]:
+                del _in_flight[host]
+
+    if response.http_version == "HTTP/2":
+        _stats["http2_responses"] += 1
+    return response
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+async def head(url: str, **kwargs) -> httpx.Response:
+    return await request("HEAD", url, **kwargs)
+
+def stats() -> dict:
+    # _pool ist httpx-intern, aber die einzige Stelle mit dem Zustand der Verbindungen
+    pool = getattr(_transport, "_pool", None)
+    connections = list(pool.connections) if pool is not None else []
+    return {
+        **_stats,
+        "open_connections": len(connections),
+        "idle_connections": sum(connection.is_idle() for connection in connections),
+        "in_flight_per_host": dict(_in_flight),
+        "max_connections": settings.HTTP_MAX_CONNECTIONS,
+        "max_connections_per_host": settings.HTTP_MAX_CONNECTIONS_PER_HOST
+    }
+
+async def close() -> None:
+    global _client, _transport
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _transport = None
+    _host_limits.clear()
+    _in_flight.clear()
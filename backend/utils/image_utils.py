@@ -1,24 +1,149 @@
-import uuid
+import hashlib
 import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from PIL import Image
+from typing import Optional
+from PIL import Image, features
 import asyncio
 from config import settings
 
 UPLOAD_DIR = settings.UPLOAD_DIR
 
-# Synchroner Helfer für die CPU intensive Bildverarbeitung
+# Maximale Breite pro Variante (Dashboard-Karte, Detailansicht). Das Original bleibt als JPEG erhalten.
+IMAGE_VARIANTS = {"card": 480, "detail": 1200}
+
+# Bevorzugte Formate zuerst; AVIF nur, wenn Pillow mit libavif gebaut ist
+VARIANT_FORMATS = {
+    "avif": ("AVIF", {"quality": 55, "speed": 8}),
+    "webp": ("WEBP", {"quality": 75, "method": 4})
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _available_formats() -> dict:
+    return {ext: fmt for ext, fmt in VARIANT_FORMATS.items() if ext != "avif" or features.check("avif")}
+
+def _variant_filename(stem: str, variant: str, ext: str) -> str:
+    return f"{stem}-{variant}.{ext}"
+
+def _write_variants(img: Image.Image, stem: str, upload_dir: Path) -> None:
+    for variant, max_width in IMAGE_VARIANTS.items():
+        # Nie hochskalieren, nur verkleinern
+        resized = img if img.width <= max_width else img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+
+        for ext, (image_format, options) in _available_formats().items():
+            # Atomar ersetzen, falls zwei Prozesse dasselbe Bild gleichzeitig speichern
+            path = upload_dir / _variant_filename(stem, variant, ext)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            resized.save(tmp_path, image_format, **options)
+            os.replace(tmp_path, path)
+
+# Synchroner Helfer für die CPU intensive Bildverarbeitung (läuft im Worker-Prozess)
 def _save_image_sync(image_data: bytes, upload_dir: Path) -> str:
+    # Content-addressed: gleiche Bytes ergeben denselben Dateinamen und werden nur einmal gespeichert
+    stem = hashlib.sha256(image_data).hexdigest()
+    filename = f"{stem}.jpg"
+    filepath = upload_dir / filename
+
+    if filepath.exists():
+        # mtime erneuern, damit der GC-Sweep das Bild in der Karenzzeit nicht als verwaist löscht
+        os.utime(filepath)
+        create_missing_variants(filepath)
+        return f"/uploads/{filename}"
+
     with Image.open(io.BytesIO(image_data)) as img:
         if img.mode != "RGB":
             img = img.convert("RGB")
 
-        filename = f"{uuid.uuid4().hex}.jpg"
-        filepath = upload_dir / filename
-        
-        img.save(filepath, "JPEG", optimize=True, quality=80)
+        _write_variants(img, stem, upload_dir)
+        # Original zuletzt und atomar schreiben: existiert es, sind auch die Varianten vollständig
+        tmp_path = filepath.with_suffix(f".{os.getpid()}.tmp")
+        img.save(tmp_path, "JPEG", optimize=True, quality=80)
+        os.replace(tmp_path, filepath)
         return f"/uploads/{filename}"
 
+def create_missing_variants(filepath: Path) -> bool:
+    # Für Bilder, die vor den Varianten hochgeladen wurden (Backfill)
+    stem = filepath.stem
+    missing = [
+        (variant, ext) for variant in IMAGE_VARIANTS for ext in _available_formats()
+        if not (filepath.parent / _variant_filename(stem, variant, ext)).exists()
+    ]
+    if not missing:
+        return False
+
+    with Image.open(filepath) as img:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        _write_variants(img, stem, filepath.parent)
+    return True
+
+def variants_for(image: Optional[str]) -> Optional[dict]:
+    # {"card": {"avif": "/uploads/<stem>-card.avif", "webp": ...}, "detail": {...}}, nur tatsächlich vorhandene Dateien
+    if not image or not image.startswith("/uploads/"):
+        return None
+
+    upload_dir = Path(UPLOAD_DIR)
+    stem = Path(image).stem
+    variants = {}
+    for variant in IMAGE_VARIANTS:
+        files = {
+            ext: f"/uploads/{_variant_filename(stem, variant, ext)}"
+            for ext in VARIANT_FORMATS
+            if (upload_dir / _variant_filename(stem, variant, ext)).exists()
+        }
+        if files:
+            variants[variant] = files
+
+    return variants or None
+
+def upload_exists(image: Optional[str]) -> bool:
+    return bool(image) and (Path(UPLOAD_DIR) / Path(image).name).is_file()
+
+def reserve_upload(image: Optional[str]) -> bool:
+    # Wiederverwendetes Bild (Cache-Treffer): mtime von Original und Varianten erneuern wie bei Duplikaten in _save_image_sync,
+    # damit der GC-Sweep es zwischen Treffer und create_recipe nicht als verwaist löscht
+    if not upload_exists(image):
+        return False
+
+    upload_dir = Path(UPLOAD_DIR)
+    stem = Path(image).stem
+    try:
+        os.utime(upload_dir / Path(image).name)
+    except FileNotFoundError:
+        return False  # Sweep war schneller
+
+    for variant in IMAGE_VARIANTS:
+        for ext in VARIANT_FORMATS:
+            try:
+                os.utime(upload_dir / _variant_filename(stem, variant, ext))
+            except FileNotFoundError:
+                pass
+    return True
+
+# <stem>.jpg oder <stem>-<variante>.<format>
+UPLOAD_FILENAME = re.compile(rf"^(?P<stem>[^-.]+)(?:-(?:{'|'.join(IMAGE_VARIANTS)}))?\.[a-z]+$")
+
+def image_stem(filename: str) -> Optional[str]:
+    match = UPLOAD_FILENAME.match(filename)
+    return match.group("stem") if match else None
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _executor
+
 async def process_image_bytes(image_data: bytes) -> str:
     upload_dir = Path(UPLOAD_DIR)
-    return await asyncio.to_thread(_save_image_sync, image_data, upload_dir)
\ No newline at end of file
+    # Encoding (JPEG + AVIF/WebP-Varianten) im Prozess-Pool, damit weder Event Loop noch GIL blockiert werden
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), _save_image_sync, image_data, upload_dir)
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
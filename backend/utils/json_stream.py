@@ -0,0 +1,142 @@
+import json
+import re
+from typing import List, Optional, Tuple
+
+# Innerhalb eines Strings nur bis zum nächsten Anführungszeichen oder Backslash springen statt Zeichen für Zeichen
+STRING_SPECIAL = re.compile(r'["\\]')
+# Leerraum/Doppelpunkte sowie Zahlen, true/false/null ebenfalls in einem Schritt überspringen
+SKIP = re.compile(r"[\s:]+")
+LITERAL_END = re.compile(r"[,}\]\s]")
+
+
+class JsonStreamParser:
+    # Liest ein JSON-Dokument stückweise (z.B. LLM-Stream) und liefert jeden vollständigen Wert, dessen Pfad beobachtet wird.
+    # Pfade sind Tupel aus Schlüsseln, "*" steht für einen beliebigen Array-Index: ("content", "ingredients", "*").
+    # Jedes Zeichen wird genau einmal angefasst, der bisherige Text wird nie erneut durchsucht.
+
+    def __init__(self, paths: List[tuple]):
+        self.paths = [tuple(path) for path in paths]
+        self._depths = {len(path) for path in self.paths}
+        # Pro Ebene: [Schlüssel bzw. Index, erwartet Schlüssel?] für Objekte, [Index, None] für Arrays
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._in_literal = False
+        self._key_parts: List[str] = []
+        # Erfasster Text des aktuell beobachteten Werts (höchstens einer, beobachtete Pfade verschachteln sich nicht)
+        self._capture: Optional[List[str]] = None
+        self._capture_path: tuple = ()
+        self._capture_depth = 0
+
+    def _path(self) -> tuple:
+        return tuple(frame[0] for frame in self._stack)
+
+    def _matches(self, path: tuple) -> bool:
+        return any(
+            len(pattern) == len(path) and all(part == "*" or part == actual for part, actual in zip(pattern, path))
+            for pattern in self.paths
+        )
+
+    def _start_value(self) -> bool:
+        # Wert beginnt an der aktuellen Position, Pfad prüfen und ggf. Erfassung starten
+        if self._capture is None and len(self._stack) in self._depths and self._matches(self._path()):
+            self._capture = []
+            self._capture_path = self._path()
+            self._capture_depth = len(self._stack)
+            return True
+        return False
+
+    def _end_value(self, events: list, chunk: str, start: int, end: int) -> None:
+        # Wert auf der Ebene _capture_depth ist vollständig
+        if self._capture is not None and len(self._stack) == self._capture_depth:
+            self._capture.append(chunk[start:end])
+            events.append((self._capture_path, json.loads("".join(self._capture))))
+            self._capture = None
+
+    def feed(self, chunk: str) -> List[Tuple[tuple, object]]:
+        events = []
+        # Ab hier gehört der Chunk zum erfassten Wert (bei Start im Chunk wird capture_start verschoben)
+        capture_start = 0
+        i = 0
+        length = len(chunk)
+
+        while i < length:
+            if self._in_string:
+                if self._escape:
+                    # Zeichen nach dem Backslash (auch '"') gehört noch zum String
+                    if self._string_is_key:
+                        self._key_parts.append(chunk[i])
+                    self._escape = False
+                    i += 1
+                    continue
+                match = STRING_SPECIAL.search(chunk, i)
+                if match is None:
+                    if self._string_is_key:
+                        self._key_parts.append(chunk[i:])
+                    i = length
+                    break
+                j = match.start()
+                if chunk[j] == "\\":
+                    if self._string_is_key:
+                        self._key_parts.append(chunk[i:j + 1])
+                    self._escape = True
+                    i = j + 1
+                    continue
+
+                self._in_string = False
+                if self._string_is_key:
+                    self._key_parts.append(chunk[i:j])
+                    key = "".join(self._key_parts)
+                    self._stack[-1][0] = json.loads(f'"{key}"') if "\\" in key else key
+                    self._key_parts = []
+                else:
+                    self._end_value(events, chunk, capture_start, j + 1)
+                i = j + 1
+                continue
+
+            if self._in_literal:
+                match = LITERAL_END.search(chunk, i)
+                if match is None:
+                    i = length
+                    break
+                # Zahl, true/false/null endet am Trennzeichen, das danach normal verarbeitet wird
+                i = match.start()
+                self._in_literal = False
+                self._end_value(events, chunk, capture_start, i)
+
+            match = SKIP.match(chunk, i)
+            if match:
+                i = match.end()
+                continue
+
+            char = chunk[i]
+            if char == ",":
+                frame = self._stack[-1]
+                if frame[1] is None:
+                    frame[0] += 1
+                else:
+                    frame[1] = True
+            elif char == '"':
+                self._in_string = True
+                self._string_is_key = bool(self._stack) and self._stack[-1][1] is True
+                if self._string_is_key:
+                    self._stack[-1][1] = False
+                elif self._start_value():
+                    capture_start = i
+            elif char in "{[":
+                if self._start_value():
+                    capture_start = i
+                self._stack.append([None, True] if char == "{" else [0, None])
+            elif char in "}]":
+                self._stack.pop()
+                self._end_value(events, chunk, capture_start, i + 1)
+            else:
+                self._in_literal = True
+                if self._start_value():
+                    capture_start = i
+            i += 1
+
+        if self._capture is not None:
+            self._capture.append(chunk[capture_start:])
+        return events
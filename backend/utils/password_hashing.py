@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from passlib.context import CryptContext
+from config import settings
+
+# Ändert sich BCRYPT_ROUNDS, markiert verify_and_update alte Hashes als veraltet (Rehash beim Login)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+class PasswordHashingBusyError(Exception):
+    pass
+
+
+# Laufen im Worker-Prozess, deshalb Funktionen auf Modulebene (picklebar)
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return _executor
+
+async def _run(fn, *args):
+    global _pending
+
+    # Backpressure: lieber sofort ablehnen als eine unbegrenzte Warteschlange aufbauen
+    if _pending >= settings.PASSWORD_HASH_MAX_QUEUE:
+        raise PasswordHashingBusyError("Too many password operations in progress")
+
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+async def verify_password(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return await _run(_verify_and_update, password, hashed_password)
+
+def stats() -> dict:
+    return {"workers": settings.PASSWORD_HASH_WORKERS, "pending": _pending, "max_queue": settings.PASSWORD_HASH_MAX_QUEUE}
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,119 @@
+import asyncio
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set
+
+# Endzustände eines Import-Jobs, danach kommen keine Events mehr
+TERMINAL_STAGES = ("done", "not_found", "failed")
+
+# Job, für den der aktuelle Task gerade arbeitet. Tasks, die daraus gestartet werden (Bild, SingleFlight), erben ihn.
+_current_job: ContextVar[Optional[str]] = ContextVar("import_job", default=None)
+# Gemeinsamer Pipeline-Lauf (SingleFlight), falls der Task für mehrere Jobs arbeitet
+_current_run: ContextVar[Optional["SharedRun"]] = ContextVar("shared_run", default=None)
+
+
+# Verteilt Fortschritts-Events der Import-Pipeline an SSE-Clients. Events werden pro Job gepuffert,
+# damit ein Client, der sich später verbindet, den bisherigen Verlauf ebenfalls bekommt.
+# Nur aus dem Event Loop aufrufen (nicht aus asyncio.to_thread).
+class ProgressBroker:
+
+    def __init__(self):
+        self._history: Dict[str, List[dict]] = defaultdict(list)
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def publish(self, job_id: str, stage: str, data: Optional[dict] = None) -> None:
+        event = {"stage": stage, "data": data or {}}
+
+        if stage in TERMINAL_STAGES:
+            self._history.pop(job_id, None)
+        else:
+            self._history[job_id].append(event)
+
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        for event in self._history.get(job_id, []):
+            queue.put_nowait(event)
+
+        self._subscribers[job_id].add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is None:
+            return
+
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[job_id]
+
+
+progress = ProgressBroker()
+
+# Ein Pipeline-Lauf, auf den mehrere Jobs warten. Der Task erbt nur den Job des ersten Aufrufers,
+# daher gehen Stufen und Verbrauch hierüber an alle beteiligten Jobs.
+class SharedRun:
+
+    def __init__(self):
+        self.jobs: List[str] = []
+        self.history: List[tuple] = []
+        self.usage: Dict[str, int] = {}
+
+    def join(self, job_id: str) -> None:
+        # Später hinzukommende Jobs bekommen die bisherigen Stufen nachgeliefert
+        self.jobs.append(job_id)
+        for stage, data in self.history:
+            progress.publish(job_id, stage, data)
+
+    def leave(self, job_id: str) -> None:
+        # Erst nach Ende des Laufs aufrufen, dann ist der Verbrauch vollständig
+        self.jobs.remove(job_id)
+        usage = _usage[job_id]
+        for name, count in self.usage.items():
+            usage[name] = usage.get(name, 0) + count
+
+    def publish(self, stage: str, data: dict) -> None:
+        self.history.append((stage, data))
+        for job_id in self.jobs:
+            progress.publish(job_id, stage, data)
+
+
+# Verbrauch pro Job (z.B. input_tokens), wird beim Abschluss in import_jobs gespeichert
+_usage: Dict[str, Dict[str, int]] = defaultdict(dict)
+
+def bind_job(job_id: str):
+    return _current_job.set(job_id)
+
+def unbind_job(token) -> None:
+    _current_job.reset(token)
+
+def bind_run(run: SharedRun):
+    return _current_run.set(run)
+
+def report(stage: str, **data) -> None:
+    run = _current_run.get()
+    if run is not None:
+        run.publish(stage, data)
+        return
+
+    # Außerhalb eines Import-Jobs (z.B. Tests, Skripte) passiert nichts
+    job_id = _current_job.get()
+    if job_id is not None:
+        progress.publish(job_id, stage, data)
+
+def record_usage(**counts: int) -> None:
+    run = _current_run.get()
+    job_id = _current_job.get()
+    if run is not None:
+        usage = run.usage
+    elif job_id is not None:
+        usage = _usage[job_id]
+    else:
+        return
+    for name, count in counts.items():
+        usage[name] = usage.get(name, 0) + count
+
+def pop_usage(job_id: str) -> Dict[str, int]:
+    return _usage.pop(job_id, {})
@@ -0,0 +1,30 @@
+import asyncio
+import copy
+from typing import Awaitable, Callable, Dict
+
+
+# Gleichzeitige Aufrufe mit demselben Schlüssel teilen sich eine laufende Ausführung
+class SingleFlight:
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield: bricht ein Aufrufer ab (z.B. Client-Disconnect), läuft der Job für die anderen weiter
+        result = await asyncio.shield(task)
+
+        # Jeder Aufrufer bekommt eine eigene Kopie, damit Änderungen sich nicht gegenseitig beeinflussen
+        return copy.deepcopy(result)
+
+    def running(self, key: str) -> bool:
+        return key in self._inflight
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
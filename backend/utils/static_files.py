@@ -0,0 +1,36 @@
+import mimetypes
+import os
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Ein Jahr: Upload-Dateien sind content-addressed und werden nie überschrieben
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+# StaticFiles für /uploads: Browser cachen Bilder ohne Revalidierung, ETag hängt nur am Dateinamen
+# (nicht an der mtime, die der Image-Store bei Duplikaten auffrischt). Range-Requests und
+# Zero-Copy über "http.response.pathsend" liefert FileResponse bereits mit.
+class ImmutableStaticFiles(StaticFiles):
+
+    def __init__(self, *args, accel_redirect_prefix: str = "", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accel_redirect_prefix = accel_redirect_prefix
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        filename = os.path.basename(full_path)
+        headers = {"cache-control": CACHE_CONTROL, "etag": f'"{filename}"'}
+
+        # Dateien ändern sich nie: jede bedingte Anfrage mit passendem ETag bzw. beliebigem Datum ist aktuell
+        if_none_match = request_headers.get("if-none-match")
+        if (if_none_match and self.is_not_modified(headers, request_headers)) or (not if_none_match and "if-modified-since" in request_headers):
+            return NotModifiedResponse(Headers(headers))
+
+        # Optional: nginx liefert die Datei per sendfile aus (X-Accel-Redirect auf eine internal location)
+        if self.accel_redirect_prefix:
+            media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            return Response(status_code=status_code, media_type=media_type, headers={**headers, "x-accel-redirect": f"{self.accel_redirect_prefix}{filename}"})
+
+        return FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
@@ -0,0 +1,76 @@
+import re
+import httpx
+from utils import http_client
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Klick-/Kampagnen-IDs, die auf keiner Seite den Inhalt bestimmen. Generische Namen wie "ref" oder
+# "user_id" bleiben erhalten, da sie auf Rezeptseiten Bedeutung haben können; bei TikTok werden
+# ohnehin alle Query-Parameter verworfen (Share-Tracking wie _r, _t, is_from_webapp).
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid"}
+TRACKING_PREFIXES = ("utm_",)
+
+TIKTOK_SHORT_HOSTS = {"vm.tiktok.com", "vt.tiktok.com"}
+TIKTOK_SHORT_PATH = re.compile(r"^/t/[^/]+/?$")
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def is_tiktok_url(url: str) -> bool:
+    host = (urlsplit(url).hostname or "").lower()
+    return host == "tiktok.com" or host.endswith(".tiktok.com")
+
+def is_tiktok_short_link(url: str) -> bool:
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    return host in TIKTOK_SHORT_HOSTS or (is_tiktok_url(url) and bool(TIKTOK_SHORT_PATH.match(parts.path)))
+
+def _with_scheme(url: str) -> str:
+    url = url.strip()
+    # "www.chefkoch.de/..." ohne Schema würde sonst komplett als Pfad geparst
+    if "://" not in url:
+        url = f"https://{url.lstrip('/')}"
+    return url
+
+def fetchable_url(url: str) -> str:
+    # Abgerufen wird die URL des Nutzers (Slash am Ende, Reihenfolge der Parameter bleiben), nur ohne Fragment
+    return urlunsplit(urlsplit(_with_scheme(url))._replace(fragment=""))
+
+def canonicalize_url(url: str) -> str:
+    # Nur Schlüssel für Dedup und Recipe.url, nicht zum Abrufen: Server leiten "/rezept/" nicht immer auf "/rezept" weiter
+    url = _with_scheme(url)
+
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    netloc = host
+    if parts.port and not (scheme == "http" and parts.port == 80) and not (scheme == "https" and parts.port == 443):
+        netloc = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if path != "/":
+        path = path.rstrip("/")
+
+    # TikTok-Videos sind allein über den Pfad eindeutig, alle Query-Parameter sind Share-Tracking
+    if is_tiktok_url(url):
+        query = ""
+    else:
+        params = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking_param(key)]
+        query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+async def resolve_url(url: str) -> str:
+    url = canonicalize_url(url)
+
+    # Kurzlinks (vm.tiktok.com/..., tiktok.com/t/...) auf die eigentliche Video-URL auflösen
+    if is_tiktok_short_link(url):
+        try:
+            response = await http_client.head(url, follow_redirects=True, timeout=10.0)
+            url = canonicalize_url(str(response.url))
+        except httpx.HTTPError:
+            pass  # Kurzlink bleibt dann der Schlüssel, yt-dlp kann ihn trotzdem verarbeiten
+
+    return url
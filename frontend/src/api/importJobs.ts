@@ -0,0 +1,59 @@
+import api from "./api";
+import { ImportJob } from "../types";
+
+const POLL_INTERVAL_MS = 1500;
+const TERMINAL_STAGES = ["done", "not_found", "failed"] as const;
+const PROGRESS_STAGES = ["fetched", "cleaned", "llm_first_token", "title", "ingredients", "nutrients", "image"] as const;
+
+export type ImportStage = typeof PROGRESS_STAGES[number];
+
+/**
+ * Polls a background import job until the pipeline has finished.
+ * Resolves with the final job state (done, not_found or failed).
+ */
+export async function waitForImportJob(jobId: string): Promise<ImportJob> {
+    for (;;) {
+        const { data } = await api.get<ImportJob>(`/recipes/jobs/${jobId}`);
+        if (data.status !== "queued" && data.status !== "running") return data;
+
+        await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+    }
+}
+
+/**
+ * Follows a background import job via Server-Sent Events and reports every pipeline stage
+ * (with its partial recipe data) as soon as the server emits it.
+ * Falls back to polling if the event stream cannot be opened or breaks.
+ */
+export function followImportJob(jobId: string, onStage: (stage: ImportStage, data: Record<string, unknown>) => void): Promise<ImportJob> {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`${import.meta.env.VITE_API_URL}/recipes/jobs/${jobId}/events`, { withCredentials: true });
+
+        PROGRESS_STAGES.forEach((stage) => {
+            source.addEventListener(stage, (event) => onStage(stage, JSON.parse((event as MessageEvent).data)));
+        });
+
+        TERMINAL_STAGES.forEach((stage) => {
+            source.addEventListener(stage, (event) => {
+                source.close();
+                resolve(JSON.parse((event as MessageEvent).data) as ImportJob);
+            });
+        });
+
+        source.onerror = () => {
+            source.close();
+            waitForImportJob(jobId).then(resolve, reject);
+        };
+    });
+}
+
+/** Loading texts for the import button, one per pipeline stage. */
+export const IMPORT_STAGE_TEXTS: Record<ImportStage, string> = {
+    fetched: "Inhalte werden analysiert...",
+    cleaned: "Daten werden verarbeitet...",
+    llm_first_token: "Rezepturen werden identifiziert...",
+    title: "Rezept erkannt...",
+    ingredients: "Zutaten werden aufbereitet...",
+    nutrients: "Nährwerte berechnet, Bild wird erstellt...",
+    image: "Bild fertig..."
+};
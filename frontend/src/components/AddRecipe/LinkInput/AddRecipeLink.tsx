@@ -4,6 +4,8 @@ import { toast } from "react-toastify";
 import axios from "axios";
 import styles from './AddRecipeLink.module.css';
 import api from "../../../api/api";
+import { followImportJob, IMPORT_STAGE_TEXTS, ImportStage } from "../../../api/importJobs";
+import { ImportJob } from "../../../types";
 
 interface AddRecipeLinkProps {
   onRecipeAdded: () => Promise<void>;
@@ -26,23 +28,24 @@ export default function AddRecipeLink({ onRecipeAdded }: AddRecipeLinkProps) {
     setIsLoading(true);
     setLoadingText("Website wird aufgerufen...");
 
-    const steps = [
-      "Inhalte werden analysiert...",
-      "Daten werden verarbeitet...",
-      "Rezepturen werden identifiziert...",
-      "Details werden aufbereitet..."
-    ];
-
-    let stepIndex = 0;
-    const intervalId = setInterval(() => {
-      if (stepIndex < steps.length) {
-        setLoadingText(steps[stepIndex]);
-        stepIndex++;
-      }
-    }, 3000);
+    // Loading text follows the real pipeline stages streamed by the server
+    const handleStage = (stage: ImportStage, data: Record<string, unknown>) => {
+      setLoadingText(stage === "title" ? `${data.title} wird erstellt...` : IMPORT_STAGE_TEXTS[stage]);
+    };
 
     try {
-      await api.post("/recipes/from-url", null, { params: { url: url }});
+      // Import runs as a background job, the server answers immediately with 202
+      const { data: job } = await api.post<ImportJob>("/recipes/from-url", null, { params: { url: url }});
+      const result = await followImportJob(job.id, handleStage);
+
+      if (result.status === "not_found") {
+        toast.error("Kein Rezept gefunden");
+        return;
+      }
+      if (result.status === "failed") {
+        toast.error("Fehler aufgetreten");
+        return;
+      }
 
       toast.success("Rezept erstellt");
       setUrl("");
@@ -56,7 +59,6 @@ export default function AddRecipeLink({ onRecipeAdded }: AddRecipeLinkProps) {
         else toast.error("Fehler aufgetreten");
       }
     } finally {
-      clearInterval(intervalId);
       setIsLoading(false);
       setLoadingText("KI arbeitet..."); 
     }
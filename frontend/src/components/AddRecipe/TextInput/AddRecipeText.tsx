@@ -4,6 +4,8 @@ import { toast } from "react-toastify";
 import axios from "axios";
 import styles from './AddRecipeText.module.css';
 import api from "../../../api/api";
+import { followImportJob, IMPORT_STAGE_TEXTS, ImportStage } from "../../../api/importJobs";
+import { ImportJob } from "../../../types";
 
 interface AddRecipeTextProps {
   onRecipeAdded: () => Promise<void>;
@@ -26,23 +28,24 @@ export default function AddRecipeText({ onRecipeAdded }: AddRecipeTextProps) {
     setIsLoading(true);
     setLoadingText("Text wird gelesen...");
 
-    const steps = [
-      "Inhalte werden analysiert...",
-      "Daten werden verarbeitet...",
-      "Rezepturen werden identifiziert...",
-      "Details werden aufbereitet..."
-    ];
-
-    let stepIndex = 0;
-    const intervalId = setInterval(() => {
-      if (stepIndex < steps.length) {
-        setLoadingText(steps[stepIndex]);
-        stepIndex++;
-      }
-    }, 3000);
+    // Loading text follows the real pipeline stages streamed by the server
+    const handleStage = (stage: ImportStage, data: Record<string, unknown>) => {
+      setLoadingText(stage === "title" ? `${data.title} wird erstellt...` : IMPORT_STAGE_TEXTS[stage]);
+    };
 
     try {
-      await api.post("/recipes/from-user-input", { user_input: userInput });
+      // Import runs as a background job, the server answers immediately with 202
+      const { data: job } = await api.post<ImportJob>("/recipes/from-user-input", { user_input: userInput });
+      const result = await followImportJob(job.id, handleStage);
+
+      if (result.status === "not_found") {
+        toast.error("Kein Rezept gefunden");
+        return;
+      }
+      if (result.status === "failed") {
+        toast.error("Fehler aufgetreten");
+        return;
+      }
 
       toast.success("Rezept erstellt");
       setUserInput("");
@@ -56,7 +59,6 @@ export default function AddRecipeText({ onRecipeAdded }: AddRecipeTextProps) {
         else toast.error("Fehler aufgetreten");
       }
     } finally {
-      clearInterval(intervalId);
       setIsLoading(false);
       setLoadingText("KI arbeitet..."); 
     }
@@ -9,7 +9,10 @@ import api from '../../api/api';
 import { logout } from '../../utils/auth';
 import RecipeCard from './RecipeCard/RecipeCard';
 import TagFilter from './TagFilter/TagFilter';
-import { Recipe } from '../../types';
+import { Recipe, TagCount } from '../../types';
+
+const PAGE_SIZE = 48;
+const SEARCH_DEBOUNCE_MS = 250;
 
 export default function Dashboard() {
     // --- State & Constants -------------------
@@ -18,15 +21,22 @@ export default function Dashboard() {
     const [showPopup, setShowPopup] = useState<boolean>(false);
     const [isLoading, setIsLoading] = useState<boolean>(true);
     const [selected, setSelected] = useState<string[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [tagCounts, setTagCounts] = useState<Record<string, number>>({});
     const navigate = useNavigate();
 
     const tags: string[] = ["high protein", "< 30min", "vegetarisch", "vegan", "Hauptspeise", "Dessert", "Frühstück", "Backen", "Beilage"];
 
     // --- API Interaction ---------------------
-    const fetchRecipes = async () => {   
+    // Title search and tag filters run server-side; pages are chained via the X-Next-Cursor header
+    const fetchRecipes = async (cursor: string | null = null) => {   
         try {
-            const response = await api.get("/recipes/");
-            setRecipes(response.data);
+            const response = await api.get("/recipes/", {
+                params: { q: search || undefined, tag: selected, cursor: cursor ?? undefined, limit: PAGE_SIZE },
+                paramsSerializer: { indexes: null }
+            });
+            setRecipes(prev => cursor ? [...prev, ...response.data] : response.data);
+            setNextCursor(response.headers["x-next-cursor"] ?? null);
         } catch (error) {
             console.error("Fetch error:", error);
             navigate("/login")
@@ -35,9 +45,28 @@ export default function Dashboard() {
         }
     };
 
+    // Per-user tag counts are aggregated by the backend from the indexed tag table
+    const fetchTagCounts = async () => {
+        try {
+            const response = await api.get<TagCount[]>("/recipes/tags");
+            setTagCounts(Object.fromEntries(response.data.map(({ tag, count }) => [tag, count])));
+        } catch (error) {
+            console.error("Tag count error:", error);
+        }
+    };
+
+    const refreshDashboard = async () => {
+        await Promise.all([fetchRecipes(), fetchTagCounts()]);
+    };
+
+    useEffect(() => {
+        fetchTagCounts();
+    }, []);
+
     useEffect(() => { 
-        fetchRecipes(); 
-    }, []); 
+        const timeoutId = setTimeout(() => fetchRecipes(), SEARCH_DEBOUNCE_MS);
+        return () => clearTimeout(timeoutId);
+    }, [search, selected]); 
 
     // --- Filter Logic ------------------------
     const toggleFilter = (filter: string) => {
@@ -62,12 +91,13 @@ export default function Dashboard() {
                     tags={tags} 
                     toggleFilter={toggleFilter} 
                     selected={selected} 
+                    counts={tagCounts}
                 />
 
                 <Popup 
                     showPopup={showPopup} 
                     setShowPopup={setShowPopup} 
-                    onRecipeAdded={fetchRecipes} 
+                    onRecipeAdded={refreshDashboard} 
                 />
                 
                 {/* Status-Feedback: Loading or Empty State */}
@@ -78,18 +108,21 @@ export default function Dashboard() {
                       ))
                 }
 
-                {/* Recipe Grid: Client-side filtering by title and tags */}
+                {/* Recipe Grid: already filtered by the backend */}
                 <div className={styles.dashboard__grid}>
-                    {recipes
-                        .filter(item => 
-                            item.title.toLowerCase().includes(search.toLowerCase()) && 
-                            selected.every(tag => item.content.tags.includes(tag))
-                        )
-                        .map(recipe => (
-                            <RecipeCard key={recipe.id} recipe={recipe} />
-                        ))
-                    }
+                    {recipes.map(recipe => (
+                        <RecipeCard key={recipe.id} recipe={recipe} />
+                    ))}
                 </div>
+
+                {nextCursor && (
+                    <button 
+                        className={styles.dashboard__btnLoadMore} 
+                        onClick={() => fetchRecipes(nextCursor)}
+                    >
+                        Mehr laden
+                    </button>
+                )}
             </div>
         </div>
     );
@@ -2,8 +2,7 @@ import { useNavigate } from "react-router-dom";
 import { Clock, Leaf } from "lucide-react"
 import styles from './RecipeCard.module.css';
 import { Recipe } from '../../../types';
-
-const API_URL = import.meta.env.VITE_API_URL 
+import RecipeImage from '../../RecipeImage/RecipeImage';
 
 interface RecipeCardProps {
     recipe: Recipe;
@@ -17,10 +16,10 @@ export default function RecipeCard({ recipe }: RecipeCardProps) {
             className={styles.dashboard__card} 
             onClick={() => navigate(`/recipe/${recipe.id}`)}
         > 
-            <img 
+            <RecipeImage 
+                recipe={recipe}
+                size="card"
                 className={styles.dashboard__picture} 
-                src={`${API_URL}${recipe.image}`}
-                alt={recipe.title} 
                 loading="lazy" 
             />
 
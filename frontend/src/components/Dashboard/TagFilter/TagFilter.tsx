@@ -4,9 +4,10 @@ interface TagFilterProps {
     tags: string[];
     toggleFilter: (tag: string) => void;
     selected: string[];
+    counts?: Record<string, number>;
 }
 
-export default function TagFilter({ tags, toggleFilter, selected }: TagFilterProps) {
+export default function TagFilter({ tags, toggleFilter, selected, counts = {} }: TagFilterProps) {
 
     return (
         <div className={styles.dashboard__filterWrapper}>
@@ -24,6 +25,9 @@ export default function TagFilter({ tags, toggleFilter, selected }: TagFilterPro
                         `}
                     >
                         {tag}
+                        {tag in counts && (
+                            <span className={styles.dashboard__filterCount}>{counts[tag]}</span>
+                        )}
                     </button>
                 );
             })}
@@ -2,8 +2,7 @@ import { useNavigate } from 'react-router-dom';
 import { ChevronLeft, Edit2, Trash2, Save, X } from 'lucide-react'; 
 import styles from './ImageSection.module.css';
 import { Recipe } from '../../../types';
-
-const API_URL = import.meta.env.VITE_API_URL 
+import RecipeImage from '../../RecipeImage/RecipeImage';
 
 interface ImageSectionProps {
     recipe: Recipe;
@@ -24,10 +23,10 @@ export default function ImageSection({
 
     return (
         <div className={styles.detail__pictureWrapper}>
-            <img
+            <RecipeImage
+                recipe={recipe}
+                size="detail"
                 className={styles.detail__picture}
-                src={`${API_URL}${recipe.image}`}
-                alt={recipe.title}
             />
             
             <button 
@@ -0,0 +1,32 @@
+import styles from './RecipeImage.module.css';
+import { Recipe } from '../../types';
+
+const API_URL = import.meta.env.VITE_API_URL 
+
+interface RecipeImageProps {
+    recipe: Recipe;
+    size: "card" | "detail";
+    className?: string;
+    loading?: "lazy" | "eager";
+}
+
+/**
+ * Renders the recipe image with its downscaled AVIF/WebP variants.
+ * Browsers pick the first supported format; the original JPEG stays the fallback.
+ */
+export default function RecipeImage({ recipe, size, className, loading }: RecipeImageProps) {
+    const variants = recipe.image_variants?.[size];
+
+    return (
+        <picture className={styles.recipeImage}>
+            {variants?.avif && <source srcSet={`${API_URL}${variants.avif}`} type="image/avif" />}
+            {variants?.webp && <source srcSet={`${API_URL}${variants.webp}`} type="image/webp" />}
+            <img
+                className={className}
+                src={`${API_URL}${recipe.image}`}
+                alt={recipe.title}
+                loading={loading}
+            />
+        </picture>
+    );
+}
@@ -34,6 +34,10 @@ export interface RecipeContent {
     nutrients: Nutrients;
 }
 
+/** --- Responsive Image Variants ---------- */
+// Per size (card, detail) the available formats, e.g. { card: { avif: "/uploads/x-card.avif", webp: "..." } }
+export type ImageVariants = Partial<Record<"card" | "detail", Partial<Record<"avif" | "webp", string>>>>;
+
 /** --- Main Recipe Entity ----------------- */
 export interface Recipe {
     id: number;
@@ -41,11 +45,27 @@ export interface Recipe {
     content: RecipeContent;
     url: string;    // Source link (Web/TikTok)
     image: string;  // Base64 encoded string
+    image_variants?: ImageVariants | null;
     owner_id: number;
 }
 
+/** --- Tag Aggregation ------------------- */
+export interface TagCount {
+    tag: string;
+    count: number;
+}
+
 /** --- User Entity ------------------------ */
 export interface User {
     id: number;
     email: string;
-}
\ No newline at end of file
+}
+
+/** --- Background Import Job ------------- */
+export interface ImportJob {
+    id: string;
+    status: "queued" | "running" | "done" | "not_found" | "failed";
+    recipe_id: number | null;
+    error: string | null;
+    input_tokens?: number | null;
+}